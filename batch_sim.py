@@ -0,0 +1,251 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is a batch engine that plays thousands of independent Can't Stop games in lockstep with
+NumPy. Every call to BatchGames.step() rolls once for every unfinished game, so rolling, pairing
+the dice into sums (Dice.setSums), checking for a bomb (Board.filterSums), applying moves
+(Board.setWhitePieces) and saving progress (Board.stopTurn) are each a handful of array
+operations over the whole batch instead of a Python loop per game.
+
+The rules are the same as Board's, including Board.resolveSums for the case where only one
+white piece is left. Positions are stored as "steps" like CompactBoard: progress[game,seat,col]
+and white[game,col] are 0 for no marker or white piece and n for Space n-1.
+
+Moves come from vectorized policies. A policy is given the indexes of the games it is playing
+and answers for all of them at once:
+    chooseMoves(games,idx,moveA,moveB,legal) - moveA/moveB are (len(idx),9) arrays of the sums of each
+                                               candidate move (moveB is 0 for single sums) and legal marks
+                                               which candidates can be played. returns the index of the
+                                               chosen candidate for each game.
+    keepRolling(games,idx)                   - returns a boolean array, True to roll again.
+ThresholdPolicy takes its threshold per game, so a whole parameter sweep runs as one batch.
+
+rollBuffer() uses the same NumPy generator to pre-roll dice for a Dice (see Dice.setBuffer),
+so the Board engine can also skip rolling in hot loops.
+
+This file needs NumPy, unlike the rest of the game.
+'''
+
+import argparse
+import numpy as np
+from game_classes import DICE_INDEX,getColLengths
+from policies import COL_VALUES
+
+# OUTCOME_BY_CODE[((a*6+b)*6+c)*6+d] is the DICE_OUTCOMES index of the sorted dice a+1<=b+1<=c+1<=d+1
+OUTCOME_BY_CODE = np.zeros(1296,dtype=np.uint8)
+for dice,index in DICE_INDEX.items():
+    OUTCOME_BY_CODE[((dice[0]-1)*6+dice[1]-1)*6*6+(dice[2]-1)*6+dice[3]-1] = index
+
+def rollBuffer(rng,n):
+    '''
+    rng is a numpy.random.Generator. returns an array of n rolls as indexes in DICE_OUTCOMES, for Dice.setBuffer.
+    '''
+    dice = np.sort(rng.integers(0,6,size=(n,4),dtype=np.int16),axis=1)
+    return OUTCOME_BY_CODE[((dice[:,0]*6+dice[:,1])*6+dice[:,2])*6+dice[:,3]]
+class BatchGames:
+    '''
+    contains numGames independent games of numPlayers players each.
+    progress has shape (numGames, numPlayers, 13), white and owner have shape (numGames, 13),
+    owner is the seat that completed each column, or -1.
+    '''
+    def __init__(self,numGames,numPlayers,test=False,seed=None,maxWhitePieces=3) -> None:
+        self.numGames = numGames
+        self.numPlayers = numPlayers
+        self.maxWhitePieces = maxWhitePieces
+        self.colsToWin = 2 if test else 3
+        self.rng = np.random.default_rng(seed)
+        self.tops = np.zeros(13,dtype=np.int8)
+        for name,length in getColLengths(test).items():
+            self.tops[name] = length+1
+        self.isCol = self.tops>0
+        self.progress = np.zeros((numGames,numPlayers,13),dtype=np.int8)
+        self.white = np.zeros((numGames,13),dtype=np.int8)
+        self.whiteCount = np.zeros(numGames,dtype=np.int8)
+        self.owner = np.full((numGames,13),-1,dtype=np.int8)
+        self.active = np.zeros(numGames,dtype=np.intp)
+        self.winner = np.full(numGames,-1,dtype=np.intp)
+        self.turns = np.zeros(numGames,dtype=np.int64)
+        self.busts = np.zeros(numGames,dtype=np.int64)
+        self.rolls = np.zeros(numGames,dtype=np.int64)
+    def __str__(self) -> str:
+        return f'<BatchGames obj> games = {self.numGames}, finished = {int((self.winner>=0).sum())}'
+    def live(self):
+        '''
+        returns the indexes of the games nobody has won yet
+        '''
+        return np.nonzero(self.winner<0)[0]
+    def activeProgress(self,idx):
+        '''
+        returns the (len(idx),13) progress of the active player in each of the games idx
+        '''
+        return self.progress[idx,self.active[idx]]
+    def roll(self,idx):
+        '''
+        rolls 4 dice for each of the games idx and pairs them into sums, like Dice.setSums.
+        returns a (len(idx),3,2) array: the two sums for each of the three ways to split the dice.
+        '''
+        dice = self.rng.integers(1,7,size=(len(idx),4),dtype=np.int8)
+        total = dice.sum(axis=1,dtype=np.int8)
+        sums = np.empty((len(idx),3,2),dtype=np.int8)
+        for k in range(3):
+            sums[:,k,0] = dice[:,0]+dice[:,k+1]
+            sums[:,k,1] = total-sums[:,k,0]
+        return sums
+    def getCandidates(self,idx,sums):
+        '''
+        returns (moveA, moveB, legal) for the games idx and their rolled sums: the 9 candidate moves per game
+        (the pair, or either sum alone, for each way to split the dice) and which of them are legal,
+        using the same rules as Board.filterSums and Board.resolveSums.
+        '''
+        n = len(idx)
+        rows = np.arange(n)[:,None]
+        white = self.white[idx]
+        whitePiecesLeft = (self.maxWhitePieces-self.whiteCount[idx].astype(np.int16)).clip(0)[:,None]
+        openCols = self.isCol & (self.owner[idx]<0)
+        playable = np.where(whitePiecesLeft==0,white>0,openCols)
+        s1 = sums[:,:,0]
+        s2 = sums[:,:,1]
+        p1 = playable[rows,s1]
+        p2 = playable[rows,s2]
+        n1 = (white[rows,s1]==0)
+        n2 = (white[rows,s2]==0)
+        pairFits = (n1.astype(np.int16)+n2<=whitePiecesLeft) | ((s1==s2) & n1 & (whitePiecesLeft>=1))
+        pairLegal = p1 & p2 & pairFits
+        split = p1 & p2 & ~pairFits
+        single1 = (p1 & ~p2 & (~n1 | (whitePiecesLeft>=1))) | split
+        single2 = (p2 & ~p1 & (~n2 | (whitePiecesLeft>=1))) | split
+        moveA = np.concatenate([s1,s1,s2],axis=1)
+        moveB = np.concatenate([s2,np.zeros_like(s1),np.zeros_like(s2)],axis=1)
+        legal = np.concatenate([pairLegal,single1,single2],axis=1)
+        return moveA,moveB,legal
+    def advance(self,idx,cols):
+        '''
+        sets (if necessary) and iterates a white piece in cols for each of the games idx. cols of 0 are skipped.
+        '''
+        keep = cols>0
+        idx = idx[keep]
+        cols = cols[keep]
+        step = self.white[idx,cols]
+        placed = step==0
+        start = self.progress[idx,self.active[idx],cols]+1
+        step = np.where(placed,start,np.minimum(step+1,self.tops[cols]))
+        self.white[idx,cols] = step
+        self.whiteCount[idx] += placed
+    def bomb(self,idx):
+        '''
+        clears the white pieces of the games idx and passes the turn.
+        '''
+        self.white[idx] = 0
+        self.whiteCount[idx] = 0
+        self.busts[idx] += 1
+        self.nextTurn(idx)
+    def stopTurn(self,idx):
+        '''
+        saves the white pieces' progress for the active player of the games idx, like Board.stopTurn,
+        then records any winners and passes the turn in the other games.
+        '''
+        seats = self.active[idx]
+        progress = np.maximum(self.progress[idx,seats],self.white[idx])
+        self.progress[idx,seats] = progress
+        done = self.isCol & (progress==self.tops) & (self.owner[idx]<0)
+        owner = self.owner[idx]
+        owner[done] = np.broadcast_to(seats[:,None],done.shape)[done]
+        self.owner[idx] = owner
+        self.white[idx] = 0
+        self.whiteCount[idx] = 0
+        won = (owner==seats[:,None]).sum(axis=1)>=self.colsToWin
+        self.winner[idx[won]] = seats[won]
+        self.turns[idx[won]] += 1
+        self.nextTurn(idx[~won])
+    def nextTurn(self,idx):
+        self.turns[idx] += 1
+        self.active[idx] = (self.active[idx]+1) % self.numPlayers
+    def step(self,policies):
+        '''
+        policies is a list of vectorized policies, one per seat.
+        rolls once in every unfinished game and plays the roll. returns the number of unfinished games.
+        '''
+        idx = self.live()
+        if len(idx)==0:
+            return 0
+        self.rolls[idx] += 1
+        sums = self.roll(idx)
+        moveA,moveB,legal = self.getCandidates(idx,sums)
+        canPlay = legal.any(axis=1)
+        seats = self.active[idx]
+        self.bomb(idx[~canPlay])
+        for seat in range(self.numPlayers):
+            mine = canPlay & (seats==seat)
+            if not mine.any():
+                continue
+            games = idx[mine]
+            choice = policies[seat].chooseMoves(self,games,moveA[mine],moveB[mine],legal[mine])
+            rows = np.arange(len(games))
+            self.advance(games,moveA[mine][rows,choice].astype(np.intp))
+            self.advance(games,moveB[mine][rows,choice].astype(np.intp))
+            full = self.whiteCount[games]>=self.maxWhitePieces
+            if full.any():
+                stop = ~policies[seat].keepRolling(self,games[full])
+                self.stopTurn(games[full][stop])
+        return int((self.winner<0).sum())
+    def run(self,policies,maxRolls=100000):
+        '''
+        plays every game to the end (or for maxRolls rolls). returns the number of unfinished games.
+        '''
+        left = self.numGames
+        for i in range(maxRolls):
+            left = self.step(policies)
+            if left==0:
+                break
+        return left
+    def winRates(self):
+        '''
+        returns a list of the fraction of games won by each seat
+        '''
+        return [float((self.winner==seat).mean()) for seat in range(self.numPlayers)]
+class ThresholdPolicy:
+    '''
+    a vectorized rule of 28 bot (see policies.RuleOf28Policy) that stops once its turn score reaches threshold.
+    threshold is a number, or an array with one threshold per game for parameter sweeps.
+    '''
+    def __init__(self,threshold=28) -> None:
+        self.threshold = np.asarray(threshold)
+        self.values = np.zeros(13,dtype=np.int16)
+        for col,value in COL_VALUES.items():
+            self.values[col] = value
+    def chooseMoves(self,games,idx,moveA,moveB,legal):
+        white = games.white[idx]
+        rows = np.arange(len(idx))[:,None]
+        newA = white[rows,moveA]==0
+        newB = (moveB>0) & (white[rows,moveB]==0) & (moveB!=moveA)
+        score = -100*(newA.astype(np.int16)+newB)+self.values[moveA]+self.values[moveB]
+        score = np.where(legal,score,-10000)
+        return score.argmax(axis=1)
+    def keepRolling(self,games,idx):
+        white = games.white[idx].astype(np.int16)
+        progress = games.activeProgress(idx)
+        placed = white>0
+        score = (self.values*(white-progress+1)*placed).sum(axis=1)
+        odd = (placed & (np.arange(13)%2==1)).sum(axis=1)
+        score += np.where(odd==games.maxWhitePieces,2,0)-np.where(odd==0,2,0)
+        if self.threshold.ndim:
+            return score<self.threshold[idx]
+        return score<self.threshold
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweep the rule of 28 threshold with a NumPy batch of Can\'t Stop games.')
+    parser.add_argument('--games',type=int,default=10000,help='games per threshold')
+    parser.add_argument('--thresholds',default='16,20,24,28,32,36',help='comma separated thresholds for seat 0; seat 1 always plays 28')
+    parser.add_argument('--seed',type=int,default=0)
+    args = parser.parse_args()
+    thresholds = [int(x) for x in args.thresholds.split(',')]
+    perGame = np.repeat(thresholds,args.games)
+    games = BatchGames(len(perGame),2,seed=args.seed)
+    left = games.run([ThresholdPolicy(perGame),ThresholdPolicy(28)])
+    for i in range(len(thresholds)):
+        winners = games.winner[i*args.games:(i+1)*args.games]
+        print(f'threshold {thresholds[i]}: seat 0 wins {float((winners==0).mean()):.4f}')
+    print(f'unfinished games: {left}')
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is a benchmark suite for the hot paths of the game_classes back end. Each benchmark
+times one operation many times on positions taken from real (seeded) games, and reports the
+best of several runs in operations per second. The memory benchmark plays whole games under
+tracemalloc and reports the peak memory, and how much memory each turn adds at its peak.
+CPython has no counter for the number of allocations, so the per turn figure is in bytes.
+
+Results are written as JSON, so a run on one commit can be compared with a run on another:
+    python benchmark.py --out base.json
+    (change game_classes)
+    python benchmark.py --compare base.json
+The comparison lists every benchmark that got more than its threshold slower (or whose memory
+grew by more than the memory threshold) and exits with status 1 if there are any, so it can
+gate a deploy.
+
+Timings are noisy even as the best of several runs: two runs of the same commit on the same
+machine were measured to differ by about 10% on whole games, but by up to 50% on the shortest
+operations (Dice.roll, Board.legalMoves). So each benchmark has its own threshold in BENCHMARKS:
+0.15 for whole games, which are what a deploy has to protect, and up to 0.5 for the operations
+that take around a microsecond. --threshold can change them, e.g. --threshold games=0.1,Dice.roll=0.3.
+The memory benchmark runs before the timed ones, while the shared caches are still in the same
+state, so it gives the same figures every run and keeps a tight threshold of 0.1.
+'''
+
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from random import Random
+from game_classes import Board,Dice,DICE_OUTCOMES,getGameRng
+from policies import BoardView,RuleOf28Policy
+from simulate import SimulationStats,playGame
+
+RESULTS_VERSION = 1
+POOL_SIZE = 500
+
+def getPositions(count,seed=0):
+    '''
+    returns a list of count Board snapshots from seeded rule of 28 games,
+    each taken just after a roll with at least one white piece already placed and a legal move.
+    '''
+    positions = []
+    policy = RuleOf28Policy()
+    game = 0
+    while len(positions)<count:
+        board = Board(['seat0','seat1','seat2'],rng=getGameRng(seed,'positions',game))
+        view = BoardView(board)
+        game += 1
+        for turn in range(1000):
+            board.dice.roll()
+            moves = board.legalMoves()
+            if not moves:
+                board.bomb()
+                board.nextActivePlayer()
+                continue
+            if board.colsWithWhitePieces:
+                positions.append(board.snapshot())
+            board.applySums(list(moves[0]))
+            if board.whitePiecesLeft()==0 and not policy.keepRolling(view):
+                board.stopTurn()
+                if board.didActivePlayerWin():
+                    break
+                board.nextActivePlayer()
+    return positions[:count]
+def getBoards(positions):
+    '''
+    returns a Board for each position
+    '''
+    return [Board.fromSnapshot(x) for x in positions]
+def timeReads(method):
+    '''
+    returns a benchmark of a Board method that does not change the board, called on POOL_SIZE different positions.
+    '''
+    def bench(n,boards):
+        calls = [getattr(board,method) for board in boards]
+        start = time.perf_counter()
+        for x in range(n//len(calls)):
+            for call in calls:
+                call()
+        return time.perf_counter()-start,n//len(calls)*len(calls)
+    return bench
+def timeChanges(func):
+    '''
+    returns a benchmark of func(board), which changes the board.
+    the boards are restored to their positions between rounds, without timing it.
+    '''
+    def bench(n,boards):
+        snapshots = [board.snapshot() for board in boards]
+        elapsed = 0
+        for x in range(max(n//len(boards),1)):
+            for board,snapshot in zip(boards,snapshots):
+                board.restore(snapshot)
+            start = time.perf_counter()
+            for board in boards:
+                func(board)
+            elapsed += time.perf_counter()-start
+        for board,snapshot in zip(boards,snapshots):
+            board.restore(snapshot)
+        return elapsed,max(n//len(boards),1)*len(boards)
+    return bench
+def benchRoll(n,boards):
+    dice = Dice(rng=Random(0))
+    start = time.perf_counter()
+    for x in range(n):
+        dice.roll()
+    return time.perf_counter()-start,n
+def benchSetSums(n,boards):
+    dice = Dice(rng=Random(0))
+    rolls = [tuple(Random(i).sample(x,4)) for i,x in enumerate(DICE_OUTCOMES)]
+    start = time.perf_counter()
+    for x in range(n//len(rolls)):
+        for roll in rolls:
+            dice.dice = roll
+            dice.setSums()
+    return time.perf_counter()-start,n//len(rolls)*len(rolls)
+def applyFirstMove(board):
+    board.setWhitePieces(list(board.legalMoves()[0]))
+def benchGames(n,boards):
+    '''
+    plays n//1000 rule of 28 games (at least 1), each counted as one operation
+    '''
+    games = max(n//1000,1)
+    policies = [RuleOf28Policy(),RuleOf28Policy()]
+    stats = SimulationStats(2)
+    start = time.perf_counter()
+    for x in range(games):
+        playGame(policies,stats,seed=0,gameIndex=x)
+    return time.perf_counter()-start,games
+
+# name : (benchmark, description, threshold). a benchmark is called with (n, boards) and returns (seconds, number of operations timed).
+# threshold is the fraction slower that counts as a regression, set above the run to run noise measured for it.
+BENCHMARKS = {
+    'Dice.roll':(benchRoll,'one roll',0.5),
+    'Dice.setSums':(benchSetSums,'pair 4 dice into sums',0.3),
+    'Board.filterSums':(timeReads('filterSums'),'playable sums of the roll',0.3),
+    'Board.legalMoves':(timeReads('legalMoves'),'legal moves of the roll',0.5),
+    'Board.getPlayableCols':(timeReads('getPlayableCols'),'playable columns',0.5),
+    'Board.getActivePlayerProgress':(timeReads('getActivePlayerProgress'),'active player progress dictionary',0.5),
+    'Board.setWhitePieces':(timeChanges(applyFirstMove),'legalMoves plus setWhitePieces of the first move',0.3),
+    'Board.stopTurn':(timeChanges(lambda board:board.stopTurn()),'save the white pieces\' progress',0.2),
+    'Board.snapshot':(timeReads('snapshot'),'snapshot of the board',0.3),
+    'games':(benchGames,'a full 2 player rule of 28 game',0.15),
+}
+
+def runBenchmark(bench,boards,minTime=0.2,repeat=5):
+    '''
+    runs bench with more and more operations until one run takes minTime seconds, then repeat times at that size.
+    returns the best result: {'opsPerSec', 'usPerOp', 'ops'}
+    '''
+    n = 1000
+    while True:
+        elapsed,ops = bench(n,boards)
+        if elapsed>=minTime or n>=10**8:
+            break
+        n = int(n*max(2,min(10,minTime*1.2/max(elapsed,1e-9))))
+    best = elapsed/ops
+    for x in range(repeat-1):
+        elapsed,ops = bench(n,boards)
+        best = min(best,elapsed/ops)
+    return {'opsPerSec':1/best,'usPerOp':best*1e6,'ops':ops}
+def measureMemory(games=50,seed=0):
+    '''
+    plays rule of 28 games under tracemalloc.
+    returns {'peakKiB': the peak memory used while playing, 'turnPeakBytes': the average rise in memory at the peak of a turn}
+    '''
+    policies = [RuleOf28Policy(),RuleOf28Policy()]
+    turns = 0
+    turnPeaks = 0
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    peak = 0
+    for game in range(games):
+        board = Board(['seat0','seat1'],rng=getGameRng(seed,'memory',game))
+        view = BoardView(board)
+        seat = 0
+        while True:
+            start = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            while True:
+                board.dice.roll()
+                moves = board.legalMoves()
+                if not moves:
+                    board.bomb()
+                    break
+                board.applySums(list(policies[seat].chooseMove(view,moves)))
+                if board.whitePiecesLeft()==0 and not policies[seat].keepRolling(view):
+                    board.stopTurn()
+                    break
+            current,turnPeak = tracemalloc.get_traced_memory()
+            peak = max(peak,turnPeak)
+            turnPeaks += turnPeak-start
+            turns += 1
+            if board.didActivePlayerWin():
+                break
+            board.nextActivePlayer()
+            seat = 1-seat
+    tracemalloc.stop()
+    return {'peakKiB':(peak-baseline)/1024,'turnPeakBytes':turnPeaks/max(turns,1)}
+def getCommit():
+    '''
+    returns the current git commit, or False if it is not known
+    '''
+    try:
+        return subprocess.run(['git','rev-parse','--short','HEAD'],capture_output=True,text=True,check=True).stdout.strip()
+    except (OSError,subprocess.CalledProcessError):
+        return False
+def runBenchmarks(names=None,minTime=0.2,repeat=5,onResult=None):
+    '''
+    names is a list of names from BENCHMARKS (all of them if None).
+    onResult, if given, is called with (name, result) as each benchmark finishes.
+    returns the results as a dictionary that can be saved as JSON.
+    '''
+    boards = getBoards(getPositions(POOL_SIZE))
+    memory = measureMemory()
+    if onResult:
+        onResult('memory',memory)
+    results = {}
+    for name in names or BENCHMARKS:
+        if name not in BENCHMARKS:
+            raise ValueError(f'unknown benchmark {name}, choose from {", ".join(BENCHMARKS)}')
+        results[name] = runBenchmark(BENCHMARKS[name][0],boards,minTime,repeat)
+        if onResult:
+            onResult(name,results[name])
+    return {'version':RESULTS_VERSION,'commit':getCommit(),'python':platform.python_version(),
+        'machine':platform.machine(),'time':time.strftime('%Y-%m-%dT%H:%M:%S'),'results':results,'memory':memory}
+def compareResults(old,new,thresholds=None,memoryThreshold=0.1):
+    '''
+    old and new are results from runBenchmarks. thresholds is an optional dictionary of {name : threshold} 
+    that replaces the thresholds in BENCHMARKS (see parseThresholds).
+    returns a list of (name, old value, new value, change) for each benchmark that is more than its threshold (a fraction) 
+    slower, and each memory figure that is more than memoryThreshold higher.
+    '''
+    thresholds = thresholds or {}
+    regressions = []
+    for name,result in new['results'].items():
+        if name in old['results']:
+            before = old['results'][name]['opsPerSec']
+            change = result['opsPerSec']/before-1
+            threshold = thresholds.get(name,BENCHMARKS[name][2])
+            if change<-threshold:
+                regressions.append((name,before,result['opsPerSec'],change))
+    for name,value in new['memory'].items():
+        before = old['memory'].get(name)
+        if before:
+            change = value/before-1
+            if change>memoryThreshold:
+                regressions.append((f'memory {name}',before,value,change))
+    return regressions
+def parseThresholds(text):
+    '''
+    text is a comma separated list of name=threshold, or a single threshold for every benchmark.
+    returns the {name : threshold} dictionary for compareResults. raises ValueError if a name is not in BENCHMARKS.
+    '''
+    if '=' not in text:
+        return {name:float(text) for name in BENCHMARKS}
+    thresholds = {}
+    for item in text.split(','):
+        name,value = item.split('=')
+        if name not in BENCHMARKS:
+            raise ValueError(f'unknown benchmark {name}, choose from {", ".join(BENCHMARKS)}')
+        thresholds[name] = float(value)
+    return thresholds
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the Can\'t Stop back end.')
+    parser.add_argument('--out',default=False,help='file to write the results to as JSON')
+    parser.add_argument('--compare',default=False,help='results JSON from an earlier run to compare with')
+    parser.add_argument('--threshold',type=parseThresholds,default=None,
+        help='fraction slower that counts as a regression, for every benchmark or as name=value,... (default: each benchmark\'s own, see BENCHMARKS)')
+    parser.add_argument('--memory-threshold',type=float,default=0.1,help='fraction more memory that counts as a regression')
+    parser.add_argument('--only',default=False,help=f'comma separated list of benchmarks: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--min-time',type=float,default=0.2,help='seconds each timed run should take')
+    args = parser.parse_args()
+    def onResult(name,result):
+        if name=='memory':
+            print(f'memory: peak {result["peakKiB"]:.1f} KiB, {result["turnPeakBytes"]:.0f} bytes per turn at peak',flush=True)
+        else:
+            print(f'{name:32} {result["opsPerSec"]:14,.0f} ops/s {result["usPerOp"]:10.3f} us/op',flush=True)
+    results = runBenchmarks(args.only.split(',') if args.only else None,args.min_time,onResult=onResult)
+    if args.out:
+        with open(args.out,'w') as f:
+            json.dump(results,f,indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+        regressions = compareResults(old,results,args.threshold,args.memory_threshold)
+        for name,before,after,change in regressions:
+            print(f'REGRESSION {name}: {before:,.3f} -> {after:,.3f} ({change:+.1%})')
+        if regressions:
+            sys.exit(1)
+        print(f'no regressions against {old.get("commit") or args.compare}')
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This file lets the terminal and GUI versions play on a table hosted by server.py instead of
+owning a Board. GameClient sends requests and reads events (one JSON object per line, see
+server.py), and RemoteBoard keeps a copy of the table that is only ever changed by the
+server's events: one "state" with the whole game, then small deltas for each roll, move, bomb
+and stop. apply() returns the cols each event changed, so a front end only has to redraw those.
+
+GameClient only needs the standard library. receive(False) never waits, so the GUI can poll it
+from Tk's event loop, and receive() waits for at least one event, for the terminal version.
+
+An address is "host:port" for TCP, or the path of a Unix socket.
+'''
+
+import json
+import socket
+
+def connectTo(address):
+    '''
+    returns a socket connected to address: "host:port", or the path of a Unix socket
+    '''
+    host,sep,port = address.rpartition(':')
+    if sep and port.isdigit():
+        sock = socket.create_connection((host or '127.0.0.1',int(port)))
+        sock.setsockopt(socket.IPPROTO_TCP,socket.TCP_NODELAY,1)
+        return sock
+    sock = socket.socket(socket.AF_UNIX,socket.SOCK_STREAM)
+    sock.connect(address)
+    return sock
+class GameClient:
+    '''
+    contains a connection to a server.py server.
+    '''
+    def __init__(self,address) -> None:
+        self.address = address
+        self.sock = connectTo(address)
+        self.buffer = b''
+        self.closed = False
+    def __str__(self) -> str:
+        return f'<GameClient obj> {self.address}'
+    def send(self,message):
+        '''
+        message is a dictionary with an 'op', see server.py
+        '''
+        self.sock.sendall((json.dumps(message,separators=(',',':'))+'\n').encode())
+    def join(self,name,table=False,bots=('rule28',),watch=False):
+        '''
+        joins table (a table number) as name, or if table is not given, creates a table with a seat for name
+        and a seat for each bot in bots (POLICIES names). if watch is True, name only watches (and a new table
+        has only the bots, so it starts straight away).
+        '''
+        if table:
+            self.send({'op':'join','table':int(table),'name':name,'watch':watch})
+        else:
+            self.send({'op':'create','seats':([] if watch else [None])+list(bots),'name':name,'watch':watch})
+    def receive(self,block=True):
+        '''
+        returns a list of the events that have arrived. if block is True, waits for at least one.
+        returns an empty list (and sets closed) once the server has closed the connection.
+        '''
+        events = []
+        while not events and not self.closed:
+            self.sock.setblocking(block)
+            try:
+                data = self.sock.recv(65536)
+            except (BlockingIOError,InterruptedError):
+                break
+            if not data:
+                self.closed = True
+                break
+            self.buffer += data
+            *lines,self.buffer = self.buffer.split(b'\n')
+            events.extend(json.loads(x) for x in lines if x)
+            if not block:
+                break
+        return events
+    def close(self):
+        self.closed = True
+        self.sock.close()
+class RemoteBoard:
+    '''
+    contains a copy of a table on a server, built from its events.
+    positions are steps, like CompactBoard: progress[seat][col] and white[col] are 0 or missing for nothing, and n for Space n-1.
+    tops[col] is the number of spaces in a col, white is {col name : step} in the order the white pieces were placed,
+    and done is {col name : seat that completed it}. numDice and sides are the table's dice.
+    phase is the server's phase (see server.py), or 'ending' between the end of a turn (a bomb or a stop) and the turn or win event.
+    '''
+    def __init__(self) -> None:
+        self.table = False
+        self.seat = -1
+        self.names = []
+        self.bots = []
+        self.tops = {}
+        self.progress = []
+        self.white = {}
+        self.done = {}
+        self.active = 0
+        self.dice = []
+        self.moves = []
+        self.phase = 'waiting'
+        self.winner = -1
+        self.maxWhitePieces = 3
+        self.colsToWin = 3
+        self.numDice = 4
+        self.sides = 6
+        self.error = False
+    def __str__(self) -> str:
+        return f'<RemoteBoard obj> table = {self.table}, seat = {self.seat}, phase = {self.phase}, white = {self.white}'
+    def apply(self,event):
+        '''
+        event is an event from the server. updates the board and returns a list of the names of the cols it changed.
+        '''
+        kind = event.get('event')
+        seat = event.get('seat',-1)
+        if kind=='state':
+            self.table = event['table']
+            self.seat = seat
+            self.names = event['players']
+            self.bots = event['bots']
+            self.phase = event['phase']
+            self.winner = event['winner']
+            if 'tops' not in event:
+                return []
+            self.tops = {x:y for x,y in event['tops']}
+            self.progress = [bytearray(x) for x in event['progress']]
+            self.white = {x:y for x,y in event['white']}
+            self.done = {x:y for x,y in event['done']}
+            self.active = event['active']
+            self.maxWhitePieces = event['maxWhitePieces']
+            self.colsToWin = event['colsToWin']
+            self.numDice = event['numDice']
+            self.sides = event['sides']
+            self.dice = event['dice']
+            self.moves = event['moves']
+            return list(self.tops)
+        if kind=='joined':
+            self.table = event['table']
+            if seat>=0 and seat<len(self.names):
+                self.names[seat] = event['name']
+        elif kind=='roll':
+            self.dice = event['dice']
+            self.moves = event['moves']
+            # a roll with no moves bombs, and the bust and turn events follow
+            self.phase = 'move' if self.moves else 'ending'
+        elif kind=='move':
+            for col,step in event['white']:
+                self.white[col] = step
+            self.moves = []
+            self.phase = 'roll' if self.whitePiecesLeft() else 'choose'
+            return [x for x,y in event['white']]
+        elif kind=='bust':
+            cols = list(self.white)
+            self.white = {}
+            self.moves = []
+            return cols
+        elif kind=='stop':
+            cols = list(self.white)
+            for col,step in event['markers']:
+                self.progress[seat][col] = step
+            for col in event['done']:
+                self.done[col] = seat
+            self.white = {}
+            self.phase = 'ending'
+            return cols
+        elif kind=='turn':
+            self.active = seat
+            self.phase = 'roll'
+            self.dice = []
+        elif kind=='win':
+            self.winner = seat
+            self.phase = 'over'
+        elif kind=='error':
+            self.error = event['message']
+        return []
+    def isMyTurn(self):
+        return self.seat>=0 and self.seat==self.active and self.phase in ('roll','move','choose')
+    def activeName(self):
+        return self.names[self.active] if self.names else ''
+    def whitePiecesLeft(self):
+        return max(self.maxWhitePieces-len(self.white),0)
+    def getMarkersBySpace(self,col):
+        '''
+        returns a dictionary of {Space name : list of the seats with a marker on it} for a col
+        '''
+        markers = {}
+        for seat in range(len(self.progress)):
+            step = self.progress[seat][col]
+            if step:
+                markers.setdefault(step-1,[]).append(seat)
+        return markers
+    def getActivePlayerProgress(self):
+        '''
+        returns a dictionary of {col name : Space name} of the active player's markers, like Board.getActivePlayerProgress
+        '''
+        if not self.progress:
+            return {}
+        return {col:step-1 for col,step in enumerate(self.progress[self.active]) if step}
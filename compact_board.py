@@ -0,0 +1,299 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is a compact version of the game_classes Board, built for bots and simulations that play
+a very large number of turns. It follows the same rules as Board.applySums, Board.stopTurn and
+Board.bomb, but it stores the whole game as a few small integer arrays instead of Col, Space,
+Marker and WhitePiece objects.
+
+Positions are stored as "steps": 0 means the player has no marker (or there is no white piece)
+in that column, and n means the marker sits on Space n-1. A column is complete when its step
+count reaches colTops[col], which is the number of spaces in the column.
+
+CompactBoard.fromBoard() and CompactBoard.toBoard() convert to and from a Board, so the front
+ends can keep using Board while bots run on the fast path.
+'''
+
+from game_classes import Board,Col,Dice,Rules,WhitePiece,getBustProbability,getColsMask,getLegalMoves,getZobristKey
+
+class CompactBoard:
+    '''
+    Runs a Can't Stop game on integer arrays.
+    progress[playerIndex][colName] is the marker step of a player in a column.
+    whitePieces[colName] is the white piece step in a column (white pieces always belong to the active player).
+    whiteCols is the list of columns with white pieces, in the order they were placed.
+    donePlayer[colName] is the index of the player who completed the column, or -1.
+    doneCols[playerIndex] is the list of columns completed by a player, in the order they were completed.
+    openMask is a getColsMask() of the columns nobody has completed, and whiteMask one of whiteCols. they are kept 
+    up to date by setWhitePieces, bomb and stopTurn, the same as Board's, so the playable cols never have to be searched for.
+    rng is an optional random.Random for the dice, and rules an optional Rules object for variants, like Board's.
+    '''
+    def __init__(self,playerStrList,test=False,rng=False,rules=False) -> None:
+        assert isinstance(playerStrList,list)
+        assert isinstance(playerStrList[0],str)
+        if not rules:
+            rules = Rules(test=test)
+        self.rules = rules
+        self.test = rules.test
+        self.playerStrList = playerStrList
+        self.activePlayer = 0
+        self.maxWhitePieces = rules.maxWhitePieces
+        self.colsToWin = rules.colsToWin
+        numCols = rules.maxCol+1
+        self.colTops = bytearray(numCols)
+        self.setCols()
+        self.progress = [bytearray(numCols) for x in playerStrList]
+        self.whitePieces = bytearray(numCols)
+        self.whiteCols = []
+        self.donePlayer = [-1]*numCols
+        self.doneCols = [[] for x in playerStrList]
+        self.resetMasks()
+        self.dice = Dice(rng=rng,table=rules.diceTable)
+    def __str__(self) -> str:
+        return f"<CompactBoard Obj>\nactivePlayer = {self.activePlayer}\nprogress = {[list(x) for x in self.progress]}\nwhiteCols = {self.whiteCols}"
+    def setCols(self):
+        '''
+        This function is only used by CompactBoard itself. Do not call from outside.
+        It sets the number of spaces in each column, matching Board.setCols.
+        '''
+        for name,length in self.rules.colLengths.items():
+            self.colTops[name] = length+1
+    def resetMasks(self):
+        '''
+        works out self.openMask and self.whiteMask from scratch.
+        only needed after changing the arrays directly, rather than through applySums, bomb and stopTurn.
+        '''
+        self.openMask = getColsMask([x for x in range(len(self.colTops)) if self.colTops[x] and self.donePlayer[x]==-1])
+        self.whiteMask = getColsMask(self.whiteCols)
+    def copy(self):
+        '''
+        returns a new CompactBoard with the same state. The dice are shared with this board.
+        '''
+        other = CompactBoard.__new__(CompactBoard)
+        other.rules = self.rules
+        other.test = self.test
+        other.playerStrList = self.playerStrList
+        other.activePlayer = self.activePlayer
+        other.maxWhitePieces = self.maxWhitePieces
+        other.colsToWin = self.colsToWin
+        other.colTops = self.colTops
+        other.progress = [bytearray(x) for x in self.progress]
+        other.whitePieces = bytearray(self.whitePieces)
+        other.whiteCols = self.whiteCols[:]
+        other.donePlayer = self.donePlayer[:]
+        other.doneCols = [x[:] for x in self.doneCols]
+        other.openMask = self.openMask
+        other.whiteMask = self.whiteMask
+        other.dice = self.dice
+        return other
+    def positionKey(self):
+        '''
+        returns a bytes object that is the same for two boards exactly when their players' progress, 
+        white pieces and active player are the same. completed columns follow from the progress.
+        '''
+        return b''.join(self.progress)+self.whitePieces+bytes((self.activePlayer,))
+    def zobrist(self):
+        '''
+        returns the same 64 bit Zobrist hash as Board.zobrist for this position.
+        '''
+        zobrist = getZobristKey('active',self.activePlayer)
+        for x in range(len(self.colTops)):
+            if not self.colTops[x]:
+                continue
+            for i in range(len(self.progress)):
+                if self.progress[i][x]:
+                    zobrist ^= getZobristKey('marker',i,x,self.progress[i][x]-1)
+            if self.whitePieces[x]:
+                zobrist ^= getZobristKey('white',x,self.whitePieces[x]-1)
+            if self.donePlayer[x]!=-1:
+                zobrist ^= getZobristKey('done',x,self.donePlayer[x])
+        return zobrist
+    def didActivePlayerWin(self):
+        '''
+        returns True if active player won, and False otherwise
+        '''
+        return len(self.doneCols[self.activePlayer])>=self.colsToWin
+    def getWhitePieceCompletedCols(self):
+        '''
+        returns a list of the names(int) of cols that have a white piece which has completed the column
+        '''
+        cols = [x for x in self.whiteCols if self.whitePieces[x]==self.colTops[x]]
+        if len(cols)==0:
+            return False
+        return cols
+    def nextActivePlayer(self):
+        '''
+        sets self.activePlayer to the index of the next player.
+        '''
+        self.activePlayer = (self.activePlayer+1) % len(self.playerStrList)
+    def whitePiecesLeft(self):
+        '''
+        returns the number of white pieces that have not been placed yet
+        '''
+        x=self.maxWhitePieces - len(self.whiteCols)
+        if x <0:
+            x=0
+        return x
+    def applySums(self,chosenSums):
+        '''
+        chosenSums is a list of integers or False (bool).
+        If False, self.bomb() is called and the function returns False.
+        Otherwise, the numbers in the list will have white pieces set(if necessary) and iterated by 1, and the function returns True.
+        '''
+        if not chosenSums:
+            self.bomb()
+            return False
+        self.setWhitePieces(chosenSums)
+        return True
+    def filterSums(self):
+        '''
+        returns a list of any integers from self.dice.sums which are playable.
+        if no sums are playable, returns False.
+        '''
+        playableMask = self.getPlayableMask()
+        new_sums=[]
+        for x in self.dice.sums:
+            new_x=[y for y in x if playableMask>>y & 1]
+            if len(new_x) != 0:
+                new_sums.append(new_x)
+        if len(new_sums) == 0:
+            return False
+        return new_sums
+    def legalMoves(self):
+        '''
+        returns a tuple of every legal move for the current roll, each a sorted tuple of one or two sums.
+        returns an empty tuple if the roll bombs. see Board.legalMoves()
+        '''
+        dice = self.dice
+        key = (dice.index,self.getPlayableMask(),self.whiteMask,self.whitePiecesLeft())
+        moves = dice.table.legalMovesCache.get(key)
+        if moves is None:
+            moves = getLegalMoves(*key,dice.table)
+        return moves
+    def bustProbability(self):
+        '''
+        returns the chance (0 to 1) that the next roll bombs, given the current white pieces and completed cols.
+        '''
+        return getBustProbability(self.getPlayableMask(),self.dice.table)
+    def getPlayableCols(self):
+        '''
+        returns a list of the names of columns that are playable (not completed).
+        if there are no spare white pieces, returns only cols with white pieces.
+        '''
+        if len(self.whiteCols)>=self.maxWhitePieces:
+            return self.whiteCols
+        return [x for x in range(len(self.colTops)) if self.openMask>>x & 1]
+    def getPlayableMask(self):
+        '''
+        returns the getColsMask() of self.getPlayableCols()
+        '''
+        if len(self.whiteCols)>=self.maxWhitePieces:
+            return self.whiteMask
+        return self.openMask
+    def setWhitePieces(self,chosenSums):
+        '''
+        chosenSums is a list of integers(one or two).
+        sets (if necessary) and iterates a white piece for each sum
+        '''
+        whitePieces = self.whitePieces
+        for sum in chosenSums:
+            step = whitePieces[sum]
+            if step:
+                if step<self.colTops[sum]:
+                    whitePieces[sum]=step+1
+            else:
+                whitePieces[sum]=self.progress[self.activePlayer][sum]+1
+                self.whiteCols.append(sum)
+                self.whiteMask |= 1<<sum
+    def bomb(self):
+        '''
+        clears out all white pieces.
+        to be called when a player has bombed
+        '''
+        for x in self.whiteCols:
+            self.whitePieces[x]=0
+        self.whiteCols=[]
+        self.whiteMask = 0
+    def stopTurn(self):
+        '''
+        updates the markers for each white piece and clears out white pieces.
+        to be called when the player ends their turn on purpose
+        '''
+        progress = self.progress[self.activePlayer]
+        for x in self.whiteCols:
+            step = self.whitePieces[x]
+            if step>progress[x]:
+                progress[x]=step
+            if progress[x]==self.colTops[x]:
+                self.donePlayer[x]=self.activePlayer
+                self.openMask &= ~(1<<x)
+                if x not in self.doneCols[self.activePlayer]:
+                    self.doneCols[self.activePlayer].append(x)
+            self.whitePieces[x]=0
+        self.whiteCols=[]
+        self.whiteMask = 0
+    @classmethod
+    def fromBoard(cls,board,rng=False,dice=False):
+        '''
+        board is a Board object.
+        returns a CompactBoard with the same players, markers, white pieces, completed columns and dice.
+        if dice (a Dice for the same dice table) is given, the CompactBoard uses it and it is set to the board's roll.
+        otherwise the CompactBoard gets its own dice, rolling with rng if it is given.
+        '''
+        assert isinstance(board,Board)
+        compact = cls.__new__(cls)
+        compact.rules = board.rules
+        compact.test = board.test
+        compact.playerStrList = board.playerStrList
+        compact.activePlayer = board.activePlayer.index
+        compact.maxWhitePieces = board.maxWhitePieces
+        compact.colsToWin = board.colsToWin
+        numCols = board.rules.maxCol+1
+        compact.colTops = bytearray(numCols)
+        compact.progress = [bytearray(player.progress) for player in board.players]
+        compact.whitePieces = bytearray(numCols)
+        compact.donePlayer = [-1]*numCols
+        for col in board.cols.values():
+            assert isinstance(col,Col)
+            compact.colTops[col.name] = len(col.spaces)
+            if col.whitePiece:
+                compact.whitePieces[col.name] = col.whitePiece.space.name+1
+            if col.donePlayer:
+                compact.donePlayer[col.name] = col.donePlayer.index
+        compact.whiteCols = list(board.colsWithWhitePieces.keys())
+        compact.doneCols = [[col.name for col in player.doneCols] for player in board.players]
+        compact.openMask = board.openMask
+        compact.whiteMask = board.whiteMask
+        if not dice or dice.table is not board.dice.table:
+            dice = Dice(rng=rng,table=board.dice.table)
+        compact.dice = dice
+        compact.dice.setOutcome(board.dice.index)
+        return compact
+    def toBoard(self):
+        '''
+        returns a new Board with the same players, markers, white pieces, completed columns and dice.
+        '''
+        board = Board(self.playerStrList,rules=self.rules)
+        board.maxWhitePieces = self.maxWhitePieces
+        board.colsToWin = self.colsToWin
+        board.activePlayer = board.players[self.activePlayer]
+        for i in range(len(board.players)):
+            player = board.players[i]
+            for name,col in board.cols.items():
+                step = self.progress[i][name]
+                if step:
+                    col.addMarker(player,col.spaces[step-1])
+            for name in self.doneCols[i]:
+                board.cols[name].donePlayer = player
+                player.updateDoneCols(board.cols[name])
+        for name in self.whiteCols:
+            col = board.cols[name]
+            col.whitePiece = WhitePiece(board.activePlayer,col.spaces[self.whitePieces[name]-1])
+            board.colsWithWhitePieces[name] = col
+        board.resetMasks()
+        for col in board.cols.values():
+            col.zobrist = col.computeZobrist()
+        board.zobrist = board.computeZobrist()
+        board.dice.setOutcome(self.dice.index)
+        return board
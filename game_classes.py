@@ -1,381 +1,1011 @@
-'''
-Project Name: Can't Stop
-Author: Dawn Harper
-Copyright: October 2021
-Description:
-
-This is the back end file for my Python version of Can't Stop. This file runs all parts of the game 
-that are not requesting and accepting and understanding user input.
-
-'''
-
-from random import randint
-            
-class Board:
-    '''
-    Runs a Can't Stop game.
-    '''
-    def __init__(self,playerStrList,test=False) -> None:
-        assert isinstance(playerStrList,list)
-        assert isinstance(playerStrList[0],str)
-        self.test = test
-        self.playerStrList = playerStrList
-        self.players = []
-        self.activePlayer = False
-        self.colsWithWhitePieces = {}
-        self.maxWhitePieces = 3
-        self.cols = {}
-        self.colsToWin = 3
-        if self.test:
-            self.colsToWin=2
-        self.setup(playerStrList)
-        self.dice = Dice()
-    def __str__(self) -> str:
-        return f"<Board Obj>\nactivePlayer = {self.activePlayer}\ncols = {self.cols}\ncolsWithWhitePieces = {self.colsWithWhitePieces}"
-    def didActivePlayerWin(self):
-        '''
-        returns True if active player won, and False otherwise
-        '''
-        assert isinstance(self.activePlayer,Player)
-        if len(self.activePlayer.doneCols)>=self.colsToWin:
-            return True
-        return False
-    def getWhitePieceCompletedCols(self):
-        '''
-        returns a list of the names(int) of cols that have a white piece which has completed the column
-        '''
-        cols = []
-        for col in self.colsWithWhitePieces.values():
-            assert isinstance(col,Col)
-            if col.whitePiece.space.isFinal:
-                cols.append(col.name)
-        if len(cols)==0:
-            return False
-        return cols
-    def getActivePlayerProgress(self):
-        '''
-        returns a dictionary with the progress info for the active player. 
-        format: {col.name : {'progress':distance progressed, 'outOf':number of spaces, 'isFinal':boolean of whether the col is complete}}
-        '''
-        assert isinstance(self.activePlayer,Player)
-        progress = {}
-        for col in self.cols.values():
-            assert isinstance(col,Col)
-            marker = col.getMarkerByPlayer(self.activePlayer)
-            if marker:
-                assert isinstance(marker,Marker)
-                progress[col.name]={
-                    'progress':marker.space.name,
-                    'outOf':len(col.spaces),
-                    'isFinal':marker.space.isFinal}
-        if len(progress)==0:
-            return False
-        return progress
-    def setup(self,playersStrList):
-        '''
-        This function is only used by Board itself. Do not call from outside.
-        It sets up the Players and Columns so the game can play.
-        '''
-        for player in playersStrList:
-            self.players.append(Player(player))
-        self.activePlayer = self.players[0]
-        self.setCols()
-    def setCols(self):
-        '''
-        This function is only used by Board itself. Do not call from outside.
-        It sets up the Columns and Spaces.
-        '''
-        first_col=2
-        last_col=12
-        mid_col=7
-        add_by=2
-        start=3
-        if self.test:
-            add_by=0
-            start=2
-        counter = start
-        for x in range(first_col,mid_col+1):
-            self.cols[x]=Col(x,counter)
-            counter+=add_by
-        for x in range(mid_col,last_col+1):
-            counter-=add_by
-            self.cols[x]=Col(x,counter)
-    def nextActivePlayer(self):
-        '''
-        sets self.activePlayer to the next player in the list.
-        '''
-        if self.activePlayer:
-            i = self.players.index(self.activePlayer)
-            j = (i+1) % len(self.players)
-            self.activePlayer = self.players[j]
-    def whitePiecesLeft(self):
-        '''
-        returns the number of white pieces that have not been placed yet
-        '''
-        x=self.maxWhitePieces - len(self.colsWithWhitePieces)
-        if x <0:
-            x=0
-        return x
-    def applySums(self,chosenSums):
-        '''
-        chosenSums is a list of integers or False (bool). 
-        If False, self.bomb() is called and the function returns False.
-        Otherwise, the numbers in the list will have white pieces set(if necessary) and iterated by 1, and the function returns True.
-        '''
-        if not chosenSums:
-            self.bomb()
-            return False
-        self.setWhitePieces(chosenSums)
-        return True
-    def filterSums(self):
-        '''
-        returns a list of any integers from self.sums which are playable. 
-        if no sums are playable, returns False.
-        '''
-        playableCols = self.getPlayableCols()
-        sums = self.dice.sums
-        new_sums=[]
-        for x in sums:
-            new_x=[]
-            for y in x:
-                if y in playableCols.keys():
-                    new_x.append(y)
-            if len(new_x) != 0:
-                new_sums.append(new_x)
-        if len(new_sums) == 0:
-            return False
-        return new_sums
-    def getPlayableCols(self):
-        '''
-        returns a dictionary of columns that are playable (not completed).
-        if there are no spare white pieces, returns only cols with white pieces.
-        '''
-        playable = {}
-        if len(self.colsWithWhitePieces)>=self.maxWhitePieces:
-            return self.colsWithWhitePieces
-        for col in self.cols.values():
-            assert isinstance(col,Col)
-            if not col.donePlayer:
-                playable[col.name]=col
-        return playable
-    def setWhitePieces(self,chosenSums):
-        '''
-        chosenSums is a list of integers(one or two). 
-        sets (if necessary) and iterates a white piece for each sum
-        '''
-        if len(chosenSums)==2 and chosenSums[0]==chosenSums[1]:
-            self.setWhitePieces([chosenSums[0]])
-            chosenSums.pop(0)
-        for sum in chosenSums:
-            if sum in self.colsWithWhitePieces.keys():
-                x = self.colsWithWhitePieces[sum]
-                assert isinstance(x,Col)
-                x.iterateWhitePieceByOne()
-            else:
-                x=self.cols[sum]
-                assert isinstance(x,Col)
-                x.setWhitePiece(self.activePlayer)
-                self.colsWithWhitePieces[sum] = self.cols[sum]
-    def bomb(self):
-        '''
-        clears out all white pieces from cols and clears self.colsWithWhitePieces.  
-        to be called when a player has bombed
-        '''
-        for col in self.colsWithWhitePieces.values():
-            assert isinstance(col,Col)
-            col.whitePiece = False
-        self.colsWithWhitePieces={}
-    def stopTurn(self):
-        '''
-        updates the markers for each white piece and clears out white pieces and colsWithWhitePieces.  
-        to be called when the player ends their turn on purpose
-        '''
-        for col in self.colsWithWhitePieces.values():
-            assert isinstance(col,Col)
-            if col.whitePiece:
-                col.setMarker()
-                col.whitePiece=False
-        self.colsWithWhitePieces={}
-class Player:
-    '''
-    contains a player
-    '''
-    def __init__(self,name) -> None:
-        self.name=name
-        self.doneCols=[]
-    def __str__(self) -> str:
-        return '<Player obj>' + self.name
-    def updateDoneCols(self,col):
-        '''
-        col is a Col object.  
-        adds col to self.doneCols.  
-        to be called when a player has ended a turn after completing a column
-        '''
-        if col not in self.doneCols:
-            self.doneCols.append(col)
-class Col:
-    '''
-    contains a single column
-    '''
-    def __init__(self,name,length) -> None:
-        assert isinstance(name,int)
-        assert isinstance(length,int)
-
-        self.name = name
-        self.spaces = {}
-        self.markers = []
-        self.whitePiece = False
-        self.donePlayer = False
-        for x in range(length):
-            self.spaces[x]=Space(x)
-        self.spaces[length]=Space(length,True)
-    def __str__(self) -> str:
-        output=f"<Col obj>\nname = {self.name}\nspaces = {self.spaces}"
-        if len(self.markers) > 0:
-            output+=f"\nmarkers = {self.markers}"
-        if self.whitePiece:
-            output+=f"\nwhitePiece = {self.whitePiece}"
-        if self.donePlayer:
-            output+=f"\ndonePlayer = {self.donePlayer}"
-        return output
-    def setMarker(self):
-        '''
-        sets a or updates a player's marker to the space of the current white piece.
-        returns the player's marker
-        '''
-        if self.whitePiece:
-            assert isinstance(self.whitePiece,WhitePiece)
-            player = self.whitePiece.player
-            marker = self.getMarkerByPlayer(player)
-            if marker:
-                marker.updateSpace(self.whitePiece.space)
-            else:
-                self.markers.append(Marker(player,self.whitePiece.space))
-                marker = self.markers[-1]
-            if marker.space.isFinal:
-                self.done()
-            return marker
-    def getMarkerByPlayer(self,player):
-        '''
-        player is a Player object.
-        returns the marker of the player object.
-        if no marker, returns false.
-        '''
-        for x in self.markers:
-            assert isinstance(x,Marker)
-            if player is x.player:
-                return x
-        return False
-    def done(self):
-        '''
-        only to be called by a Col object
-        if a player has completed a column and ended the turn, this updates the col's donePlayer and the players doneCols.
-        '''
-        assert isinstance(self.whitePiece,WhitePiece)
-        self.donePlayer = self.whitePiece.player
-        self.donePlayer.updateDoneCols(self)
-    def iterateWhitePieceByOne(self):
-        '''
-        moves the Col's whitePiece up one Space, unless there are no more Spaces
-        '''
-        assert isinstance(self.whitePiece,WhitePiece)
-        if self.whitePiece.space.isFinal:
-            return
-        nextSpaceName = self.whitePiece.space.name + 1
-        self.whitePiece.space = self.spaces[nextSpaceName]
-        assert isinstance(self.whitePiece.space,Space)
-    def setWhitePiece(self,player):
-        '''
-        player is a Player object. 
-        sets a white piece for this column and player either ahead of their current 
-        marker or at the start of the column.
-        '''
-        marker = self.getMarkerByPlayer(player)
-        if not marker:
-            self.whitePiece = WhitePiece(player,self.spaces[0])
-        else:
-            self.whitePiece = WhitePiece(player,marker.space)
-            self.iterateWhitePieceByOne()
-class Marker:
-    '''
-    contains a player's marker in a Col
-    '''
-    def __init__(self,player,space) -> None:
-        assert isinstance(player,Player)
-        assert isinstance(space,Space)
-        self.objType = 'Marker'
-        self.player = player
-        self.space = space
-    def __str__(self) -> str:
-        output = f"<{self.objType} obj>\nplayer = {self.player}\nspace = {self.space}"
-        if self.space.isFinal:
-            output+=f"\nisFinal"
-        return output
-    def updateSpace(self,space):
-        '''
-        space is a Space object. 
-        sets self.space to space, as long as we aren't moving backwards
-        '''
-        assert isinstance(space,Space)
-        if space.name<self.space.name:
-            print('handle: new space is not ahead of old space')
-            return
-        self.space = space
-class WhitePiece(Marker):
-    '''
-    contains a player's white piece in a col
-    '''
-    def __init__(self, player, space) -> None:
-        super().__init__(player, space)
-class Space:
-    '''
-    contains a space within a col
-    '''
-    def __init__(self,name,isFinal=False) -> None:
-        self.name = name
-        self.isFinal = isFinal
-    def __str__(self) -> str:
-        return '<Space obj>: ' +str(self.name) + ' ' + str(self.isFinal)      
-class Dice:
-    '''
-    contains 4 dice and their pairs of sums
-    '''
-    def __init__(self) -> None:
-        self.dice = []
-        self.sums = []
-        self.roll()
-    def roll(self):
-        '''
-        sets the self.dice and self.sums. 
-        returns the list of dice.
-        dice rolls are random D6 rolls. there are 4 dice.
-        sums are all possible ways to split 4 dice into two sums of two dice each.
-        '''
-        self.dice = []
-        for x in range(0,4):
-            i = randint(1,6)
-            self.dice.append(i)
-        self.dice.sort()
-        self.setSums()
-        return self.dice
-    def setSums(self):
-
-        '''
-        only to be called by self.roll()
-        sets and returns the self.sums based on the dice
-        '''
-        wholeSum = 0
-        for x in self.dice:
-            wholeSum+=x
-        self.sums=[]
-        a=self.dice[0]
-        for x in range(1,4):
-            b=self.dice[x]
-            sum1=a+b
-            sum2 = wholeSum-sum1
-            sumset = [sum1,sum2]
-            sumset.sort()
-            if sumset not in self.sums:
-                self.sums.append(sumset)
-        self.sums.sort()
-        return self.sums
\ No newline at end of file
+'''
+Project Name: Can't Stop
+Author: Dawn Harper
+Copyright: October 2021
+Description:
+
+This is the back end file for my Python version of Can't Stop. This file runs all parts of the game 
+that are not requesting and accepting and understanding user input.
+
+'''
+
+from itertools import accumulate,product
+from random import Random,choices,random
+import struct
+
+def getColLengths(test=False,sides=6):
+    '''
+    returns a dictionary of {col name : col length} for the columns of a game played with dice of sides sides.
+    the length is the name of the final Space, so each column has length+1 Spaces.
+    in test mode, every column has the same short length.
+    '''
+    first_col=2
+    last_col=2*sides
+    mid_col=sides+1
+    add_by=2
+    start=3
+    if test:
+        add_by=0
+        start=2
+    lengths = {}
+    counter = start
+    for x in range(first_col,mid_col+1):
+        lengths[x]=counter
+        counter+=add_by
+    for x in range(mid_col,last_col+1):
+        counter-=add_by
+        lengths[x]=counter
+    return lengths
+            
+class Rules:
+    '''
+    contains the settings of a game, so variants can be played:
+    numDice dice (at least 4) with sides sides each, of which any two pairs make the sums,
+    colLengths is a dictionary of {col name : col length} like getColLengths() (by default the usual columns for the dice),
+    maxWhitePieces is the number of white pieces, and colsToWin is the number of cols a player must complete to win.
+    the dice table for numDice and sides (with its caches of bust chances and legal moves) is shared by every game using it.
+    Rules should not be changed once made, since games share them.
+    '''
+    def __init__(self,numDice=4,sides=6,colLengths=False,maxWhitePieces=3,colsToWin=False,test=False) -> None:
+        assert numDice>=4
+        self.numDice = numDice
+        self.sides = sides
+        if not colLengths:
+            colLengths = getColLengths(test,sides)
+        self.colLengths = {x:colLengths[x] for x in sorted(colLengths)}
+        self.maxWhitePieces = maxWhitePieces
+        if not colsToWin:
+            colsToWin = 2 if test else 3
+        self.colsToWin = colsToWin
+        self.test = test
+        self.maxCol = max(self.colLengths)
+        self.diceTable = getDiceTable(numDice,sides)
+        self.packed = False
+    def __str__(self) -> str:
+        return f'<Rules obj> {self.numDice}d{self.sides}, cols = {self.colLengths}, white pieces = {self.maxWhitePieces}, cols to win = {self.colsToWin}'
+    def __eq__(self,other):
+        return self is other or (isinstance(other,Rules) and self.pack()==other.pack())
+    def isClassic(self):
+        '''
+        returns True if the game uses the usual 4 six-sided dice and columns 2 to 12, which game records need
+        '''
+        return self.numDice==4 and self.sides==6 and self.maxCol<=12
+    def pack(self):
+        '''
+        returns the rules as bytes for Board.snapshot(): RULES_HEADER, then the name and length of each col
+        '''
+        if self.packed:
+            return self.packed
+        data = bytearray(RULES_HEADER.pack(self.numDice,self.sides,self.maxWhitePieces,self.colsToWin,int(bool(self.test)),len(self.colLengths)))
+        for name,length in self.colLengths.items():
+            data += bytes((name,length))
+        self.packed = bytes(data)
+        return self.packed
+    @classmethod
+    def unpack(cls,data,offset=0):
+        '''
+        returns (Rules, offset after them) for rules packed by Rules.pack() at offset in data.
+        the same bytes always give the same Rules object (they are cached in RULES_CACHE).
+        '''
+        numCols = data[offset+RULES_HEADER.size-1]
+        end = offset+RULES_HEADER.size+2*numCols
+        packed = bytes(data[offset:end])
+        if packed not in RULES_CACHE:
+            numDice,sides,maxWhitePieces,colsToWin,test,numCols = RULES_HEADER.unpack_from(packed)
+            colLengths = {packed[RULES_HEADER.size+2*i]:packed[RULES_HEADER.size+2*i+1] for i in range(numCols)}
+            RULES_CACHE[packed] = cls(numDice,sides,colLengths,maxWhitePieces,colsToWin,bool(test))
+        return RULES_CACHE[packed],end
+class Board:
+    '''
+    Runs a Can't Stop game.
+    rng is an optional random.Random (see getGameRng) for the dice to roll with instead of the random module.
+    rules is an optional Rules object for variants. without it, the usual rules are used (or the short test ones if test is True).
+    '''
+    def __init__(self,playerStrList,test=False,rng=False,rules=False) -> None:
+        assert isinstance(playerStrList,list)
+        assert isinstance(playerStrList[0],str)
+        if not rules:
+            rules = Rules(test=test)
+        self.rules = rules
+        self.test = rules.test
+        self.playerStrList = playerStrList
+        self.players = []
+        self.activePlayer = False
+        self.colsWithWhitePieces = {}
+        self.maxWhitePieces = rules.maxWhitePieces
+        self.cols = {}
+        # the cols nobody has completed, as a dictionary and a getColsMask(), and the getColsMask() of colsWithWhitePieces.
+        # they are kept up to date as the game goes, so the playable cols never have to be searched for.
+        self.openCols = {}
+        self.openMask = 0
+        self.whiteMask = 0
+        self.colsToWin = rules.colsToWin
+        self.undoLog = False
+        self.record = False
+        self.instrumentation = False
+        self.zobrist = 0
+        self.setup(playerStrList)
+        self.dice = Dice(rng=rng,table=rules.diceTable)
+    def __str__(self) -> str:
+        return f"<Board Obj>\nactivePlayer = {self.activePlayer}\ncols = {self.cols}\ncolsWithWhitePieces = {self.colsWithWhitePieces}"
+    def didActivePlayerWin(self):
+        '''
+        returns True if active player won, and False otherwise
+        '''
+        assert isinstance(self.activePlayer,Player)
+        if len(self.activePlayer.doneCols)>=self.colsToWin:
+            return True
+        return False
+    def getWhitePieceCompletedCols(self):
+        '''
+        returns a list of the names(int) of cols that have a white piece which has completed the column
+        '''
+        cols = []
+        for col in self.colsWithWhitePieces.values():
+            assert isinstance(col,Col)
+            if col.whitePiece.space.isFinal:
+                cols.append(col.name)
+        if len(cols)==0:
+            return False
+        return cols
+    def getActivePlayerProgress(self):
+        '''
+        returns a dictionary with the progress info for the active player. 
+        format: {col.name : {'progress':distance progressed, 'outOf':number of spaces, 'isFinal':boolean of whether the col is complete}}
+        '''
+        assert isinstance(self.activePlayer,Player)
+        progress = {}
+        steps = self.activePlayer.progress
+        for col in self.cols.values():
+            if steps[col.name]:
+                space = col.spaces[steps[col.name]-1]
+                progress[col.name]={
+                    'progress':space.name,
+                    'outOf':len(col.spaces),
+                    'isFinal':space.isFinal}
+        if len(progress)==0:
+            return False
+        return progress
+    def setup(self,playersStrList):
+        '''
+        This function is only used by Board itself. Do not call from outside.
+        It sets up the Players and Columns so the game can play.
+        '''
+        for player in playersStrList:
+            self.players.append(Player(player,len(self.players),self.rules.maxCol+1))
+        self.activePlayer = self.players[0]
+        self.setCols()
+        self.zobrist = self.computeZobrist()
+    def setCols(self):
+        '''
+        This function is only used by Board itself. Do not call from outside.
+        It sets up the Columns and Spaces.
+        '''
+        for name,length in self.rules.colLengths.items():
+            self.cols[name]=Col(name,length)
+        self.resetMasks()
+    def resetMasks(self):
+        '''
+        works out self.openCols, self.openMask and self.whiteMask from scratch.
+        only needed after changing the cols directly, rather than through applySums, bomb and stopTurn.
+        '''
+        self.openCols = {name:col for name,col in self.cols.items() if not col.donePlayer}
+        self.openMask = getColsMask(self.openCols)
+        self.whiteMask = getColsMask(self.colsWithWhitePieces)
+    def nextActivePlayer(self):
+        '''
+        sets self.activePlayer to the next player in the list.
+        '''
+        if self.activePlayer:
+            if self.undoLog is not False:
+                self.undoLog.append(('next',self.zobrist,self.activePlayer))
+            i = self.activePlayer.index
+            j = (i+1) % len(self.players)
+            self.zobrist ^= getZobristKey('active',i)^getZobristKey('active',j)
+            self.activePlayer = self.players[j]
+    def whitePiecesLeft(self):
+        '''
+        returns the number of white pieces that have not been placed yet
+        '''
+        x=self.maxWhitePieces - len(self.colsWithWhitePieces)
+        if x <0:
+            x=0
+        return x
+    def applySums(self,chosenSums):
+        '''
+        chosenSums is a list of integers or False (bool). 
+        If False, self.bomb() is called and the function returns False.
+        Otherwise, the numbers in the list will have white pieces set(if necessary) and iterated by 1, and the function returns True.
+        '''
+        if self.record is not False:
+            self.record.addRoll(self.activePlayer.index,self.dice.index,chosenSums,len(self.colsWithWhitePieces))
+        if not chosenSums:
+            self.bomb()
+            return False
+        if self.undoLog is not False:
+            whitePieces = []
+            for sum in chosenSums:
+                col = self.cols[sum]
+                if col.whitePiece:
+                    whitePieces.append((col,col.whitePiece.space))
+                elif (col,False) not in whitePieces:
+                    whitePieces.append((col,False))
+            self.undoLog.append(('apply',self.zobrist,whitePieces))
+        self.setWhitePieces(chosenSums)
+        return True
+    def filterSums(self):
+        '''
+        returns a list of any integers from self.sums which are playable. 
+        if no sums are playable, returns False.
+        '''
+        playableMask = self.getPlayableMask()
+        if not self.dice.table.sumMasks[self.dice.index] & playableMask:
+            return False
+        return [list(x) for x in getFilteredSums(self.dice.index,playableMask,self.dice.table)]
+    def resolveSums(self,selectedSums):
+        '''
+        selectedSums is one of the lists returned by self.filterSums().
+        returns a list of the moves (each a list of sums) the active player can make with it.
+        usually that is just [selectedSums], but if there are not enough white pieces left 
+        for every new column, the sums that need a new white piece are dropped, and if one white piece 
+        is left, there is one move for each of those sums to choose from.
+        returns an empty list if nothing can be played.
+        '''
+        options = resolveSums(selectedSums,self.whiteMask,self.whitePiecesLeft())
+        return [list(x) for x in options]
+    def legalMoves(self):
+        '''
+        returns a tuple of every legal move for the current roll, each a sorted tuple of one or two sums.
+        returns an empty tuple if the roll bombs.
+        the board is not changed, and the result is shared between boards with the same roll and white pieces, 
+        so do not change it.
+        '''
+        dice = self.dice
+        key = (dice.index,self.getPlayableMask(),self.whiteMask,self.whitePiecesLeft())
+        moves = dice.table.legalMovesCache.get(key)
+        if moves is None:
+            moves = getLegalMoves(*key,dice.table)
+        return moves
+    def bustProbability(self):
+        '''
+        returns the chance (0 to 1) that the next roll bombs, given the current white pieces and completed cols.
+        '''
+        return getBustProbability(self.getPlayableMask(),self.dice.table)
+    def getPlayableCols(self):
+        '''
+        returns a dictionary of columns that are playable (not completed).
+        if there are no spare white pieces, returns only cols with white pieces.
+        the dictionary belongs to the board, so do not change it.
+        '''
+        if len(self.colsWithWhitePieces)>=self.maxWhitePieces:
+            return self.colsWithWhitePieces
+        return self.openCols
+    def getPlayableMask(self):
+        '''
+        returns the getColsMask() of self.getPlayableCols()
+        '''
+        if len(self.colsWithWhitePieces)>=self.maxWhitePieces:
+            return self.whiteMask
+        return self.openMask
+    def setWhitePieces(self,chosenSums):
+        '''
+        chosenSums is a list of integers(one or two). 
+        sets (if necessary) and iterates a white piece for each sum
+        '''
+        if len(chosenSums)==2 and chosenSums[0]==chosenSums[1]:
+            self.setWhitePieces([chosenSums[0]])
+            chosenSums.pop(0)
+        for sum in chosenSums:
+            if sum in self.colsWithWhitePieces.keys():
+                x = self.colsWithWhitePieces[sum]
+                assert isinstance(x,Col)
+                self.zobrist ^= x.zobrist
+                x.iterateWhitePieceByOne()
+            else:
+                x=self.cols[sum]
+                assert isinstance(x,Col)
+                self.zobrist ^= x.zobrist
+                x.setWhitePiece(self.activePlayer)
+                self.colsWithWhitePieces[sum] = self.cols[sum]
+                self.whiteMask |= 1<<sum
+            self.zobrist ^= x.zobrist
+    def bomb(self):
+        '''
+        clears out all white pieces from cols and clears self.colsWithWhitePieces.  
+        to be called when a player has bombed
+        '''
+        if self.undoLog is not False:
+            self.undoLog.append(('bomb',self.zobrist,self.colsWithWhitePieces,[col.whitePiece for col in self.colsWithWhitePieces.values()]))
+        for col in self.colsWithWhitePieces.values():
+            assert isinstance(col,Col)
+            self.zobrist ^= col.zobrist
+            col.clearWhitePiece()
+            self.zobrist ^= col.zobrist
+        self.colsWithWhitePieces={}
+        self.whiteMask = 0
+    def stopTurn(self):
+        '''
+        updates the markers for each white piece and clears out white pieces and colsWithWhitePieces.  
+        to be called when the player ends their turn on purpose
+        '''
+        if self.record is not False and self.colsWithWhitePieces:
+            self.record.markStop()
+        if self.undoLog is not False:
+            changes = []
+            for col in self.colsWithWhitePieces.values():
+                marker = col.getMarkerByPlayer(self.activePlayer)
+                changes.append((col,col.whitePiece,marker,marker and marker.space,col.donePlayer))
+            self.undoLog.append(('stop',self.zobrist,self.colsWithWhitePieces,changes))
+        for col in self.colsWithWhitePieces.values():
+            assert isinstance(col,Col)
+            if col.whitePiece:
+                self.zobrist ^= col.zobrist
+                col.setMarker()
+                col.clearWhitePiece()
+                self.zobrist ^= col.zobrist
+                if col.donePlayer and col.name in self.openCols:
+                    del self.openCols[col.name]
+                    self.openMask &= ~(1<<col.name)
+        self.colsWithWhitePieces={}
+        self.whiteMask = 0
+        if self.record is not False and self.didActivePlayerWin():
+            self.record.endGame(self.activePlayer.index)
+    def computeZobrist(self):
+        '''
+        returns the Zobrist hash of the board worked out from scratch. 
+        self.zobrist is kept equal to this as the board changes, so this is only needed to check it.
+        '''
+        zobrist = getZobristKey('active',self.activePlayer.index)
+        for col in self.cols.values():
+            zobrist ^= col.computeZobrist()
+        return zobrist
+    def recordGame(self):
+        '''
+        starts recording every roll, move, stop and the winner into a game_record.GameRecord.
+        returns the GameRecord, which is also kept in self.record.
+        game records only fit the usual dice and columns, so variants (see Rules.isClassic) raise a ValueError.
+        '''
+        from game_record import GameRecord
+        if not self.rules.isClassic():
+            raise ValueError('only games with the usual dice and columns can be recorded')
+        if self.record is False:
+            self.record = GameRecord(len(self.players))
+        return self.record
+    def instrument(self,instrumentation=False,sampleEvery=1,snapshotEvery=0,onSnapshot=None):
+        '''
+        starts counting and timing the phases of the game (see instrumentation.py).
+        instrumentation is an Instrumentation object to add to, otherwise a new one is made with the other arguments.
+        returns the Instrumentation object, which is also kept in self.instrumentation.
+        '''
+        from instrumentation import Instrumentation
+        if not instrumentation:
+            instrumentation = Instrumentation(sampleEvery,snapshotEvery,onSnapshot)
+        instrumentation.attach(self)
+        return instrumentation
+    def uninstrument(self):
+        '''
+        stops counting and timing, so the board runs at full speed again.
+        '''
+        if self.instrumentation:
+            self.instrumentation.detach(self)
+    def enableUndo(self):
+        '''
+        starts recording every change made by applySums, bomb, stopTurn and nextActivePlayer, so they can be undone.
+        '''
+        if self.undoLog is False:
+            self.undoLog = []
+    def undo(self):
+        '''
+        puts the board back the way it was before the last recorded change.
+        returns False if there is nothing to undo, and True otherwise.
+        '''
+        if not self.undoLog:
+            return False
+        record = self.undoLog.pop()
+        self.zobrist = record[1]
+        if record[0]=='next':
+            self.activePlayer = record[2]
+        elif record[0]=='apply':
+            for col,space in reversed(record[2]):
+                if space:
+                    col.whitePiece.space = space
+                else:
+                    col.whitePiece = False
+                    del self.colsWithWhitePieces[col.name]
+                    self.whiteMask &= ~(1<<col.name)
+                col.zobrist = col.computeZobrist()
+        elif record[0]=='bomb':
+            self.colsWithWhitePieces = record[2]
+            for col,whitePiece in zip(record[2].values(),record[3]):
+                col.whitePiece = whitePiece
+                col.zobrist = col.computeZobrist()
+            self.whiteMask = getColsMask(self.colsWithWhitePieces)
+        elif record[0]=='stop':
+            self.colsWithWhitePieces = record[2]
+            for col,whitePiece,marker,space,donePlayer in reversed(record[3]):
+                if not marker:
+                    col.removeMarker(whitePiece.player)
+                else:
+                    marker.space = space
+                    marker.player.progress[col.name] = space.name+1
+                if not donePlayer and col.donePlayer:
+                    col.donePlayer.doneCols.pop()
+                    col.donePlayer = False
+                col.whitePiece = whitePiece
+                col.zobrist = col.computeZobrist()
+            self.resetMasks()
+        return True
+    def undoTo(self,depth):
+        '''
+        undoes recorded changes until only depth of them are left in self.undoLog.
+        '''
+        while self.undoLog and len(self.undoLog)>depth:
+            self.undo()
+    def snapshot(self):
+        '''
+        returns the whole game (players, markers, white pieces, done cols, active player and dice) as a short byte string.
+        see readSnapshotHeader for the format. the undo log and game record are not included.
+        '''
+        data = bytearray(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC,SNAPSHOT_VERSION,int(bool(self.test)),len(self.players),
+            self.activePlayer.index,self.dice.index,len(self.colsWithWhitePieces)))
+        data += self.rules.pack()
+        for player in self.players:
+            name = player.name.encode()
+            data.append(len(name))
+            data += name
+        data += bytes(self.colsWithWhitePieces)
+        for col in self.cols.values():
+            data += col.getSteps(len(self.players))
+        return bytes(data)
+    def restore(self,data):
+        '''
+        data is a byte string from self.snapshot() of a game with the same number of players and Rules.
+        puts the board in the state it was in, reusing its Cols and Spaces,
+        and only rebuilding the Markers and white pieces of cols that are different in the snapshot.
+        the undo log (if any) is cleared, since its changes no longer apply.
+        '''
+        rules,names,active,diceIndex,whiteCols,offset = readSnapshotHeader(data)
+        if rules!=self.rules or len(names)!=len(self.players):
+            raise ValueError('the snapshot is from a different kind of game, use Board.fromSnapshot()')
+        self.playerStrList = names
+        for player,name in zip(self.players,names):
+            player.name = name
+            player.doneCols = []
+        self.activePlayer = self.players[active]
+        self.zobrist = getZobristKey('active',active)
+        numPlayers = len(self.players)
+        for col in self.cols.values():
+            steps = data[offset:offset+numPlayers+2]
+            offset += numPlayers+2
+            if col.getSteps(numPlayers)==steps and (not col.whitePiece or col.whitePiece.player is self.activePlayer):
+                if col.donePlayer:
+                    col.donePlayer.doneCols.append(col)
+                self.zobrist ^= col.zobrist
+                continue
+            for player in self.players:
+                player.progress[col.name] = 0
+            col.markers = []
+            col.markerByPlayer = {}
+            for i in range(numPlayers):
+                if steps[i]:
+                    col.addMarker(self.players[i],col.spaces[steps[i]-1])
+            col.whitePiece = False
+            if steps[-2]:
+                col.whitePiece = WhitePiece(self.activePlayer,col.spaces[steps[-2]-1])
+            col.donePlayer = False
+            if steps[-1]:
+                col.donePlayer = self.players[steps[-1]-1]
+                col.donePlayer.doneCols.append(col)
+            col.zobrist = col.computeZobrist()
+            self.zobrist ^= col.zobrist
+        self.colsWithWhitePieces = {x:self.cols[x] for x in whiteCols}
+        self.resetMasks()
+        self.dice.setOutcome(diceIndex)
+        if self.undoLog is not False:
+            self.undoLog = []
+    @classmethod
+    def fromSnapshot(cls,data):
+        '''
+        data is a byte string from Board.snapshot().
+        returns a new Board in the state of the snapshot.
+        '''
+        rules,names = readSnapshotHeader(data)[:2]
+        board = cls(names,rules=rules)
+        board.restore(data)
+        return board
+class Player:
+    '''
+    contains a player
+    '''
+    def __init__(self,name,index=0,numCols=13) -> None:
+        self.name=name
+        self.index=index
+        self.doneCols=[]
+        # progress[col name] is the step of the player's marker in the col: 0 for none, n for Space n-1
+        self.progress=bytearray(numCols)
+    def __str__(self) -> str:
+        return '<Player obj>' + self.name
+    def updateDoneCols(self,col):
+        '''
+        col is a Col object.  
+        adds col to self.doneCols.  
+        to be called when a player has ended a turn after completing a column
+        '''
+        if col not in self.doneCols:
+            self.doneCols.append(col)
+class Col:
+    '''
+    contains a single column
+    '''
+    def __init__(self,name,length) -> None:
+        assert isinstance(name,int)
+        assert isinstance(length,int)
+
+        self.name = name
+        self.spaces = {}
+        self.markers = []
+        # markerByPlayer[player index] is the player's Marker, for getMarkerByPlayer
+        self.markerByPlayer = {}
+        self.whitePiece = False
+        self.donePlayer = False
+        self.zobrist = 0
+        for x in range(length):
+            self.spaces[x]=Space(x)
+        self.spaces[length]=Space(length,True)
+    def __str__(self) -> str:
+        output=f"<Col obj>\nname = {self.name}\nspaces = {self.spaces}"
+        if len(self.markers) > 0:
+            output+=f"\nmarkers = {self.markers}"
+        if self.whitePiece:
+            output+=f"\nwhitePiece = {self.whitePiece}"
+        if self.donePlayer:
+            output+=f"\ndonePlayer = {self.donePlayer}"
+        return output
+    def setMarker(self):
+        '''
+        sets a or updates a player's marker to the space of the current white piece.
+        returns the player's marker
+        '''
+        if self.whitePiece:
+            assert isinstance(self.whitePiece,WhitePiece)
+            player = self.whitePiece.player
+            marker = self.getMarkerByPlayer(player)
+            if marker:
+                self.zobrist ^= getZobristKey('marker',player.index,self.name,marker.space.name)
+                marker.updateSpace(self.whitePiece.space)
+                player.progress[self.name] = marker.space.name+1
+            else:
+                marker = self.addMarker(player,self.whitePiece.space)
+            self.zobrist ^= getZobristKey('marker',player.index,self.name,marker.space.name)
+            if marker.space.isFinal:
+                self.done()
+            return marker
+    def getMarkerByPlayer(self,player):
+        '''
+        player is a Player object.
+        returns the marker of the player object.
+        if no marker, returns false.
+        '''
+        return self.markerByPlayer.get(player.index,False)
+    def addMarker(self,player,space):
+        '''
+        player is a Player object without a marker in this col, and space is one of this col's Spaces.
+        adds and returns a Marker for them. does not change self.zobrist.
+        '''
+        marker = Marker(player,space)
+        self.markers.append(marker)
+        self.markerByPlayer[player.index] = marker
+        player.progress[self.name] = space.name+1
+        return marker
+    def removeMarker(self,player):
+        '''
+        player is a Player object. takes their marker off this col (used by Board.undo). does not change self.zobrist.
+        '''
+        marker = self.markerByPlayer.pop(player.index)
+        self.markers.remove(marker)
+        player.progress[self.name] = 0
+    def done(self):
+        '''
+        only to be called by a Col object
+        if a player has completed a column and ended the turn, this updates the col's donePlayer and the players doneCols.
+        '''
+        assert isinstance(self.whitePiece,WhitePiece)
+        self.donePlayer = self.whitePiece.player
+        self.donePlayer.updateDoneCols(self)
+        self.zobrist ^= getZobristKey('done',self.name,self.donePlayer.index)
+    def iterateWhitePieceByOne(self):
+        '''
+        moves the Col's whitePiece up one Space, unless there are no more Spaces
+        '''
+        assert isinstance(self.whitePiece,WhitePiece)
+        if self.whitePiece.space.isFinal:
+            return
+        nextSpaceName = self.whitePiece.space.name + 1
+        self.zobrist ^= getZobristKey('white',self.name,nextSpaceName-1)^getZobristKey('white',self.name,nextSpaceName)
+        self.whitePiece.space = self.spaces[nextSpaceName]
+        assert isinstance(self.whitePiece.space,Space)
+    def setWhitePiece(self,player):
+        '''
+        player is a Player object. 
+        sets a white piece for this column and player either ahead of their current 
+        marker or at the start of the column.
+        '''
+        marker = self.getMarkerByPlayer(player)
+        if not marker:
+            self.whitePiece = WhitePiece(player,self.spaces[0])
+        else:
+            self.whitePiece = WhitePiece(player,marker.space)
+        self.zobrist ^= getZobristKey('white',self.name,self.whitePiece.space.name)
+        if marker:
+            self.iterateWhitePieceByOne()
+    def clearWhitePiece(self):
+        '''
+        takes the white piece off this column.
+        '''
+        if self.whitePiece:
+            self.zobrist ^= getZobristKey('white',self.name,self.whitePiece.space.name)
+            self.whitePiece = False
+    def getSteps(self,numPlayers):
+        '''
+        returns this col for Board.snapshot(): a byte for each player's marker and one for the white piece 
+        (0 for none, n for Space n-1), then a byte for the player who completed it (0 for none, n for player index n-1).
+        '''
+        steps = bytearray(numPlayers+2)
+        for marker in self.markers:
+            steps[marker.player.index] = marker.space.name+1
+        if self.whitePiece:
+            steps[-2] = self.whitePiece.space.name+1
+        if self.donePlayer:
+            steps[-1] = self.donePlayer.index+1
+        return steps
+    def computeZobrist(self):
+        '''
+        returns the Zobrist hash of this column's markers, white piece and donePlayer, worked out from scratch.
+        self.zobrist is kept equal to this as the column changes.
+        '''
+        zobrist = 0
+        for marker in self.markers:
+            zobrist ^= getZobristKey('marker',marker.player.index,self.name,marker.space.name)
+        if self.whitePiece:
+            zobrist ^= getZobristKey('white',self.name,self.whitePiece.space.name)
+        if self.donePlayer:
+            zobrist ^= getZobristKey('done',self.name,self.donePlayer.index)
+        return zobrist
+class Marker:
+    '''
+    contains a player's marker in a Col
+    '''
+    def __init__(self,player,space) -> None:
+        assert isinstance(player,Player)
+        assert isinstance(space,Space)
+        self.objType = 'Marker'
+        self.player = player
+        self.space = space
+    def __str__(self) -> str:
+        output = f"<{self.objType} obj>\nplayer = {self.player}\nspace = {self.space}"
+        if self.space.isFinal:
+            output+=f"\nisFinal"
+        return output
+    def updateSpace(self,space):
+        '''
+        space is a Space object. 
+        sets self.space to space, as long as we aren't moving backwards
+        '''
+        assert isinstance(space,Space)
+        if space.name<self.space.name:
+            return
+        self.space = space
+class WhitePiece(Marker):
+    '''
+    contains a player's white piece in a col
+    '''
+    def __init__(self, player, space) -> None:
+        super().__init__(player, space)
+class Space:
+    '''
+    contains a space within a col
+    '''
+    def __init__(self,name,isFinal=False) -> None:
+        self.name = name
+        self.isFinal = isFinal
+    def __str__(self) -> str:
+        return '<Space obj>: ' +str(self.name) + ' ' + str(self.isFinal)      
+class Dice:
+    '''
+    contains 4 dice and their pairs of sums.
+    self.dice is a sorted tuple of the 4 dice, self.sums is a tuple of sorted sum pairs,
+    and self.index is the position of the roll in DICE_OUTCOMES.
+    if batchSize is given, rolls are drawn batchSize at a time by weighted sampling of DICE_OUTCOMES, 
+    which is faster when a simulation rolls many times.
+    rng is an optional random.Random to roll with instead of the random module, so games can be repeated exactly.
+    table is an optional DiceTable for other dice (see Rules). then self.index is the position of the roll in table.outcomes.
+    '''
+    def __init__(self,batchSize=0,rng=False,table=False) -> None:
+        self.dice = ()
+        self.sums = ()
+        self.index = 0
+        self.table = table or CLASSIC_DICE
+        self.outcomes = self.table.outcomes
+        self.sumsByOutcome = self.table.sums
+        self.batchSize = batchSize
+        self.batch = []
+        self.random = random
+        self.choices = choices
+        if rng:
+            self.random = rng.random
+            self.choices = rng.choices
+        self.roll()
+    def roll(self):
+        '''
+        sets the self.dice and self.sums. 
+        returns the tuple of dice.
+        dice rolls are random D6 rolls. there are 4 dice.
+        sums are all possible ways to split 4 dice into two sums of two dice each.
+        rolls given to setBuffer are used first.
+        '''
+        if self.batch:
+            return self.setOutcome(self.batch.pop())
+        if self.batchSize:
+            self.batch = self.choices(self.table.indexes,cum_weights=self.table.cumWeights,k=self.batchSize)
+            return self.setOutcome(self.batch.pop())
+        return self.setOutcome(self.table.rolls[int(self.random()*self.table.total)])
+    def setBuffer(self,rolls):
+        '''
+        rolls is a sequence of pre-generated rolls: indexes in DICE_OUTCOMES, or rows of 4 dice 
+        (a NumPy array of either works, see batch_sim.rollBuffer).
+        the next calls to roll() use these rolls in order, and once they run out roll() goes back to rolling.
+        '''
+        if hasattr(rolls,'tolist'):
+            rolls = rolls.tolist()
+        rolls = list(rolls)
+        if rolls and not isinstance(rolls[0],int):
+            rolls = [self.table.index[tuple(sorted(x))] for x in rolls]
+        rolls.reverse()
+        self.batch = rolls
+    def setOutcome(self,index):
+        '''
+        index is the position of a roll in DICE_OUTCOMES.
+        sets self.dice and self.sums to that roll and returns the tuple of dice.
+        '''
+        self.index = index
+        self.dice = self.outcomes[index]
+        self.sums = self.sumsByOutcome[index]
+        return self.dice
+    def setSums(self):
+        '''
+        sets and returns the self.sums based on the dice
+        '''
+        self.setOutcome(self.table.index[tuple(sorted(self.dice))])
+        return self.sums
+class DiceTable:
+    '''
+    contains every sorted roll of numDice dice with sides sides, worked out once by going through every ordered roll:
+    outcomes is the list of sorted rolls, and for each: sums is getSums() of it, sumMasks is a getColsMask() of every sum
+    it can make, and weights is how many of the total ordered rolls give it. index is {sorted roll : position in outcomes}.
+    rolls[i] is the position in outcomes of the i-th ordered roll, and indexes and cumWeights are for weighted sampling.
+    bustCache, filterCache and legalMovesCache hold the results of getBustProbability, getFilteredSums and getLegalMoves.
+    use getDiceTable() rather than making these, so they are shared.
+    '''
+    def __init__(self,numDice=4,sides=6) -> None:
+        self.numDice = numDice
+        self.sides = sides
+        self.total = sides**numDice
+        self.outcomes = []
+        self.sums = []
+        self.sumMasks = []
+        self.weights = []
+        self.index = {}
+        self.rolls = []
+        self.bustCache = {}
+        self.filterCache = {}
+        self.legalMovesCache = {}
+        for roll in product(range(1,sides+1),repeat=numDice):
+            dice = tuple(sorted(roll))
+            if dice not in self.index:
+                self.index[dice]=len(self.outcomes)
+                self.outcomes.append(dice)
+                self.sums.append(getSums(dice))
+                self.sumMasks.append(getColsMask([y for x in self.sums[-1] for y in x]))
+                self.weights.append(0)
+            self.weights[self.index[dice]]+=1
+            self.rolls.append(self.index[dice])
+        self.indexes = list(range(len(self.outcomes)))
+        self.cumWeights = list(accumulate(self.weights))
+    def __str__(self) -> str:
+        return f'<DiceTable obj> {self.numDice}d{self.sides}, outcomes = {len(self.outcomes)}'
+
+def getDiceTable(numDice=4,sides=6):
+    '''
+    returns the DiceTable for numDice dice with sides sides, making it the first time (they are cached in DICE_TABLES).
+    '''
+    key = (numDice,sides)
+    if key not in DICE_TABLES:
+        DICE_TABLES[key] = DiceTable(numDice,sides)
+    return DICE_TABLES[key]
+def getSums(dice):
+    '''
+    dice is a sorted sequence of 4 or more dice.
+    returns a sorted tuple of every way to pick two pairs of the dice and add each pair up, each as a sorted tuple.
+    with 4 dice, that is every way to split the dice into two sums.
+    '''
+    sums=[]
+    n=len(dice)
+    for a in range(n):
+        for b in range(a+1,n):
+            for c in range(n):
+                for d in range(c+1,n):
+                    if c in (a,b) or d in (a,b):
+                        continue
+                    sum1 = dice[a]+dice[b]
+                    sum2 = dice[c]+dice[d]
+                    sumset = (min(sum1,sum2),max(sum1,sum2))
+                    if sumset not in sums:
+                        sums.append(sumset)
+    sums.sort()
+    return tuple(sums)
+def getGameRng(seed,*path):
+    '''
+    returns a random.Random for one stream of random numbers, such as ('dice', game number) or ('seat', game number, seat).
+    each stream is seeded from the seed and its path alone, so a game plays out the same
+    no matter which process plays it or how many games came before it.
+    '''
+    return Random(':'.join(str(x) for x in (seed,)+path))
+def getZobristKey(*parts):
+    '''
+    parts describe one thing on the board: ('marker',player index,col name,space name), ('white',col name,space name),
+    ('done',col name,player index) or ('active',player index).
+    returns the random 64 bit number used for it in Zobrist hashes. 
+    the numbers are seeded from the parts, so they are the same in every process, and cached in ZOBRIST_KEYS.
+    '''
+    key = ZOBRIST_KEYS.get(parts)
+    if key is None:
+        key = ZOBRIST_KEYS[parts] = Random(repr(parts)).getrandbits(64)
+    return key
+def readSnapshotHeader(data):
+    '''
+    data is a byte string from Board.snapshot(). Its format is:
+        SNAPSHOT_HEADER - magic, version, test, number of players, active player index, dice outcome index, number of white pieces
+        the game's Rules.pack()
+        each player's name, as a length byte then UTF-8
+        the col names with white pieces, in the order they were placed
+        for each col: Col.getSteps()
+    version 1 snapshots, from before Rules, have a one byte dice outcome index (SNAPSHOT_HEADER_V1) and no Rules,
+    and are read as the usual (or test) rules.
+    returns (Rules, player names, active player index, dice outcome index, white piece col names, offset of the cols)
+    '''
+    if len(data)<SNAPSHOT_HEADER_V1.size or data[:4]!=SNAPSHOT_MAGIC:
+        raise ValueError('not a Can\'t Stop board snapshot')
+    version = data[4]
+    if version==1:
+        magic,version,test,numPlayers,active,diceIndex,numWhite = SNAPSHOT_HEADER_V1.unpack_from(data)
+        rules = Rules(test=bool(test))
+        offset = SNAPSHOT_HEADER_V1.size
+    elif version==SNAPSHOT_VERSION:
+        magic,version,test,numPlayers,active,diceIndex,numWhite = SNAPSHOT_HEADER.unpack_from(data)
+        rules,offset = Rules.unpack(data,SNAPSHOT_HEADER.size)
+    else:
+        raise ValueError(f'board snapshot version {version} is not supported (expected {SNAPSHOT_VERSION})')
+    names = []
+    for x in range(numPlayers):
+        end = offset+1+data[offset]
+        names.append(data[offset+1:end].decode())
+        offset = end
+    whiteCols = data[offset:offset+numWhite]
+    return rules,names,active,diceIndex,list(whiteCols),offset+numWhite
+def getColsMask(cols):
+    '''
+    cols is an iterable of col names(int).
+    returns an integer with bit number col name set for each col.
+    '''
+    mask = 0
+    for x in cols:
+        mask |= 1<<x
+    return mask
+def getBustProbability(playableMask,table=False):
+    '''
+    playableMask is a getColsMask() of the playable cols, and table is the DiceTable (the usual 4 dice if not given).
+    returns the chance (0 to 1) that the next roll has no playable sums.
+    results are cached in the table's bustCache (BUST_CACHE for the usual dice), so each mask only goes through the dice table once.
+    '''
+    table = table or CLASSIC_DICE
+    cache = table.bustCache
+    if playableMask in cache:
+        return cache[playableMask]
+    busts = 0
+    for i in range(len(table.outcomes)):
+        if not table.sumMasks[i] & playableMask:
+            busts += table.weights[i]
+    cache[playableMask] = busts/table.total
+    return cache[playableMask]
+def resolveSums(selectedSums,whiteMask,whitePiecesLeft):
+    '''
+    selectedSums is a list of one or two playable sums from the same pair of dice.
+    whiteMask is a getColsMask() of the cols with white pieces.
+    returns a list of the moves (each a sorted tuple of sums) that can be made with it.
+    usually that is just the whole pair, but if there are not enough white pieces left 
+    for every new column, the sums that need a new white piece are dropped, and if one white piece 
+    is left, there is one move for each of those sums to choose from.
+    returns an empty list if nothing can be played.
+    '''
+    newWhitePieces = [x for x in selectedSums if not whiteMask>>x & 1]
+    #could be 2:1(same int twice)-play both,2:1(different ints)-choose one,2:0-remove, or 1:0-remove
+    if len(newWhitePieces)<=whitePiecesLeft or (whitePiecesLeft!=0 and newWhitePieces[0]==newWhitePieces[1]):
+        return [tuple(selectedSums)]
+    kept = [x for x in selectedSums if x not in newWhitePieces]
+    if whitePiecesLeft==1:
+        return [tuple(sorted(kept+[x])) for x in newWhitePieces]
+    if len(kept)==0:
+        return []
+    return [tuple(kept)]
+def getFilteredSums(index,playableMask,table=False):
+    '''
+    index is the position of the roll in the DiceTable table (DICE_OUTCOMES if not given) and playableMask is a getColsMask() of the playable cols.
+    returns a tuple with a tuple of the playable sums of each pair in the roll's sums that has any, like Board.filterSums.
+    results are cached in the table's filterCache (FILTER_CACHE for the usual dice).
+    '''
+    table = table or CLASSIC_DICE
+    key = (index,playableMask)
+    sums = table.filterCache.get(key)
+    if sums is None:
+        sums = []
+        for pair in table.sums[index]:
+            selectedSums = tuple(x for x in pair if playableMask>>x & 1)
+            if selectedSums:
+                sums.append(selectedSums)
+        sums = table.filterCache[key] = tuple(sums)
+    return sums
+def getLegalMoves(index,playableMask,whiteMask,whitePiecesLeft,table=False):
+    '''
+    index is the position of the roll in the DiceTable table (DICE_OUTCOMES if not given).
+    playableMask and whiteMask are getColsMask()s of the playable cols and the cols with white pieces.
+    returns a tuple of every legal move (a sorted tuple of one or two sums), without repeats.
+    a sum whose white piece has already reached the end of its column can still be played, 
+    the same as in Board.applySums, but it does not move.
+    results are cached in the table's legalMovesCache (LEGAL_MOVES_CACHE for the usual dice).
+    '''
+    table = table or CLASSIC_DICE
+    key = (index,playableMask,whiteMask,whitePiecesLeft)
+    moves = table.legalMovesCache.get(key)
+    if moves is not None:
+        return moves
+    moves = []
+    for pair in table.sums[index]:
+        selectedSums = [x for x in pair if playableMask>>x & 1]
+        if len(selectedSums)!=0:
+            for move in resolveSums(selectedSums,whiteMask,whitePiecesLeft):
+                if move not in moves:
+                    moves.append(move)
+    moves = tuple(moves)
+    table.legalMovesCache[key] = moves
+    return moves
+SNAPSHOT_MAGIC = b'CSBS'
+SNAPSHOT_VERSION = 2
+# the dice outcome index is 2 bytes, since some dice have more than 256 sorted rolls
+SNAPSHOT_HEADER = struct.Struct('<4sBBBBHB')
+SNAPSHOT_HEADER_V1 = struct.Struct('<4sBBBBBB')
+# number of dice, sides, white pieces, cols to win, test, number of cols
+RULES_HEADER = struct.Struct('<BBBBBB')
+# {Rules.pack() bytes : Rules}, filled by Rules.unpack()
+RULES_CACHE = {}
+# {(number of dice, sides) : DiceTable}, filled by getDiceTable()
+DICE_TABLES = {}
+CLASSIC_DICE = getDiceTable(4,6)
+# the usual 4 dice: every sorted roll (126 of them), and for each: its sums, and how many of the 1296 ordered rolls give it.
+DICE_OUTCOMES = CLASSIC_DICE.outcomes
+DICE_SUMS = CLASSIC_DICE.sums
+# DICE_SUM_MASKS[i] is a getColsMask() of every sum that can be made from DICE_OUTCOMES[i].
+DICE_SUM_MASKS = CLASSIC_DICE.sumMasks
+DICE_WEIGHTS = CLASSIC_DICE.weights
+DICE_INDEX = CLASSIC_DICE.index
+# DICE_ROLLS[i] is the position in DICE_OUTCOMES of the i-th of the 1296 ordered rolls.
+DICE_ROLLS = CLASSIC_DICE.rolls
+DICE_INDEXES = CLASSIC_DICE.indexes
+DICE_CUM_WEIGHTS = CLASSIC_DICE.cumWeights
+# {parts : random 64 bit number}, filled by getZobristKey()
+ZOBRIST_KEYS = {}
+# {playable cols mask : chance of bombing}, filled by getBustProbability()
+BUST_CACHE = CLASSIC_DICE.bustCache
+# {(roll index, playable cols mask, white piece cols mask, white pieces left) : legal moves}, filled by getLegalMoves()
+LEGAL_MOVES_CACHE = CLASSIC_DICE.legalMovesCache
+# {(roll index, playable cols mask) : playable sums of each pair}, filled by getFilteredSums()
+FILTER_CACHE = CLASSIC_DICE.filterCache
@@ -0,0 +1,214 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This file records games in a compact binary format. Every roll is stored as one 4 byte record:
+    seat    - the index of the player who rolled
+    outcome - the roll's position in game_classes.DICE_OUTCOMES
+    move    - the sums played, packed as (first sum << 4) | second sum, or 0 if the roll bombed
+    flags   - BUST, STOP (the player stopped after this roll), WIN (the game ended with this roll),
+              and in the top 4 bits the number of white pieces placed before the roll
+
+Games are appended to a data file, one after another, and a separate index file holds one
+16 byte entry per game (first record number, number of records, number of players, winner), so
+a reader can go straight to game N without reading the ones before it. Writers only fsync every
+syncEvery games, so recording millions of games does not wait on the disk after each one, and a
+game's index entry is only written once its records are on disk.
+'''
+
+import os
+import struct
+from game_classes import DICE_OUTCOMES
+
+DATA_MAGIC = b'CSGR'
+INDEX_MAGIC = b'CSGI'
+VERSION = 1
+HEADER_SIZE = 8
+RECORD_SIZE = 4
+INDEX_ENTRY = struct.Struct('<QIBBH')
+NO_WINNER = 0xFF
+
+BUST = 1
+STOP = 2
+WIN = 4
+
+def packMove(sums):
+    '''
+    sums is a list or tuple of one or two sums, or False for a bomb.
+    returns the move byte of a roll record.
+    '''
+    if not sums:
+        return 0
+    if len(sums)==1:
+        return sums[0]<<4
+    return (sums[0]<<4)|sums[1]
+def unpackMove(move):
+    '''
+    returns the tuple of sums for a move byte (an empty tuple for a bomb).
+    '''
+    if move & 15:
+        return (move>>4,move & 15)
+    if move:
+        return (move>>4,)
+    return ()
+class GameRecord:
+    '''
+    contains the roll records of one game.
+    a Board with its record attribute set to a GameRecord adds to it in applySums and stopTurn.
+    '''
+    def __init__(self,numPlayers,data=b'',winner=-1) -> None:
+        self.numPlayers = numPlayers
+        self.data = bytearray(data)
+        self.winner = winner
+    def __str__(self) -> str:
+        return f'<GameRecord obj> players = {self.numPlayers}, rolls = {len(self)}, winner = {self.winner}'
+    def __len__(self):
+        return len(self.data)//RECORD_SIZE
+    def addRoll(self,seat,outcome,sums,whitePieces):
+        '''
+        seat is the index of the player who rolled, outcome is the roll's index in DICE_OUTCOMES,
+        sums is the move played (False for a bomb) and whitePieces is the number placed before the roll.
+        '''
+        flags = (whitePieces<<4)
+        if not sums:
+            flags |= BUST
+        self.data += bytes((seat,outcome,packMove(sums),flags))
+    def markStop(self):
+        '''
+        marks that the player stopped after the last roll
+        '''
+        if self.data:
+            self.data[-1] |= STOP
+    def endGame(self,winner):
+        '''
+        winner is the seat of the player who won.
+        '''
+        self.winner = winner
+        if self.data:
+            self.data[-1] |= WIN
+    def events(self):
+        '''
+        yields a tuple for each roll: (seat, dice, sums, busted, stopped, won, white pieces placed before the roll)
+        '''
+        for i in range(0,len(self.data),RECORD_SIZE):
+            seat,outcome,move,flags = self.data[i:i+RECORD_SIZE]
+            yield (seat,DICE_OUTCOMES[outcome],unpackMove(move),bool(flags & BUST),bool(flags & STOP),bool(flags & WIN),flags>>4)
+def openLogFile(path,magic):
+    '''
+    opens a log file for appending, writing its header if it is new, and checks the header if it is not.
+    '''
+    f = open(path,'a+b')
+    f.seek(0)
+    header = f.read(HEADER_SIZE)
+    if not header:
+        f.write(magic+struct.pack('<BBxx',VERSION,RECORD_SIZE))
+    elif header[:4]!=magic or header[4]!=VERSION:
+        f.close()
+        raise ValueError(f'{path} is not a version {VERSION} Can\'t Stop game log')
+    return f
+class GameLogWriter:
+    '''
+    appends games to the log at path (and its index at path + '.idx').
+    the files are synced to disk every syncEvery games and when the writer is closed. until then the
+    index entries are kept in pending, so readers only see games that have been synced.
+    '''
+    def __init__(self,path,syncEvery=1000) -> None:
+        self.path = path
+        self.syncEvery = syncEvery
+        self.unsynced = 0
+        self.pending = bytearray()
+        self.data = openLogFile(path,DATA_MAGIC)
+        self.index = openLogFile(path+'.idx',INDEX_MAGIC)
+        self.nextRecord = self.recover()
+    def __enter__(self):
+        return self
+    def __exit__(self,*args):
+        self.close()
+    def writeGame(self,record):
+        '''
+        record is a GameRecord. appends it to the log.
+        '''
+        assert isinstance(record,GameRecord)
+        self.data.write(record.data)
+        winner = NO_WINNER if record.winner<0 else record.winner
+        self.pending += INDEX_ENTRY.pack(self.nextRecord,len(record),record.numPlayers,winner,0)
+        self.nextRecord += len(record)
+        self.unsynced += 1
+        if self.unsynced>=self.syncEvery:
+            self.sync()
+    def sync(self):
+        '''
+        writes everything so far to disk. the pending index entries are only written once the data file
+        has been synced, so the index never points at games that are not on disk.
+        '''
+        self.data.flush()
+        os.fsync(self.data.fileno())
+        self.index.write(self.pending)
+        self.index.flush()
+        os.fsync(self.index.fileno())
+        self.pending = bytearray()
+        self.unsynced = 0
+    def recover(self):
+        '''
+        cuts off whatever an earlier writer left half written: index entries that are not whole or point past 
+        the end of the data, and records after the last game in the index (which no reader can get to). 
+        returns the number of records left in the data file, which is where the next game goes.
+        This function is only used by GameLogWriter itself. Do not call from outside.
+        '''
+        self.data.seek(0,os.SEEK_END)
+        records = (self.data.tell()-HEADER_SIZE)//RECORD_SIZE
+        self.index.seek(0,os.SEEK_END)
+        games = (self.index.tell()-HEADER_SIZE)//INDEX_ENTRY.size
+        nextRecord = 0
+        while games:
+            self.index.seek(HEADER_SIZE+(games-1)*INDEX_ENTRY.size)
+            first,count,numPlayers,winner,reserved = INDEX_ENTRY.unpack(self.index.read(INDEX_ENTRY.size))
+            if first+count<=records:
+                nextRecord = first+count
+                break
+            games -= 1
+        self.index.truncate(HEADER_SIZE+games*INDEX_ENTRY.size)
+        self.data.truncate(HEADER_SIZE+nextRecord*RECORD_SIZE)
+        return nextRecord
+    def close(self):
+        if not self.data.closed:
+            self.sync()
+            self.data.close()
+            self.index.close()
+class GameLogReader:
+    '''
+    reads games from the log at path by their number, without reading the games before them.
+    '''
+    def __init__(self,path) -> None:
+        self.path = path
+        self.data = open(path,'rb')
+        self.index = open(path+'.idx','rb')
+        for f,magic in ((self.data,DATA_MAGIC),(self.index,INDEX_MAGIC)):
+            header = f.read(HEADER_SIZE)
+            if header[:4]!=magic or header[4]!=VERSION:
+                raise ValueError(f'{path} is not a version {VERSION} Can\'t Stop game log')
+        self.index.seek(0,os.SEEK_END)
+        self.numGames = (self.index.tell()-HEADER_SIZE)//INDEX_ENTRY.size
+    def __enter__(self):
+        return self
+    def __exit__(self,*args):
+        self.close()
+    def __len__(self):
+        return self.numGames
+    def __iter__(self):
+        for n in range(self.numGames):
+            yield self.readGame(n)
+    def readGame(self,n):
+        '''
+        returns game number n (counting from 0) as a GameRecord.
+        '''
+        if not 0<=n<self.numGames:
+            raise IndexError(f'game {n} is not in {self.path}')
+        self.index.seek(HEADER_SIZE+n*INDEX_ENTRY.size)
+        first,count,numPlayers,winner,reserved = INDEX_ENTRY.unpack(self.index.read(INDEX_ENTRY.size))
+        self.data.seek(HEADER_SIZE+first*RECORD_SIZE)
+        data = self.data.read(count*RECORD_SIZE)
+        return GameRecord(numPlayers,data,-1 if winner==NO_WINNER else winner)
+    def close(self):
+        self.data.close()
+        self.index.close()
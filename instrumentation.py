@@ -0,0 +1,150 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This file counts and times the phases of a Board's game: roll, filter (filterSums and
+legalMoves), apply (applySums), stop (stopTurn), bomb and rotate (nextActivePlayer).
+
+Board itself has no timing code, so a board that is not instrumented runs exactly as fast as
+before. Instrumentation.attach() wraps the phase methods of one Board (and its Dice) by setting
+instance attributes over the class methods, and detach() deletes them again.
+
+Every call is counted, but only every sampleEvery'th call of a phase is timed, so it can be
+left on in long simulations. One Instrumentation can be attached to many boards (one per
+game, say) and its totals can be merged with other processes' totals. If snapshotEvery is
+given, onSnapshot is called with stats() at most once every snapshotEvery seconds.
+
+Phases can run inside each other: applySums(False) calls bomb, so a bomb is also counted as
+an apply.
+'''
+
+import time
+
+# (phase, 'board' or 'dice', method name)
+PHASE_METHODS = [
+    ('roll','dice','roll'),
+    ('filter','board','filterSums'),
+    ('filter','board','legalMoves'),
+    ('apply','board','applySums'),
+    ('stop','board','stopTurn'),
+    ('bomb','board','bomb'),
+    ('rotate','board','nextActivePlayer'),
+]
+PHASES = ['roll','filter','apply','stop','bomb','rotate']
+
+class PhaseStats:
+    '''
+    contains the totals for one phase.
+    calls counts every call, and sampled, totalNs and maxNs only cover the calls that were timed.
+    '''
+    __slots__ = ('calls','sampled','totalNs','maxNs')
+    def __init__(self) -> None:
+        self.calls = 0
+        self.sampled = 0
+        self.totalNs = 0
+        self.maxNs = 0
+    def __str__(self) -> str:
+        return f'<PhaseStats obj> calls = {self.calls}, mean = {self.meanUs():.3f}us, max = {self.maxNs/1000:.3f}us'
+    def __getstate__(self):
+        return (self.calls,self.sampled,self.totalNs,self.maxNs)
+    def __setstate__(self,state):
+        self.calls,self.sampled,self.totalNs,self.maxNs = state
+    def meanUs(self):
+        '''
+        returns the average time of a timed call in microseconds
+        '''
+        return self.totalNs/max(self.sampled,1)/1000
+    def estimatedTotalMs(self):
+        '''
+        returns an estimate of the time spent in every call (timed or not) in milliseconds
+        '''
+        return self.meanUs()*self.calls/1000
+    def merge(self,other):
+        self.calls += other.calls
+        self.sampled += other.sampled
+        self.totalNs += other.totalNs
+        self.maxNs = max(self.maxNs,other.maxNs)
+class Instrumentation:
+    '''
+    counts and times the phases of the boards it is attached to.
+    phases is a dictionary of {phase name : PhaseStats}.
+    '''
+    def __init__(self,sampleEvery=1,snapshotEvery=0,onSnapshot=None) -> None:
+        assert sampleEvery>=1
+        self.sampleEvery = sampleEvery
+        self.snapshotEvery = snapshotEvery
+        self.onSnapshot = onSnapshot
+        self.lastSnapshot = time.monotonic()
+        self.phases = {x:PhaseStats() for x in PHASES}
+    def __str__(self) -> str:
+        return '<Instrumentation obj>\n' + '\n'.join(f'{x} = {y}' for x,y in self.phases.items())
+    def __getstate__(self):
+        # the snapshot callback may not be picklable, so only the totals are sent between processes
+        return {'sampleEvery':self.sampleEvery,'phases':self.phases}
+    def __setstate__(self,state):
+        self.__init__(state['sampleEvery'])
+        self.phases = state['phases']
+    def attach(self,board):
+        '''
+        board is a Board object. starts counting and timing its phases.
+        '''
+        if board.instrumentation:
+            board.instrumentation.detach(board)
+        for phase,owner,name in PHASE_METHODS:
+            target = board.dice if owner=='dice' else board
+            setattr(target,name,self.wrap(self.phases[phase],getattr(target,name)))
+        board.instrumentation = self
+    def detach(self,board):
+        '''
+        board is a Board object. puts its phase methods back to the plain (uninstrumented) ones.
+        '''
+        for phase,owner,name in PHASE_METHODS:
+            target = board.dice if owner=='dice' else board
+            target.__dict__.pop(name,None)
+        board.instrumentation = False
+    def wrap(self,stats,method):
+        '''
+        This function is only used by Instrumentation itself. Do not call from outside.
+        returns a function that counts and (every sampleEvery calls) times calls to method.
+        '''
+        sampleEvery = self.sampleEvery
+        perfCounter = time.perf_counter_ns
+        def wrapper(*args):
+            stats.calls += 1
+            if stats.calls % sampleEvery:
+                return method(*args)
+            start = perfCounter()
+            result = method(*args)
+            elapsed = perfCounter()-start
+            stats.sampled += 1
+            stats.totalNs += elapsed
+            if elapsed>stats.maxNs:
+                stats.maxNs = elapsed
+            if self.snapshotEvery:
+                self.checkSnapshot()
+            return result
+        return wrapper
+    def checkSnapshot(self):
+        '''
+        calls onSnapshot with stats() if snapshotEvery seconds have passed since the last snapshot
+        '''
+        now = time.monotonic()
+        if now-self.lastSnapshot>=self.snapshotEvery:
+            self.lastSnapshot = now
+            if self.onSnapshot:
+                self.onSnapshot(self.stats())
+    def stats(self):
+        '''
+        returns a dictionary of {phase name : {'calls', 'sampled', 'meanUs', 'maxUs', 'estimatedTotalMs'}}
+        '''
+        return {name:{'calls':x.calls,'sampled':x.sampled,'meanUs':x.meanUs(),'maxUs':x.maxNs/1000,
+            'estimatedTotalMs':x.estimatedTotalMs()} for name,x in self.phases.items()}
+    def reset(self):
+        for x in self.phases.values():
+            x.__init__()
+    def merge(self,other):
+        '''
+        other is an Instrumentation object. adds its totals to this one.
+        '''
+        for name,x in other.phases.items():
+            self.phases[name].merge(x)
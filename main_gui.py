@@ -1,250 +1,704 @@
-'''
-Project Name: Can't Stop
-Author: Dawn Harper
-Copyright: October 2021
-Description:
-
-This a Python version of the board game "Can't Stop."
-You can find the rules to the game here: https://www.ultraboardgames.com/cant-stop/game-rules.php
-
-I made this game for fun and to practice the python principles I was learning in school: 
-abstract classes and functions, loose coupling (I built two UI's that work with 
-the same back end interchangeably, although the front ends would not work instantly with 
-a different back end), and building GUIs (through BreezyPythonGui).
-
-In future, I hope to improve the game in the following ways:
--add documentation to this file, like those found in game_classes
--add images to make the experience more visually intuitive
--add a visual tutorial for the game
--make it easier to see the current user's progress
-'''
-from breezypythongui import EasyFrame,EasyDialog,EasyRadiobuttonGroup
-from game_classes import Board,Col,Marker,Player
-import abc
-class GameWindow(EasyFrame):
-    def __init__(self,test=False):
-        super().__init__(title="Can't Stop Game", width=1000, height=500, resizable=True)
-        self.currentWindow = False
-        self.board = False
-        self.test = test
-        self.start()
-    def start(self):
-        self.startgame = StartGame(self)
-    def clear_frame(self):
-        for widgets in self.winfo_children():
-            widgets.destroy()
-class SubGame(abc.ABC):
-    def __init__(self,parent):
-        assert isinstance(parent,GameWindow)
-        self.parent = parent
-        self.start()
-    @abc.abstractmethod
-    def start(self):
-        pass
-class StartGame(SubGame):
-    def __init__(self,parent):
-        super().__init__(parent)
-    def start(self):
-        if self.parent.test:
-            self.startBtnFunc()
-            return
-        self.parent.clear_frame()
-        self.parent.addButton(text='Start',row=0,column=0,command=self.startBtnFunc)
-    def startBtnFunc(self):
-        self.parent.clear_frame()
-        self.parent.currentWindow = GetPlayersList(self.parent)
-class GetPlayersList(SubGame):
-    def __init__(self, parent):
-        super().__init__(parent)
-    def start(self):
-        if self.parent.test:
-            self.parent.board = Board(['Cptn Picard','Lt Worf'],True)
-            self.parent.currentWindow=MainGame(self.parent)
-            return
-        self.parent.addLabel('Who is playing this game? Please write each player\'s name on a separate line.',row=0,column=0)
-        self.txtPlayerList=self.parent.addTextArea(text='',row=1,column=0)
-        self.parent.addButton(text='submit names',row=2,column=0,command=self.submit)
-    def submit(self):
-        self.parent.board = Board(self.txtPlayerList.getText().split('\n')[:-1])
-        self.parent.clear_frame()
-        self.parent.currentWindow=MainGame(self.parent)
-class MainGame(SubGame):
-    def __init__(self, parent):
-        self.canStop = False
-        super().__init__(parent)
-    def start(self):
-        assert isinstance(self.parent.board,Board)
-        playerNames='Players: \n'
-        for i in range(len(self.parent.board.playerStrList)):
-            name = self.parent.board.playerStrList[i]
-            if name == self.parent.board.activePlayer.name:
-                playerNames+=f'* {i}. {name}\n'
-                continue
-            playerNames+=f'{i}. {name}\n'
-        playerNames+='\n* indicates the current active player'
-        self.btnsList = []
-        self.lblActivePlayer=self.parent.addLabel(text=f'It is {self.parent.board.activePlayer.name}\'s turn.',row=0,column=0)
-        self.panelBoard=self.parent.addPanel(row=1,column=0)
-        self.setBoard()
-        self.panelDice=self.parent.addPanel(row=2,column=0)
-        self.lblPanelDice=self.panelDice.addLabel(text=f'{self.parent.board.activePlayer.name}\'s Dice Roll: ',row=0,column=0,columnspan=4)
-        self.lblDice=[False]*4
-        for i in range(4):
-            self.lblDice[i]=self.panelDice.addLabel(text=' ',row=1,column=i)
-        self.panelBtns=self.parent.addPanel(row=3,column=0)
-        if self.canStop:
-            self.btnNext=self.panelBtns.addButton(text='STOP',row=0,column=1,command=self.next)
-            self.btnsList.append(self.btnNext)
-        self.btnRoll=self.panelBtns.addButton(text='roll',row=0,column=0,command=self.roll)
-        self.btnsList.append(self.btnRoll)
-        self.lblPlayerNames=self.parent.addLabel(text=playerNames,row=0,column=1,rowspan=2,sticky='NE')
-        self.btnInstructions=self.parent.addButton(text='INSTRUCTIONS',row=4,column=0,command=self.instructionFunc)
-    def instructionFunc(self):
-        instructions = 'You will place 3 \'WHITE PIECE\' markers on the board during your turn, each on a separate column. Each time you roll the number of a column which houses one of your white pieces, you advance 1 space. \n\nThe GOAL is to advance to the end of 3 columns before any other player. \n\nIf at any point, you cannot play on your roll, you lose your progress for that turn. This is called \'BOMBING\'. If at any point after placing all 3 white pieces, you chose to STOP, your current progress will be saved, and you may place white pieces where you left off on your next turn. This is indicated by your index number on the board. \n\nOnce a COLUMN has been COMPLETED by one player, no one may play that column. This means you may sometimes roll only numbers from columns that are completed and cannot be played, and therefore you may bomb without having placed every white piece. \n\nThems the breaks. \n\nThe most common numbers to roll have the longest columns. \n\nBest of Luck.'
-        self.parent.messageBox(title='Instructions',message=instructions,width=100,height=30)
-    def next(self):
-        assert isinstance(self.parent.board,Board)
-        self.parent.board.stopTurn()
-        if self.parent.board.didActivePlayerWin():
-            self.parent.currentWindow=Winstate(self.parent,self)
-            return
-        self.parent.board.nextActivePlayer()
-        self.parent.clear_frame()
-        self.canStop=False
-        self.start()
-    def roll(self):
-        assert isinstance(self.parent.board,Board)
-        dice = self.parent.board.dice.roll()
-        sums=self.parent.board.filterSums()
-        if not sums:
-            #bomb
-            self.parent.messageBox(title='Oops! You\'ve bombed!',message=f'Oops! You cannot use any of the sums from these dice. Your turn is over and your progress from this turn is lost.')
-            self.endChooseSum(sums)
-            return
-        for i in range(len(dice)):
-            self.lblDice[i]['text']=str(dice[i])
-        self.btnSums = [False]*len(sums)
-        self.selectOption(sums,self.chooseSum)
-    def chooseSum(self,sums):
-        def func():
-            whitePieces = list(self.parent.board.colsWithWhitePieces.keys())
-            whitePieces.sort()
-            selectedSums = sums
-            newWhitePieces =[]
-            for sum in selectedSums:
-                if sum not in whitePieces:
-                    newWhitePieces.append(sum)
-            #if I'm trying to place too many new white pieces
-            #could be 2:1(same int twice)-do nothing,2:1(different ints)-choose one,2:0-remove, or 1:0-remove
-            if len(newWhitePieces)>self.parent.board.whitePiecesLeft():
-                #if the first and second white pieces are different
-                ##handle if there is only one new white piece
-                if self.parent.board.whitePiecesLeft()==0 or newWhitePieces[0] != newWhitePieces[1]:
-                    #remove all newWhitePieces from selected sums
-                    for sum in newWhitePieces:
-                        selectedSums.remove(sum)
-                    #if there is only one white piece left (and there are two different new white pieces)
-                    if self.parent.board.whitePiecesLeft()==1:
-                        #allow the user to select one
-                        self.selectOption(newWhitePieces,self.btnApplyASelectedSum)
-                        return
-            self.endChooseSum(selectedSums)
-        return func
-    def btnApplyASelectedSum(self,sum):
-        def func():
-            x=sum
-            if not isinstance(sum,list):
-                x = [sum]
-            self.endChooseSum(x)
-        return func 
-    def endChooseSum(self,selectedSums):
-        if not selectedSums or len(selectedSums)==0:
-            selectedSums=False
-        
-        self.afterSums(self.parent.board.applySums(selectedSums))  
-    def selectOption(self,options,func):
-        self.clear_btns()
-        assert isinstance(options,list)
-        self.btnSums=[False]*len(options)
-        for i in range(len(options)):
-            x=self.btnSums[i]=self.panelBtns.addButton(text=str(options[i]),row=1,column=i,command=func(options[i]))
-            self.btnsList.append(x)
-    def afterSums(self,sums):
-        if sums:
-            if self.parent.board.whitePiecesLeft()==0:
-                self.canStop = True
-            else:
-                self.canStop = False
-        else:
-            self.next()
-            return
-            #print(f'Oh no, {self.parent.board.activePlayer.name}! You have bombed! Your progress from this turn is lost.')
-        self.start()
-        #self.next()
-    def clear_btns(self):
-        for btn in self.btnsList:
-            btn.destroy()
-    def setBoard(self):
-        board = self.parent.board
-        assert isinstance(board,Board)
-        for col in board.cols.values():
-            assert isinstance(col,Col)
-            markers = self.getMarkersBySpace(col)
-            for space in col.spaces.values():
-                txt='.'
-                if space.isFinal:
-                    txt = str(col.name)
-                if markers and space.name in markers:
-                    playerNums = []
-                    for x in markers[space.name]:
-                        assert isinstance(x,Marker)
-                        name = x.player.name
-                        i = self.parent.board.playerStrList.index(name)
-                        playerNums.append(str(i))
-                    playerNums.sort()
-                    txt=','.join(playerNums)
-                if col.whitePiece and col.whitePiece.space == space:
-                    txt = 'W'
-                if col.donePlayer:
-                    txt=' '
-                    if space.isFinal:
-                        txt = col.donePlayer.name[:5]
-                self.panelBoard.addLabel(text=txt,row=space.name,column=col.name)
-    def getMarkersBySpace(self,col):
-        markers = {}
-        if len(col.markers)==0:
-            return False
-        for marker in col.markers:
-            if marker.space.name in markers:
-                markers[marker.space.name].append(marker)
-            else:
-                markers[marker.space.name]=[marker]
-        return markers
-class Winstate(SubGame):
-    def __init__(self, parent,mainGame):
-        self.mainGame = mainGame
-        super().__init__(parent)
-    def start(self):
-        assert isinstance(self.parent.board,Board)
-        self.parent.clear_frame()
-        playerNames=''
-        for i in range(len(self.parent.board.playerStrList)):
-            name = self.parent.board.playerStrList[i]
-            if name == self.parent.board.activePlayer.name:
-                playerNames+=f'* {i}. {name}\n'
-                continue
-            playerNames+=f'{i}. {name}\n'
-        self.btnsList = []
-        self.lblActivePlayer=self.parent.addLabel(text=f'{self.parent.board.activePlayer.name} has won!!!',row=0,column=0)
-        self.lblActivePlayer2=self.parent.addLabel(text=f'{self.parent.board.activePlayer.name} has won!!!',row=3,column=0)
-        self.mainGame.panelBoard=self.parent.addPanel(row=1,column=0)
-        self.mainGame.setBoard()
-        self.lblPlayerNames=self.parent.addLabel(text=playerNames,row=0,column=1,rowspan=2,sticky='NE')
-        
-
-def main():
-    '''game = GuiGame()
-    game.mainloop()'''
-    GameWindow().mainloop()
-if __name__ == "__main__":
+'''
+Project Name: Can't Stop
+Author: Dawn Harper
+Copyright: October 2021
+Description:
+
+This a Python version of the board game "Can't Stop."
+You can find the rules to the game here: https://www.ultraboardgames.com/cant-stop/game-rules.php
+
+I made this game for fun and to practice the python principles I was learning in school: 
+abstract classes and functions, loose coupling (I built two UI's that work with 
+the same back end interchangeably, although the front ends would not work instantly with 
+a different back end), and building GUIs (through BreezyPythonGui).
+
+In future, I hope to improve the game in the following ways:
+-add documentation to this file, like those found in game_classes
+-add images to make the experience more visually intuitive
+-add a visual tutorial for the game
+-make it easier to see the current user's progress
+'''
+from breezypythongui import EasyCanvas,EasyFrame
+from client import GameClient,RemoteBoard
+from game_classes import Board,Col
+from game_record import GameLogWriter
+from collections import deque
+from random import Random
+import abc
+import argparse
+import time
+# how often (in milliseconds) a remote game checks for events from the server
+POLL_MS = 20
+# the size of a space on a BoardCanvas, in pixels
+CELL = 28
+# the width of the list of player names on the right of a BoardCanvas, in pixels
+LEGEND_WIDTH = 160
+# marker colors by seat, and where a seat's marker sits in a space (in thirds of CELL from its centre)
+PLAYER_COLORS = ['red','blue','green','orange','purple','brown','magenta','cyan']
+MARKER_OFFSETS = [(-1,-1),(1,-1),(-1,1),(1,1),(0,-1),(0,1),(-1,0),(1,0)]
+# animations draw a frame every FRAME_MS milliseconds (60 a second), and stop for the frame once they have used FRAME_BUDGET seconds
+FRAME_MS = 16
+FRAME_BUDGET = 0.008
+# how many frames a dice roll lasts, how often its faces change, and how many frames a white piece takes to move
+ROLL_FRAMES = 18
+FACE_FRAMES = 3
+SLIDE_FRAMES = 12
+# a remote game with more events than this waiting plays its rolls in one frame, to catch up
+MAX_BACKLOG = 30
+# random faces for the dice animation, kept apart from the games' dice so they do not change the games
+FACES = Random()
+class GameWindow(EasyFrame):
+    '''
+    if address is given, the window plays one seat of a table on a server.py server (see RemoteGame)
+    instead of owning a Board: it joins table, or makes a new table against bots. if watch is True it only watches.
+    animator plays the animations of every part of the window.
+    '''
+    def __init__(self,test=False,logPath=False,address=False,table=False,bots=('rule28',),watch=False):
+        super().__init__(title="Can't Stop Game", width=1000, height=500, resizable=True)
+        self.currentWindow = False
+        self.board = False
+        self.test = test
+        self.logPath = logPath
+        self.address = address
+        self.table = table
+        self.bots = bots
+        self.watch = watch
+        self.animator = Animator(self)
+        self.start()
+    def start(self):
+        if self.address:
+            self.currentWindow = RemoteGame(self)
+            return
+        self.startgame = StartGame(self)
+    def newBoard(self,board):
+        '''
+        starts a game on board, recording it if there is a logPath
+        '''
+        self.board = board
+        if self.logPath:
+            board.recordGame()
+    def saveRecord(self):
+        '''
+        appends the recorded game (if any) to the log at logPath
+        '''
+        if self.logPath and self.board and self.board.record:
+            with GameLogWriter(self.logPath) as log:
+                log.writeGame(self.board.record)
+    def clear_frame(self):
+        for widgets in self.winfo_children():
+            widgets.destroy()
+class SubGame(abc.ABC):
+    def __init__(self,parent):
+        assert isinstance(parent,GameWindow)
+        self.parent = parent
+        self.start()
+    @abc.abstractmethod
+    def start(self):
+        pass
+class StartGame(SubGame):
+    def __init__(self,parent):
+        super().__init__(parent)
+    def start(self):
+        if self.parent.test:
+            self.startBtnFunc()
+            return
+        self.parent.clear_frame()
+        self.parent.addButton(text='Start',row=0,column=0,command=self.startBtnFunc)
+    def startBtnFunc(self):
+        self.parent.clear_frame()
+        self.parent.currentWindow = GetPlayersList(self.parent)
+class GetPlayersList(SubGame):
+    def __init__(self, parent):
+        super().__init__(parent)
+    def start(self):
+        if self.parent.test:
+            self.parent.newBoard(Board(['Cptn Picard','Lt Worf'],True))
+            self.parent.currentWindow=MainGame(self.parent)
+            return
+        self.parent.addLabel('Who is playing this game? Please write each player\'s name on a separate line.',row=0,column=0)
+        self.txtPlayerList=self.parent.addTextArea(text='',row=1,column=0)
+        self.parent.addButton(text='submit names',row=2,column=0,command=self.submit)
+    def submit(self):
+        self.parent.newBoard(Board(self.txtPlayerList.getText().split('\n')[:-1]))
+        self.parent.clear_frame()
+        self.parent.currentWindow=MainGame(self.parent)
+class Animator:
+    '''
+    plays animations without blocking Tk. an animation is a generator that draws one frame each time it is advanced.
+    every FRAME_MS milliseconds (with after()) each animation is advanced once, and Tk handles input in between.
+    once a frame has taken FRAME_BUDGET seconds, the animations left wait for the next frame.
+    '''
+    def __init__(self,widget) -> None:
+        self.widget = widget
+        # [(animation, function to call when it ends or False)]
+        self.animations = []
+        self.running = False
+    def __str__(self) -> str:
+        return f'<Animator obj> animations = {len(self.animations)}'
+    def play(self,animation,then=False):
+        '''
+        starts animation with the next frame. then (if given) is called when it ends.
+        '''
+        self.animations.append((animation,then))
+        if not self.running:
+            self.running = True
+            self.widget.after(FRAME_MS,self.tick)
+    def tick(self):
+        '''
+        This function is only used by Animator itself. Do not call from outside.
+        draws one frame
+        '''
+        start = time.perf_counter()
+        animations = self.animations
+        self.animations = []
+        kept = []
+        for i in range(len(animations)):
+            animation,then = animations[i]
+            if time.perf_counter()-start>FRAME_BUDGET:
+                kept.extend(animations[i:])
+                break
+            try:
+                next(animation)
+                kept.append((animation,then))
+            except StopIteration:
+                if then:
+                    then()
+        # animations started by a then function go after the ones that were already playing
+        self.animations = kept+self.animations
+        if self.animations:
+            self.widget.after(FRAME_MS,self.tick)
+        else:
+            self.running = False
+    def clear(self):
+        '''
+        drops every animation without finishing it, for when its widgets are about to be destroyed
+        '''
+        self.animations = []
+def rollDice(lblDice,dice,sides=6,frames=ROLL_FRAMES):
+    '''
+    an animation (see Animator) that shows random faces on the dice labels, changing every FACE_FRAMES frames, then shows dice
+    '''
+    for frame in range(frames):
+        if frame%FACE_FRAMES==0:
+            for x in lblDice:
+                x['text']=str(FACES.randint(1,sides))
+        yield
+    for i in range(len(lblDice)):
+        lblDice[i]['text']=str(dice[i]) if i<len(dice) else ' '
+class BoardCanvas(EasyCanvas):
+    '''
+    the board drawn on a canvas. tops is a dictionary of {col name : number of spaces in the col}, so the board of any Rules fits.
+    the cols and spaces are drawn once. each marker (one per seat and col) and white piece (one per col) is one item,
+    made the first time it is shown and after that only moved with coords, or hidden and recolored with itemconfig.
+    setCol only queues the items that changed, and they are all drawn together when Tk is next idle (once a frame),
+    so a redraw costs the same however big the board is and however many players there are.
+    if an animator is given, white pieces slide to their new spaces instead of jumping.
+    '''
+    def __init__(self,parent,tops,animator=False):
+        self.tops = tops
+        self.animator = animator
+        # {col name : x of the centre of the col}
+        self.x = {}
+        for i,col in enumerate(sorted(tops)):
+            self.x[col] = (i+1)*CELL
+        self.height = (max(tops.values())+2)*CELL
+        super().__init__(parent,width=(len(tops)+1)*CELL+LEGEND_WIDTH,height=self.height,background='white')
+        # {col name : {seat : item}}
+        self.markers = {x:{} for x in tops}
+        # {col name : item}
+        self.whites = {}
+        self.bgCols = {}
+        self.lblCols = {}
+        # {seat : item}
+        self.lblNames = {}
+        # what each item was last set to, {item : coords} and {(item, option) : value}
+        self.placed = {}
+        self.options = {}
+        self.coordsQueue = {}
+        self.configQueue = {}
+        # the id of the redraw waiting for Tk to be idle, or False
+        self.scheduled = False
+        # {item : number of the latest slide of the item}
+        self.slides = {}
+        for col,top in tops.items():
+            x = self.x[col]
+            self.bgCols[col] = self.drawRectangle(x-CELL//2,self.getY(top-1)-CELL//2,x+CELL//2,self.getY(0)+CELL//2,outline='',fill='white')
+            for space in range(top):
+                y = self.getY(space)
+                self.drawOval(x-2,y-2,x+2,y+2,outline='',fill='gray')
+            self.lblCols[col] = self.drawText(str(col),x,self.getY(top))
+    def getY(self,space):
+        '''
+        returns the y of the centre of a space. Space 0 is at the bottom.
+        '''
+        return self.height-CELL-space*CELL
+    def getMarkerCoords(self,seat,col,step):
+        dx,dy = MARKER_OFFSETS[seat%len(MARKER_OFFSETS)]
+        x = self.x[col]+dx*CELL//3
+        y = self.getY(step-1)+dy*CELL//3
+        r = CELL//7
+        return (x-r,y-r,x+r,y+r)
+    def getWhiteCoords(self,col,step):
+        x = self.x[col]
+        y = self.getY(step-1)
+        r = CELL//2-2
+        return (x-r,y-r,x+r,y+r)
+    def setCol(self,col,markers,white=0,doneSeat=-1,doneName=''):
+        '''
+        col is a col name. positions are steps, like CompactBoard: 0 for nothing and n for Space n-1.
+        markers is a dictionary of {seat : step}, white is the step of the white piece in the col,
+        and doneSeat is the seat that completed the col (doneName is their name), or -1.
+        queues the changes to the col's items for the next redraw.
+        '''
+        items = self.markers[col]
+        for seat,item in items.items():
+            if not markers.get(seat):
+                self.setOptions(item,state='hidden')
+        for seat,step in markers.items():
+            if not step:
+                continue
+            coords = self.getMarkerCoords(seat,col,step)
+            if seat not in items:
+                items[seat] = self.drawOval(*coords,outline='',fill=PLAYER_COLORS[seat%len(PLAYER_COLORS)])
+                self.placed[items[seat]] = coords
+            self.place(items[seat],coords)
+            self.setOptions(items[seat],state='normal')
+        if white:
+            coords = self.getWhiteCoords(col,white)
+            if col not in self.whites:
+                self.whites[col] = self.drawOval(*coords,outline='black')
+                self.itemconfig(self.whites[col],width=2)
+                self.placed[self.whites[col]] = coords
+            item = self.whites[col]
+            if self.animator:
+                # a white piece that is placed comes up from the space below it
+                if self.options.get((item,'state'))!='normal':
+                    self.place(item,self.getWhiteCoords(col,white-1))
+                if self.placed[item]!=coords:
+                    self.animator.play(self.slide(item,coords))
+            else:
+                self.place(item,coords)
+            self.setOptions(item,state='normal')
+        elif col in self.whites:
+            self.setOptions(self.whites[col],state='hidden')
+        if doneSeat>=0:
+            self.setOptions(self.bgCols[col],fill=PLAYER_COLORS[doneSeat%len(PLAYER_COLORS)])
+            self.setOptions(self.lblCols[col],text=doneName[:5])
+        else:
+            self.setOptions(self.bgCols[col],fill='white')
+            self.setOptions(self.lblCols[col],text=str(col))
+    def setNames(self,names,active=-1):
+        '''
+        shows each seat's name in its marker color, with a * before the active player
+        '''
+        for seat in range(len(names)):
+            text = f'{"* " if seat==active else ""}{seat}. {names[seat] or "(empty)"}'
+            if seat not in self.lblNames:
+                self.lblNames[seat] = self.drawText(text,(len(self.tops)+1)*CELL+LEGEND_WIDTH//2,(seat+1)*CELL,fill=PLAYER_COLORS[seat%len(PLAYER_COLORS)])
+            self.setOptions(self.lblNames[seat],text=text)
+    def slide(self,item,coords):
+        '''
+        an animation (see Animator) that moves item to coords over SLIDE_FRAMES frames.
+        it stops if a newer slide of the same item starts.
+        '''
+        number = self.slides.get(item,0)+1
+        self.slides[item] = number
+        start = self.placed[item]
+        for frame in range(1,SLIDE_FRAMES+1):
+            if self.slides[item]!=number:
+                return
+            self.place(item,tuple(a+(b-a)*frame//SLIDE_FRAMES for a,b in zip(start,coords)))
+            yield
+    def place(self,item,coords):
+        '''
+        This function is only used by BoardCanvas itself. Do not call from outside.
+        queues a move of item to coords, unless it is already there.
+        '''
+        if self.placed.get(item)==coords:
+            return
+        self.placed[item] = coords
+        self.coordsQueue[item] = coords
+        self.schedule()
+    def setOptions(self,item,**options):
+        '''
+        This function is only used by BoardCanvas itself. Do not call from outside.
+        queues the options of item that are different from what they were last set to.
+        '''
+        for x,y in options.items():
+            if self.options.get((item,x))!=y:
+                self.options[(item,x)] = y
+                self.configQueue.setdefault(item,{})[x] = y
+                self.schedule()
+    def schedule(self):
+        if not self.scheduled:
+            self.scheduled = self.after_idle(self.redraw)
+    def redraw(self):
+        '''
+        applies every queued change at once
+        '''
+        self.scheduled = False
+        for item,coords in self.coordsQueue.items():
+            self.coords(item,*coords)
+        for item,options in self.configQueue.items():
+            self.itemconfig(item,**options)
+        self.coordsQueue = {}
+        self.configQueue = {}
+    def destroy(self):
+        if self.scheduled:
+            self.after_cancel(self.scheduled)
+            self.scheduled = False
+        super().destroy()
+class MainGame(SubGame):
+    '''
+    plays the game on the window's Board.
+    the widgets are made once in start(), and update() only changes what is different after each roll or turn.
+    the board is a BoardCanvas, and a col is only redrawn when its Col.zobrist (which changes with its markers,
+    white piece and done player) is new.
+    rolls are animated with the window's Animator, and a bomb is shown in lblStatus, so nothing waits for the player.
+    '''
+    def __init__(self, parent):
+        self.canStop = False
+        self.btnsList = []
+        # {col name : Col.zobrist when the col was last drawn}
+        self.colKeys = {}
+        super().__init__(parent)
+    def start(self):
+        assert isinstance(self.parent.board,Board)
+        self.lblActivePlayer=self.parent.addLabel(text='',row=0,column=0)
+        self.makeBoard(self.parent.addPanel(row=1,column=0))
+        self.panelDice=self.parent.addPanel(row=2,column=0)
+        numDice = self.parent.board.rules.numDice
+        self.lblPanelDice=self.panelDice.addLabel(text='',row=0,column=0,columnspan=numDice)
+        self.lblDice=[False]*numDice
+        for i in range(numDice):
+            self.lblDice[i]=self.panelDice.addLabel(text=' ',row=1,column=i)
+        self.panelBtns=self.parent.addPanel(row=3,column=0)
+        self.btnRoll=self.panelBtns.addButton(text='roll',row=0,column=0,command=self.roll)
+        self.btnNext=self.panelBtns.addButton(text='STOP',row=0,column=1,command=self.next)
+        self.lblPlayerNames=self.parent.addLabel(text='',row=0,column=1,rowspan=2,sticky='NE')
+        self.btnInstructions=self.parent.addButton(text='INSTRUCTIONS',row=4,column=0,command=self.instructionFunc)
+        self.lblStatus=self.parent.addLabel(text='',row=5,column=0)
+        self.update()
+    def update(self):
+        '''
+        shows the active player, clears the dice, shows the roll (and if allowed STOP) button, and redraws the cols that changed
+        '''
+        board = self.parent.board
+        assert isinstance(board,Board)
+        playerNames='Players: \n'
+        for i in range(len(board.playerStrList)):
+            name = board.playerStrList[i]
+            if name == board.activePlayer.name:
+                playerNames+=f'* {i}. {name}\n'
+                continue
+            playerNames+=f'{i}. {name}\n'
+        playerNames+='\n* indicates the current active player'
+        self.lblPlayerNames['text']=playerNames
+        self.lblActivePlayer['text']=f'It is {board.activePlayer.name}\'s turn.'
+        self.lblPanelDice['text']=f'{board.activePlayer.name}\'s Dice Roll: '
+        for x in self.lblDice:
+            x['text']=' '
+        self.clear_btns()
+        self.btnRoll.grid()
+        if self.canStop:
+            self.btnNext.grid()
+        else:
+            self.btnNext.grid_remove()
+        self.setBoard()
+    def instructionFunc(self):
+        instructions = 'You will place 3 \'WHITE PIECE\' markers on the board during your turn, each on a separate column. Each time you roll the number of a column which houses one of your white pieces, you advance 1 space. \n\nThe GOAL is to advance to the end of 3 columns before any other player. \n\nIf at any point, you cannot play on your roll, you lose your progress for that turn. This is called \'BOMBING\'. If at any point after placing all 3 white pieces, you chose to STOP, your current progress will be saved, and you may place white pieces where you left off on your next turn. This is indicated by your index number on the board. \n\nOnce a COLUMN has been COMPLETED by one player, no one may play that column. This means you may sometimes roll only numbers from columns that are completed and cannot be played, and therefore you may bomb without having placed every white piece. \n\nThems the breaks. \n\nThe most common numbers to roll have the longest columns. \n\nBest of Luck.'
+        self.parent.messageBox(title='Instructions',message=instructions,width=100,height=30)
+    def next(self):
+        assert isinstance(self.parent.board,Board)
+        self.parent.board.stopTurn()
+        if self.parent.board.didActivePlayerWin():
+            self.parent.saveRecord()
+            self.parent.animator.clear()
+            self.parent.currentWindow=Winstate(self.parent,self)
+            return
+        self.parent.board.nextActivePlayer()
+        self.canStop=False
+        self.update()
+    def roll(self):
+        '''
+        rolls, and hides the buttons while the roll is animated. afterRoll is called when it ends.
+        '''
+        board = self.parent.board
+        assert isinstance(board,Board)
+        self.btnRoll.grid_remove()
+        self.btnNext.grid_remove()
+        self.lblStatus['text']=''
+        dice = list(board.dice.roll())
+        sums=board.filterSums()
+        self.parent.animator.play(rollDice(self.lblDice,dice,board.rules.sides),then=lambda:self.afterRoll(dice,sums))
+    def afterRoll(self,dice,sums):
+        if not sums:
+            #bomb
+            name = self.parent.board.activePlayer.name
+            self.lblStatus['text']=f'Oops! {name} rolled {" ".join(str(x) for x in dice)} and cannot use any of the sums. {name}\'s turn is over and their progress from this turn is lost.'
+            self.endChooseSum(sums)
+            return
+        self.selectOption(sums,self.chooseSum)
+    def chooseSum(self,sums):
+        def func():
+            options = self.parent.board.resolveSums(sums)
+            #if there is only one white piece left (and there are two different new white pieces)
+            if len(options)>1:
+                #allow the user to select one
+                self.selectOption(options,self.btnApplyASelectedSum)
+                return
+            self.endChooseSum(options[0] if options else False)
+        return func
+    def btnApplyASelectedSum(self,sum):
+        def func():
+            x=sum
+            if not isinstance(sum,list):
+                x = [sum]
+            self.endChooseSum(x)
+        return func 
+    def endChooseSum(self,selectedSums):
+        if not selectedSums or len(selectedSums)==0:
+            selectedSums=False
+        
+        self.afterSums(self.parent.board.applySums(selectedSums))  
+    def selectOption(self,options,func):
+        '''
+        hides the roll and STOP buttons and shows a button for each option
+        '''
+        self.clear_btns()
+        self.btnRoll.grid_remove()
+        self.btnNext.grid_remove()
+        assert isinstance(options,list)
+        for i in range(len(options)):
+            self.btnsList.append(self.panelBtns.addButton(text=str(options[i]),row=1,column=i,command=func(options[i])))
+    def afterSums(self,sums):
+        if sums:
+            if self.parent.board.whitePiecesLeft()==0:
+                self.canStop = True
+            else:
+                self.canStop = False
+        else:
+            self.next()
+            return
+            #print(f'Oh no, {self.parent.board.activePlayer.name}! You have bombed! Your progress from this turn is lost.')
+        self.update()
+    def clear_btns(self):
+        '''
+        destroys the option buttons
+        '''
+        for btn in self.btnsList:
+            btn.destroy()
+        self.btnsList = []
+    def makeBoard(self,panel):
+        '''
+        draws the whole board on a new BoardCanvas in panel
+        '''
+        board = self.parent.board
+        assert isinstance(board,Board)
+        self.canvas = panel.addCanvas(canvas=BoardCanvas(panel,{x.name:len(x.spaces) for x in board.cols.values()},self.parent.animator),row=0,column=0)
+        self.colKeys = {}
+        self.setBoard()
+    def setBoard(self):
+        '''
+        redraws the cols that have changed since they were last drawn
+        '''
+        board = self.parent.board
+        assert isinstance(board,Board)
+        for col in board.cols.values():
+            assert isinstance(col,Col)
+            if self.colKeys.get(col.name)==col.zobrist:
+                continue
+            self.colKeys[col.name] = col.zobrist
+            done = col.donePlayer
+            self.canvas.setCol(col.name,{x.player.index:x.space.name+1 for x in col.markers},
+                col.whitePiece.space.name+1 if col.whitePiece else 0,done.index if done else -1,done.name if done else '')
+        self.canvas.setNames(board.playerStrList,board.activePlayer.index)
+class Winstate(SubGame):
+    def __init__(self, parent,mainGame):
+        self.mainGame = mainGame
+        super().__init__(parent)
+    def start(self):
+        assert isinstance(self.parent.board,Board)
+        self.parent.clear_frame()
+        playerNames=''
+        for i in range(len(self.parent.board.playerStrList)):
+            name = self.parent.board.playerStrList[i]
+            if name == self.parent.board.activePlayer.name:
+                playerNames+=f'* {i}. {name}\n'
+                continue
+            playerNames+=f'{i}. {name}\n'
+        self.btnsList = []
+        self.lblActivePlayer=self.parent.addLabel(text=f'{self.parent.board.activePlayer.name} has won!!!',row=0,column=0)
+        self.lblActivePlayer2=self.parent.addLabel(text=f'{self.parent.board.activePlayer.name} has won!!!',row=3,column=0)
+        self.mainGame.makeBoard(self.parent.addPanel(row=1,column=0))
+        self.lblPlayerNames=self.parent.addLabel(text=playerNames,row=0,column=1,rowspan=2,sticky='NE')
+class RemoteGame(SubGame):
+    '''
+    plays one seat of a table on a server (see client.py).
+    the widgets are made once, and each event from the server only redraws the cols it touched on a BoardCanvas,
+    so the window stays responsive however slow the link is. the server is polled every POLL_MS milliseconds.
+    events wait in a queue and are played in order, each roll with its animation, so a bot's turns (which the
+    server plays all at once) can be watched. a big backlog is played faster, and never more than FRAME_BUDGET a frame.
+    '''
+    def __init__(self, parent):
+        self.client = False
+        self.remote = RemoteBoard()
+        self.waiting = False
+        self.canvas = False
+        self.btnsList = []
+        self.events = deque()
+        # busy is True while an event's animation plays (or the queue waits for the next frame),
+        # and changed is True if events have been played since the buttons were last updated
+        self.busy = False
+        self.changed = False
+        super().__init__(parent)
+    def start(self):
+        self.parent.clear_frame()
+        if self.parent.test:
+            self.join('Cptn Picard')
+            return
+        self.parent.addLabel('What is your name?',row=0,column=0)
+        self.txtName=self.parent.addTextField(text='',row=1,column=0)
+        self.parent.addButton(text='join',row=2,column=0,command=lambda:self.join(self.txtName.getText()))
+    def join(self,name):
+        self.client = GameClient(self.parent.address)
+        self.client.join(name or 'player',self.parent.table,self.parent.bots,self.parent.watch)
+        self.parent.clear_frame()
+        self.lblActivePlayer=self.parent.addLabel(text='Waiting for the other players to join...',row=0,column=0)
+        self.panelBoard=self.parent.addPanel(row=1,column=0)
+        self.panelDice=self.parent.addPanel(row=2,column=0)
+        self.lblDice=[]
+        self.panelBtns=self.parent.addPanel(row=3,column=0)
+        self.lblStatus=self.parent.addLabel(text='',row=4,column=0)
+        self.lblPlayerNames=self.parent.addLabel(text='',row=0,column=1,rowspan=2,sticky='NE')
+        self.poll()
+    def poll(self):
+        '''
+        queues the events that have arrived and plays them, then checks again after POLL_MS
+        '''
+        self.events.extend(self.client.receive(False))
+        if not self.busy:
+            self.playEvents()
+        if self.client.closed:
+            self.lblStatus['text']='The server has closed the connection.'
+            return
+        self.parent.after(POLL_MS,self.poll)
+    def playEvents(self):
+        '''
+        applies the queued events in order and redraws what they changed, until one starts an animation
+        (the rest are played when it ends) or FRAME_BUDGET seconds have gone by (the rest are played next frame).
+        '''
+        self.busy = False
+        start = time.perf_counter()
+        while self.events:
+            if time.perf_counter()-start>FRAME_BUDGET:
+                self.busy = True
+                self.parent.after(FRAME_MS,self.playEvents)
+                return
+            event = self.events.popleft()
+            self.updateCols(self.remote.apply(event))
+            self.waiting = False
+            self.changed = True
+            animation = self.showEvent(event)
+            if animation:
+                self.busy = True
+                self.parent.animator.play(animation,then=self.playEvents)
+                return
+        if self.changed:
+            self.changed = False
+            self.updateBtns()
+    def send(self,message):
+        def func():
+            self.client.send(message)
+            self.waiting = True
+            self.updateBtns()
+        return func
+    def showEvent(self,event):
+        '''
+        shows an event. returns its animation, or False if it has none.
+        '''
+        remote = self.remote
+        kind = event.get('event')
+        seat = event.get('seat',-1)
+        name = remote.names[seat] if 0<=seat<len(remote.names) else ''
+        if kind=='created':
+            self.lblStatus['text']=f'You have made table {event["table"]}. Other players can join it by its number.'
+        elif kind=='state' and remote.tops:
+            if not self.canvas:
+                self.canvas = self.panelBoard.addCanvas(canvas=BoardCanvas(self.panelBoard,remote.tops,self.parent.animator),row=0,column=0)
+                self.lblPanelDice=self.panelDice.addLabel(text='Dice Roll: ',row=0,column=0,columnspan=remote.numDice)
+                self.lblDice=[self.panelDice.addLabel(text=' ',row=1,column=i) for i in range(remote.numDice)]
+            self.updateCols(remote.tops)
+            self.showPlayers()
+        elif kind=='joined' and seat>=0:
+            self.lblStatus['text']=f'{event["name"]} has joined table {event["table"]}'
+        elif kind=='left':
+            self.lblStatus['text']=f'{name} has left the table'
+        elif kind=='roll':
+            frames = 1 if len(self.events)>MAX_BACKLOG else ROLL_FRAMES
+            return rollDice(self.lblDice,remote.dice,remote.sides,frames)
+        elif kind=='bust':
+            self.lblStatus['text']=f'Oh no, {name}! You have bombed! Your progress from this turn is lost.'
+        elif kind=='stop':
+            self.lblStatus['text']=f'{name} has stopped and saved their progress.'
+        elif kind=='turn':
+            self.showPlayers()
+            for x in self.lblDice:
+                x['text']=' '
+        elif kind=='win':
+            self.lblActivePlayer['text']=f'{name} has won!!!'
+        elif kind=='error':
+            self.lblStatus['text']=event['message']
+        return False
+    def showPlayers(self):
+        remote = self.remote
+        playerNames='Players: \n'
+        for i in range(len(remote.names)):
+            playerNames+=f'{"* " if i==remote.active else ""}{i}. {remote.names[i]}\n'
+        playerNames+='\n* indicates the current active player'
+        self.lblPlayerNames['text']=playerNames
+        if self.canvas:
+            self.canvas.setNames(remote.names,remote.active)
+        self.lblActivePlayer['text']=f'It is {remote.activeName()}\'s turn.'
+        self.lblPanelDice['text']=f'{remote.activeName()}\'s Dice Roll: '
+    def updateCols(self,cols):
+        remote = self.remote
+        if not self.canvas:
+            return
+        for col in cols:
+            done = remote.done.get(col,-1)
+            self.canvas.setCol(col,{x:remote.progress[x][col] for x in range(len(remote.progress))},
+                remote.white.get(col,0),done,remote.names[done] if done>=0 else '')
+    def updateBtns(self):
+        '''
+        shows the buttons for this player's choices, if it is their turn and they are not waiting for the server
+        '''
+        for btn in self.btnsList:
+            btn.destroy()
+        self.btnsList = []
+        remote = self.remote
+        if self.waiting or not remote.isMyTurn():
+            return
+        if remote.phase=='move':
+            for i in range(len(remote.moves)):
+                self.btnsList.append(self.panelBtns.addButton(text=str(remote.moves[i]),row=1,column=i,
+                    command=self.send({'op':'move','sums':remote.moves[i]})))
+            return
+        self.btnsList.append(self.panelBtns.addButton(text='roll',row=0,column=0,command=self.send({'op':'roll'})))
+        if remote.phase=='choose':
+            self.btnsList.append(self.panelBtns.addButton(text='STOP',row=0,column=1,command=self.send({'op':'stop'})))
+
+def main():
+    '''game = GuiGame()
+    game.mainloop()'''
+    parser = argparse.ArgumentParser(description='Play Can\'t Stop in a window.')
+    parser.add_argument('log',nargs='?',default=False,help='path of a game log to append finished games to')
+    parser.add_argument('--server',default=False,help='play on a server.py server at host:port or a Unix socket path')
+    parser.add_argument('--table',type=int,default=False,help='table to join on the server (without it, a new table is made)')
+    parser.add_argument('--bots',default='rule28',help='comma separated bots to play against at a new table')
+    parser.add_argument('--watch',action='store_true',help='watch the table (or a new table of --bots) without playing')
+    args = parser.parse_args()
+    GameWindow(logPath=args.log,address=args.server,table=args.table,bots=args.bots.split(',') if args.bots else [],
+        watch=args.watch).mainloop()
+if __name__ == "__main__":
     main()
\ No newline at end of file
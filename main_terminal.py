@@ -1,110 +1,202 @@
-'''
-Project Name: Can't Stop
-Author: Dawn Harper
-Copyright: October 2021
-Description:
-This is a test version of my larger project to build the board game "Can't Stop" in Python.
-This version of the game is fully functional, but was built for my testing purposes and is 
-more difficult to use.
-I'm including this file to show that the back end of the game, "game_classes" can be attached to 
-different UI's effectively
-'''
-
-from game_classes import Board
-'''
-1. get roll, sums, and number of cols with white pieces
-2. w.chooseSums()
-3. run the rest of the round
-4. w.rollAgainBool()
-5. repeat or
-6. end the turn
-'''
-class Terminal_game:
-    def __init__(self) -> None:
-        self.board = Board(self.getPlayerList())
-        self.play()
-    def getPlayerList(self):
-        playersList = input('submit comma separated list of players:').split(',')
-        return playersList
-    def play(self):
-        while True:
-            player = self.board.activePlayer.name
-            print(f'It is {player}\'s turn')
-            if self.board.applySums(self.chooseSums()):
-                semiCompletedCols=self.board.getWhitePieceCompletedCols()
-                if semiCompletedCols:
-                    for col in semiCompletedCols:
-                        print(f'Your white piece has reached the end of column {col}.')
-                if self.board.whitePiecesLeft()==0:
-                    if self.rollAgainBool():
-                        continue
-                else:
-                    continue
-            else:
-                print(f'Oh no, {player}! You have bombed! Your progress from this turn is lost.')
-            self.board.stopTurn()
-            if self.board.didActivePlayerWin():
-                print(f'{self.board.activePlayer.name} Won!!')
-                break
-            self.board.nextActivePlayer()
-
-            if input('quit? (return any letter for yes, return nothing for no)') != '':
-                break
-    def rollAgainBool(self):
-        if input('Do you want to roll again? (return any letter for yes, return nothing for no)') == '':
-            return False
-        return True
-    def chooseSums(self):
-        dice = self.board.dice.roll()
-        sums = self.board.filterSums()
-        if not sums:
-            return False
-        whitePieces = list(self.board.colsWithWhitePieces.keys())
-        whitePieces.sort()
-        print(f"You have rolled: {dice}")
-        print(f"Your sums are: {sums}")
-        progress = self.board.getActivePlayerProgress()
-        if progress:
-            print(f'Your markers are on the following spaces: ')
-            for num,col in progress.items():
-                print(f'{num}:{col}')
-        if len(whitePieces)>0:
-            print(f'Your white pieces are in the following columns: {whitePieces}')
-        newWhitePieces =[]
-        selectedSums = self.selectOption(sums, 'columns')
-        for sum  in selectedSums:
-            if sum not in whitePieces:
-                newWhitePieces.append(sum)
-        if len(newWhitePieces)>self.board.whitePiecesLeft():
-            if newWhitePieces[0] != newWhitePieces[1]:
-                for sum in newWhitePieces:
-                    selectedSums.remove(sum)
-                if self.board.whitePiecesLeft() != 0:
-                    print('You only have one free white piece left. Which column would you like to play on?')
-                    x = self.selectOption(newWhitePieces)
-                    selectedSums.append(x)
-                    selectedSums.sort()
-        print(selectedSums)
-        if len(selectedSums)==0:
-            selectedSums=False
-        return selectedSums
-
-    def selectOption(self,lyst,nameOfThing="option"):
-        print(f'Select the index number of your chosen {nameOfThing}: ')
-        for i in range(len(lyst)):
-            print(f'Index {i}: {lyst[i]}')
-        while True:
-            x = input(f'input the index number of your chosen {nameOfThing}: ')
-            try:
-                return lyst[int(x)]
-            except:
-                nums = ''
-                for i in range(len(lyst)):
-                    nums +=f"{i}, "
-                nums = nums[:-2]
-                print(f'That selection is invalid. Please enter one of the following integers: {nums}')
-
-def main():
-    game = Terminal_game()
-if __name__ == "__main__":
+'''
+Project Name: Can't Stop
+Author: Dawn Harper
+Copyright: October 2021
+Description:
+This is a test version of my larger project to build the board game "Can't Stop" in Python.
+This version of the game is fully functional, but was built for my testing purposes and is 
+more difficult to use.
+I'm including this file to show that the back end of the game, "game_classes" can be attached to 
+different UI's effectively
+'''
+
+import argparse
+from client import GameClient,RemoteBoard
+from game_classes import Board
+from game_record import GameLogWriter
+'''
+1. get roll, sums, and number of cols with white pieces
+2. w.chooseSums()
+3. run the rest of the round
+4. w.rollAgainBool()
+5. repeat or
+6. end the turn
+'''
+class Terminal_game:
+    def __init__(self,logPath=False,address=False,table=False,bots=('rule28',)) -> None:
+        if address:
+            # play one seat of a table on a server instead of owning a Board
+            self.board = False
+            self.playRemote(address,table,bots)
+            return
+        self.board = Board(self.getPlayerList())
+        self.logPath = logPath
+        if logPath:
+            self.board.recordGame()
+        self.play()
+        self.saveRecord()
+    def getPlayerList(self):
+        playersList = input('submit comma separated list of players:').split(',')
+        return playersList
+    def play(self):
+        while True:
+            player = self.board.activePlayer.name
+            print(f'It is {player}\'s turn')
+            if self.board.applySums(self.chooseSums()):
+                semiCompletedCols=self.board.getWhitePieceCompletedCols()
+                if semiCompletedCols:
+                    for col in semiCompletedCols:
+                        print(f'Your white piece has reached the end of column {col}.')
+                if self.board.whitePiecesLeft()==0:
+                    if self.rollAgainBool():
+                        continue
+                else:
+                    continue
+            else:
+                print(f'Oh no, {player}! You have bombed! Your progress from this turn is lost.')
+            self.board.stopTurn()
+            if self.board.didActivePlayerWin():
+                print(f'{self.board.activePlayer.name} Won!!')
+                break
+            self.board.nextActivePlayer()
+
+            if input('quit? (return any letter for yes, return nothing for no)') != '':
+                break
+    def playRemote(self,address,table,bots):
+        '''
+        joins table (or creates a table against bots) on the server at address, see client.py.
+        everything printed comes from the server's events, and this player's choices are sent back as requests.
+        '''
+        self.client = GameClient(address)
+        self.remote = RemoteBoard()
+        self.client.join(input('what is your name?'),table,bots)
+        waiting = False
+        while not self.client.closed and self.remote.phase!='over':
+            for event in self.client.receive(waiting or not self.remote.isMyTurn()):
+                self.remote.apply(event)
+                self.printEvent(event)
+                waiting = False
+            if waiting or not self.remote.isMyTurn():
+                continue
+            waiting = True
+            if self.remote.phase=='move':
+                print(f"You have rolled: {self.remote.dice}")
+                progress = self.remote.getActivePlayerProgress()
+                if progress:
+                    print(f'Your markers are on the following spaces: ')
+                    for num,col in progress.items():
+                        print(f'{num}:{col}')
+                if self.remote.white:
+                    print(f'Your white pieces are in the following columns: {sorted(self.remote.white)}')
+                self.client.send({'op':'move','sums':self.selectOption(self.remote.moves,'move')})
+            elif self.remote.phase=='choose' and not self.rollAgainBool():
+                self.client.send({'op':'stop'})
+            else:
+                self.client.send({'op':'roll'})
+        self.client.close()
+    def printEvent(self,event):
+        '''
+        prints what an event from the server means, using the remote board it has already been applied to.
+        '''
+        kind = event.get('event')
+        remote = self.remote
+        seat = event.get('seat',-1)
+        name = remote.names[seat] if 0<=seat<len(remote.names) else ''
+        if kind=='created':
+            print(f'You have made table {event["table"]}. Other players can join it by its number.')
+        elif kind=='joined' and seat>=0:
+            print(f'{event["name"]} has joined table {event["table"]}')
+        elif kind=='left':
+            print(f'{name} has left the table')
+        elif kind=='state':
+            if remote.phase=='waiting':
+                print('Waiting for the other players to join...')
+            else:
+                print(f'Players: {", ".join(f"{i}. {x}" for i,x in enumerate(remote.names))}')
+                print(f'It is {remote.activeName()}\'s turn')
+        elif kind=='roll' and seat!=remote.seat:
+            print(f'{name} rolled {event["dice"]}')
+        elif kind=='move':
+            if seat!=remote.seat:
+                print(f'{name} played {event["sums"]}')
+            owner = 'Your' if seat==remote.seat else f'{name}\'s'
+            for col,step in event['white']:
+                if step==remote.tops[col]:
+                    print(f'{owner} white piece has reached the end of column {col}.')
+        elif kind=='bust':
+            print(f'Oh no, {name}! You have bombed! Your progress from this turn is lost.')
+        elif kind=='stop':
+            print(f'{name} has stopped and saved their progress.')
+            for col in event['done']:
+                print(f'{name} has completed column {col}!')
+        elif kind=='turn':
+            print(f'It is {name}\'s turn')
+        elif kind=='win':
+            print(f'{name} Won!!')
+        elif kind=='error':
+            print(event['message'])
+    def saveRecord(self):
+        '''
+        appends the recorded game (finished or not) to the log at logPath
+        '''
+        if self.logPath:
+            with GameLogWriter(self.logPath) as log:
+                log.writeGame(self.board.record)
+    def rollAgainBool(self):
+        if input('Do you want to roll again? (return any letter for yes, return nothing for no)') == '':
+            return False
+        return True
+    def chooseSums(self):
+        dice = self.board.dice.roll()
+        sums = self.board.filterSums()
+        if not sums:
+            return False
+        whitePieces = list(self.board.colsWithWhitePieces.keys())
+        whitePieces.sort()
+        print(f"You have rolled: {dice}")
+        print(f"Your sums are: {sums}")
+        progress = self.board.getActivePlayerProgress()
+        if progress:
+            print(f'Your markers are on the following spaces: ')
+            for num,col in progress.items():
+                print(f'{num}:{col}')
+        if len(whitePieces)>0:
+            print(f'Your white pieces are in the following columns: {whitePieces}')
+        selectedSums = self.selectOption(sums, 'columns')
+        options = self.board.resolveSums(selectedSums)
+        selectedSums = []
+        if len(options)>1:
+            print('You only have one free white piece left. Which column would you like to play on?')
+            selectedSums = self.selectOption(options)
+        elif len(options)==1:
+            selectedSums = options[0]
+        print(selectedSums)
+        if len(selectedSums)==0:
+            selectedSums=False
+        return selectedSums
+
+    def selectOption(self,lyst,nameOfThing="option"):
+        print(f'Select the index number of your chosen {nameOfThing}: ')
+        for i in range(len(lyst)):
+            print(f'Index {i}: {lyst[i]}')
+        while True:
+            x = input(f'input the index number of your chosen {nameOfThing}: ')
+            try:
+                return lyst[int(x)]
+            except:
+                nums = ''
+                for i in range(len(lyst)):
+                    nums +=f"{i}, "
+                nums = nums[:-2]
+                print(f'That selection is invalid. Please enter one of the following integers: {nums}')
+
+def main():
+    parser = argparse.ArgumentParser(description='Play Can\'t Stop in the terminal.')
+    parser.add_argument('log',nargs='?',default=False,help='path of a game log to append the game to')
+    parser.add_argument('--server',default=False,help='play on a server.py server at host:port or a Unix socket path')
+    parser.add_argument('--table',type=int,default=False,help='table to join on the server (without it, a new table is made)')
+    parser.add_argument('--bots',default='rule28',help='comma separated bots to play against at a new table')
+    args = parser.parse_args()
+    game = Terminal_game(args.log,args.server,args.table,args.bots.split(',') if args.bots else [])
+if __name__ == "__main__":
     main()
\ No newline at end of file
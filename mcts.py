@@ -0,0 +1,179 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is a Monte Carlo tree search bot for the multi-player game. Each decision is a move for
+the current roll together with whether to roll again afterwards. The bot plays many quick games
+out from the current position on a CompactBoard, and picks the decision that won most often for
+the player making it.
+
+Every search copies the CompactBoard once and then plays moves on that copy in place, so no
+Board objects are copied. Statistics are kept in a transposition table keyed by the position
+plus the roll, so the same position reached in different ways shares its results, and the
+table is kept between decisions.
+'''
+
+import math
+import time
+from game_classes import Dice
+from policies import Policy
+
+class Node:
+    '''
+    contains the search statistics for one position and roll.
+    actions is a list of (move, rollAgain) pairs, n[i] is how often action i was tried
+    and w[i] is how many of those tries the player choosing it went on to win.
+    '''
+    def __init__(self,actions) -> None:
+        self.actions = actions
+        self.visits = 0
+        self.n = [0]*len(actions)
+        self.w = [0]*len(actions)
+    def select(self,exploration):
+        '''
+        returns the index of the action to try next (UCT): untried actions first, then the best upper bound on the win rate.
+        '''
+        best = 0
+        bestScore = -1.0
+        logVisits = math.log(self.visits+1)
+        for i in range(len(self.actions)):
+            if self.n[i]==0:
+                return i
+            score = self.w[i]/self.n[i]+exploration*math.sqrt(logVisits/self.n[i])
+            if score>bestScore:
+                best = i
+                bestScore = score
+        return best
+class MCTSPolicy(Policy):
+    '''
+    chooses moves by Monte Carlo tree search, spending up to budgetMs milliseconds on each decision.
+    the transposition table is cleared when it grows past maxNodes positions.
+    '''
+    def __init__(self,budgetMs=50,exploration=1.0,maxNodes=200000,maxRolloutTurns=200) -> None:
+        self.budgetMs = budgetMs
+        self.exploration = exploration
+        self.maxNodes = maxNodes
+        self.maxRolloutTurns = maxRolloutTurns
+        self.table = {}
+        self.dice = Dice()
+        self.rollAgain = True
+    def newGame(self,rng):
+        super().newGame(rng)
+        self.dice = Dice(rng=rng)
+        self.table = {}
+    def chooseMove(self,view,moves):
+        root = view.toCompact(self.rng,self.dice)
+        action = self.search(root)
+        self.rollAgain = action[1]
+        return action[0]
+    def keepRolling(self,view):
+        return self.rollAgain
+    def getActions(self,board,moves):
+        '''
+        returns the list of (move, rollAgain) actions for a roll.
+        stopping is only an action after moves that leave no white pieces to place.
+        '''
+        actions = []
+        for move in moves:
+            actions.append((move,True))
+            newWhitePieces = len(set(x for x in move if not board.whitePieces[x]))
+            if board.whitePiecesLeft()<=newWhitePieces:
+                actions.append((move,False))
+        return actions
+    def getKey(self,state):
+        '''
+        returns the transposition table key of state (a CompactBoard) and its roll.
+        the roll takes 2 bytes, since bigger dice tables (see Rules) have more than 256 outcomes.
+        '''
+        return state.positionKey()+state.dice.index.to_bytes(2,'little')
+    def search(self,root):
+        '''
+        root is a CompactBoard that has just rolled. its dice are used for the search from now on.
+        runs searches until the time budget is used, and returns the action tried most at the root.
+        '''
+        if len(self.table)>self.maxNodes:
+            self.table = {}
+        rootIndex = root.dice.index
+        rootKey = self.getKey(root)
+        deadline = time.perf_counter()+self.budgetMs/1000
+        self.dice = root.dice
+        while True:
+            state = root.copy()
+            state.dice = self.dice
+            self.dice.setOutcome(rootIndex)
+            self.runOnce(state)
+            if time.perf_counter()>=deadline:
+                break
+        node = self.table[rootKey]
+        best = max(range(len(node.actions)),key=lambda i:node.n[i])
+        return node.actions[best]
+    def runOnce(self,state):
+        '''
+        plays one search from state (a CompactBoard copy it can change), adding a position to the table
+        and finishing the game with a quick rollout, then records who won along the path.
+        '''
+        path = []
+        winner = -1
+        while True:
+            moves = state.legalMoves()
+            if not moves:
+                state.bomb()
+                state.nextActivePlayer()
+                state.dice.roll()
+                continue
+            key = self.getKey(state)
+            node = self.table.get(key)
+            if node is None:
+                self.table[key] = Node(self.getActions(state,moves))
+                winner = self.rollout(state,moves)
+                break
+            i = node.select(self.exploration)
+            path.append((node,i,state.activePlayer))
+            move,rollAgain = node.actions[i]
+            state.setWhitePieces(move)
+            if state.whitePiecesLeft()==0 and not rollAgain:
+                state.stopTurn()
+                if state.didActivePlayerWin():
+                    winner = state.activePlayer
+                    break
+                state.nextActivePlayer()
+            state.dice.roll()
+        for node,i,player in path:
+            node.visits += 1
+            node.n[i] += 1
+            if player==winner:
+                node.w[i] += 1
+    def rollout(self,state,moves):
+        '''
+        finishes the game from state with random moves. once every white piece is placed, a player stops when 
+        the chance of bombing times the steps they would lose is more than the chance of gaining another step.
+        returns the index of the winner, or -1 if nobody won within maxRolloutTurns turns.
+        '''
+        turns = 0
+        while turns<self.maxRolloutTurns:
+            if moves:
+                state.setWhitePieces(moves[int(self.rng.random()*len(moves))])
+                if state.whitePiecesLeft()!=0 or self.rolloutKeepRolling(state):
+                    state.dice.roll()
+                    moves = state.legalMoves()
+                    continue
+                state.stopTurn()
+                if state.didActivePlayerWin():
+                    return state.activePlayer
+            else:
+                state.bomb()
+            turns += 1
+            state.nextActivePlayer()
+            state.dice.roll()
+            moves = state.legalMoves()
+        return -1
+    def rolloutKeepRolling(self,state):
+        '''
+        returns True if a rollout player should roll again (see self.rollout).
+        '''
+        progress = state.progress[state.activePlayer]
+        steps = 0
+        for x in state.whiteCols:
+            steps += state.whitePieces[x]-progress[x]
+        bust = state.bustProbability()
+        return bust*steps<1-bust
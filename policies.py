@@ -0,0 +1,188 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This file holds the decision making for computer players. A policy is given a read-only
+BoardView and the list of legal moves for the current roll, and it decides which move to play
+and whether to keep rolling. The simulator uses these policies directly, and the terminal and
+GUI versions share Board.resolveSums() with Board.legalMoves(), so every part of the game works
+out the legal moves the same way.
+
+Policies do very little work per decision, so they can be called millions of times in a
+simulation.
+'''
+
+import abc
+import random
+from compact_board import CompactBoard
+from game_classes import Board
+
+# the rule of 28 value for each column: rarer sums are worth more
+COL_VALUES = {2:6,3:5,4:4,5:3,6:2,7:1,8:2,9:3,10:4,11:5,12:6}
+
+class BoardView:
+    '''
+    a read-only view of a Board for policies.
+    seats are player indexes, and spaces are Space names (-1 means no marker).
+    '''
+    def __init__(self,board) -> None:
+        assert isinstance(board,Board)
+        self._board = board
+    def __str__(self) -> str:
+        return '<BoardView obj>\n' + str(self._board)
+    @property
+    def numPlayers(self):
+        return len(self._board.players)
+    @property
+    def activeSeat(self):
+        return self._board.activePlayer.index
+    @property
+    def activePlayerName(self):
+        return self._board.activePlayer.name
+    @property
+    def dice(self):
+        return self._board.dice.dice
+    def colLength(self,col):
+        '''
+        returns the name of the final Space of a column
+        '''
+        return len(self._board.cols[col].spaces)-1
+    def markerSpace(self,seat,col):
+        '''
+        returns the Space name of a player's marker in a column, or -1 if they have no marker there
+        '''
+        return self._board.players[seat].progress[col]-1
+    def whitePieces(self):
+        '''
+        returns a dictionary of {col name : Space name of the white piece}
+        '''
+        return {name:col.whitePiece.space.name for name,col in self._board.colsWithWhitePieces.items()}
+    def whitePiecesLeft(self):
+        return self._board.whitePiecesLeft()
+    def isColDone(self,col):
+        return bool(self._board.cols[col].donePlayer)
+    def doneCols(self,seat):
+        '''
+        returns a list of the names of the cols a player has completed
+        '''
+        return [col.name for col in self._board.players[seat].doneCols]
+    def colsToWin(self):
+        return self._board.colsToWin
+    def maxWhitePieces(self):
+        return self._board.maxWhitePieces
+    def bustProbability(self):
+        return self._board.bustProbability()
+    def toCompact(self,rng=False,dice=False):
+        '''
+        returns a CompactBoard copy of the board, for bots that search ahead.
+        rng is an optional random.Random for the copy's dice, and dice an optional Dice for it to reuse (see CompactBoard.fromBoard).
+        '''
+        return CompactBoard.fromBoard(self._board,rng,dice)
+class Policy(abc.ABC):
+    '''
+    decides the moves for a computer player.
+    policies that make random choices use self.rng, which is the random module until newGame gives them their own stream.
+    '''
+    rng = random
+    def newGame(self,rng):
+        '''
+        rng is a random.Random for this policy to use for the next game (see game_classes.getGameRng).
+        called by the simulator before each game, so that games can be repeated exactly.
+        '''
+        self.rng = rng
+    @abc.abstractmethod
+    def chooseMove(self,view,moves):
+        '''
+        view is a BoardView, moves is the non-empty tuple from Board.legalMoves().
+        returns one of the moves.
+        '''
+        pass
+    @abc.abstractmethod
+    def keepRolling(self,view):
+        '''
+        view is a BoardView. only called when every white piece has been placed.
+        returns True to roll again, or False to stop and save this turn's progress.
+        '''
+        pass
+class RandomPolicy(Policy):
+    '''
+    plays a random legal move, and keeps rolling with the chance rollChance.
+    '''
+    def __init__(self,rollChance=0.5) -> None:
+        self.rollChance = rollChance
+    def chooseMove(self,view,moves):
+        return moves[int(self.rng.random()*len(moves))]
+    def keepRolling(self,view):
+        return self.rng.random()<self.rollChance
+class GreedyPolicy(Policy):
+    '''
+    plays the move that advances the furthest through its columns,
+    and keeps rolling while the chance of bombing is at most maxBust and no white piece has completed a column.
+    '''
+    def __init__(self,maxBust=0.2) -> None:
+        self.maxBust = maxBust
+    def chooseMove(self,view,moves):
+        best = moves[0]
+        bestScore = -1
+        for move in moves:
+            score = 0
+            for x in move:
+                score += 1/view.colLength(x)
+            if score>bestScore:
+                best = move
+                bestScore = score
+        return best
+    def keepRolling(self,view):
+        for col,space in view.whitePieces().items():
+            if space==view.colLength(col):
+                return False
+        return view.bustProbability()<=self.maxBust
+class RuleOf28Policy(Policy):
+    '''
+    plays with the "rule of 28": every space a white piece advances this turn is worth its column's value
+    (placing a white piece counts one extra time), 2 is added if every white piece is on an odd column
+    and 2 is taken off if they are all on even columns. the player stops once the total reaches 28.
+    moves that place fewer new white pieces are preferred, then moves that score the most.
+    '''
+    def __init__(self,limit=28) -> None:
+        self.limit = limit
+    def chooseMove(self,view,moves):
+        whitePieces = view.whitePieces()
+        best = moves[0]
+        bestScore = None
+        for move in moves:
+            newWhitePieces = 0
+            value = 0
+            for x in move:
+                if x not in whitePieces:
+                    newWhitePieces += 1
+                value += COL_VALUES[x]
+            score = (-newWhitePieces,value)
+            if bestScore is None or score>bestScore:
+                best = move
+                bestScore = score
+        return best
+    def keepRolling(self,view):
+        seat = view.activeSeat
+        score = 0
+        odd = 0
+        for col,space in view.whitePieces().items():
+            if space==view.colLength(col):
+                return False
+            score += COL_VALUES[col]*(space-view.markerSpace(seat,col)+1)
+            odd += col%2
+        if odd==view.maxWhitePieces():
+            score += 2
+        elif odd==0:
+            score -= 2
+        return score<self.limit
+def makeMCTSPolicy(*args,**kwargs):
+    '''
+    returns a new mcts.MCTSPolicy.
+    mcts is only imported here, when a search bot is wanted, since it imports this file.
+    '''
+    from mcts import MCTSPolicy
+    return MCTSPolicy(*args,**kwargs)
+
+# {name : policy class, or a function that makes the policy}
+POLICIES = {'random':RandomPolicy,'greedy':GreedyPolicy,'rule28':RuleOf28Policy,'mcts':makeMCTSPolicy}
@@ -0,0 +1,186 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This file reads game logs written by game_record.GameLogWriter for analysis. Each log is
+memory-mapped with NumPy instead of being read into GameRecord objects, so the per-roll fields
+(seat, outcome, move, flags) are views straight onto the file, and the operating system only
+loads the parts of a multi-GB log that are actually used.
+
+A Replay holds any number of logs (for example every chunk written by simulate.py --log-dir).
+Its analytics are worked out from counts per log and then added up, so nothing is ever copied
+into one big array:
+    winRates()                   - the fraction of games won by each seat
+    turnLength()                 - the average number of rolls per turn
+    bustRateByWhitePieces()      - the chance of bombing, by the number of white pieces placed before the roll
+
+Like batch_sim.py, this file needs NumPy.
+'''
+
+import argparse
+import glob
+import os
+import numpy as np
+from game_classes import DICE_OUTCOMES
+from game_record import BUST,HEADER_SIZE,INDEX_ENTRY,RECORD_SIZE,STOP,WIN,GameLogReader
+
+RECORD_DTYPE = np.dtype([('seat','u1'),('outcome','u1'),('move','u1'),('flags','u1')])
+INDEX_DTYPE = np.dtype([('first','<u8'),('count','<u4'),('numPlayers','u1'),('winner','u1'),('reserved','<u2')])
+assert RECORD_DTYPE.itemsize==RECORD_SIZE and INDEX_DTYPE.itemsize==INDEX_ENTRY.size
+# DICE_ARRAY[outcome] is the sorted dice of that outcome
+DICE_ARRAY = np.array(DICE_OUTCOMES,dtype=np.int8)
+
+def mapFile(path,dtype):
+    '''
+    returns a read-only memory map of the whole records of dtype after a log file's header.
+    a partly written record at the end of the file is left out.
+    '''
+    count = (os.path.getsize(path)-HEADER_SIZE)//dtype.itemsize
+    if count<=0:
+        return np.empty(0,dtype=dtype)
+    return np.memmap(path,dtype=dtype,mode='r',offset=HEADER_SIZE,shape=(count,))
+class ReplayFile:
+    '''
+    contains one memory-mapped game log.
+    records has one entry per roll and games has one entry per game (see game_record.py).
+    only the rolls of games in the index are used, so a game that was being written when the log stopped is left out.
+    '''
+    def __init__(self,path) -> None:
+        # checks the headers
+        GameLogReader(path).close()
+        self.path = path
+        self.games = mapFile(path+'.idx',INDEX_DTYPE)
+        records = mapFile(path,RECORD_DTYPE)
+        end = 0
+        if len(self.games):
+            end = int(self.games['first'][-1])+int(self.games['count'][-1])
+        self.records = records[:end]
+    def __str__(self) -> str:
+        return f'<ReplayFile obj> {self.path}: games = {len(self.games)}, rolls = {len(self.records)}'
+    @property
+    def seat(self):
+        return self.records['seat']
+    @property
+    def outcome(self):
+        return self.records['outcome']
+    @property
+    def move(self):
+        return self.records['move']
+    @property
+    def flags(self):
+        return self.records['flags']
+    def dice(self):
+        '''
+        returns a (rolls,4) array of the sorted dice of every roll
+        '''
+        return DICE_ARRAY[self.outcome]
+    def sums(self):
+        '''
+        returns a (rolls,2) array of the sums played on every roll (0 for none)
+        '''
+        move = self.move
+        return np.stack([move>>4,move & 15],axis=1)
+    def busted(self):
+        return (self.flags & BUST)>0
+    def stopped(self):
+        return (self.flags & STOP)>0
+    def won(self):
+        return (self.flags & WIN)>0
+    def whitePiecesBefore(self):
+        '''
+        returns the number of white pieces placed before every roll
+        '''
+        return self.flags>>4
+    def colsAdvanced(self):
+        '''
+        returns the number of different columns advanced by every roll
+        '''
+        a = self.move>>4
+        b = self.move & 15
+        return (a>0).astype(np.int8)+((b>0) & (b!=a))
+    def turnEnds(self):
+        '''
+        returns True for every roll that ended a turn (a bomb or a stop)
+        '''
+        return (self.flags & (BUST|STOP))>0
+    def gameIds(self,rolls):
+        '''
+        rolls is an array of roll numbers in this file. returns the number of the game each one is from.
+        '''
+        return np.searchsorted(self.games['first'],rolls,side='right')-1
+class Replay:
+    '''
+    contains any number of game logs, given as paths or glob patterns.
+    '''
+    def __init__(self,*paths) -> None:
+        self.files = []
+        for pattern in paths:
+            for path in sorted(glob.glob(pattern)) or [pattern]:
+                if not path.endswith('.idx'):
+                    self.files.append(ReplayFile(path))
+    def __str__(self) -> str:
+        return f'<Replay obj> files = {len(self.files)}, games = {self.numGames()}, rolls = {self.numRolls()}'
+    def numGames(self):
+        return sum(len(x.games) for x in self.files)
+    def numRolls(self):
+        return sum(len(x.records) for x in self.files)
+    def winRates(self):
+        '''
+        returns an array of the fraction of games won by each seat.
+        games nobody won count as games, so the rates can add up to less than 1.
+        '''
+        wins = np.zeros(256,dtype=np.int64)
+        games = 0
+        for x in self.files:
+            wins += np.bincount(x.games['winner'],minlength=256)
+            games += len(x.games)
+        numPlayers = max([int(x.games['numPlayers'].max()) for x in self.files if len(x.games)],default=0)
+        return wins[:numPlayers]/max(games,1)
+    def turnLength(self):
+        '''
+        returns the average number of rolls in a turn that ended with a bomb or a stop
+        '''
+        rolls = 0
+        turns = 0
+        for x in self.files:
+            ends = np.flatnonzero(x.turnEnds())
+            if len(ends)==0:
+                continue
+            turns += len(ends)
+            # rolls after the last turn end of a game belong to a turn that never ended
+            first = x.games['first'].astype(np.int64)
+            games = x.gameIds(ends)
+            last = np.append(games[1:]!=games[:-1],True)
+            rolls += int((ends[last]-first[games[last]]+1).sum())
+        return rolls/max(turns,1)
+    def bustRateByWhitePieces(self):
+        '''
+        returns an array of the chance of bombing on a roll made with 0, 1, 2, ... white pieces already placed
+        '''
+        rolls = np.zeros(16,dtype=np.int64)
+        busts = np.zeros(16,dtype=np.int64)
+        for x in self.files:
+            whitePieces = x.whitePiecesBefore()
+            rolls += np.bincount(whitePieces,minlength=16)
+            busts += np.bincount(whitePieces[x.busted()],minlength=16)
+        used = np.flatnonzero(rolls)
+        size = int(used[-1])+1 if len(used) else 0
+        return busts[:size]/np.maximum(rolls[:size],1)
+    def close(self):
+        '''
+        drops the memory maps. the arrays from this Replay must not be used afterwards.
+        '''
+        self.files = []
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize recorded Can\'t Stop games.')
+    parser.add_argument('logs',nargs='+',help='game log files or glob patterns, e.g. "logs/*.csr"')
+    args = parser.parse_args()
+    replay = Replay(*args.logs)
+    print(replay)
+    print(f'win rates by seat = {", ".join(f"{x:.4f}" for x in replay.winRates())}')
+    print(f'rolls per turn = {replay.turnLength():.3f}')
+    for i,rate in enumerate(replay.bustRateByWhitePieces()):
+        print(f'bust rate with {i} white pieces placed = {rate:.4f}')
+if __name__ == "__main__":
+    main()
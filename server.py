@@ -0,0 +1,500 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is a game server that hosts many Can't Stop tables at once in one process, on a TCP port
+or a Unix socket. It uses asyncio, so there is no thread per game: every table is an actor with
+its own inbox and task, and only that task ever touches the table's Board, so nothing needs
+locks. Seats can be played by people (through client.py or anything else that speaks the
+protocol) or by bots from policies.POLICIES, which the server plays itself.
+
+The protocol is one JSON object per line in each direction. Requests have an "op":
+    {"op":"list"}                                          - list the tables
+    {"op":"create","seats":[null,"rule28"],"name":"Dawn"}  - make a table. null seats are for people and the
+                                                             others name the bot that plays them. the creator
+                                                             takes the first free seat, or watches if there is
+                                                             none (or "watch" is true). "test" uses the test board.
+    {"op":"join","table":1,"name":"Dawn"}                  - take the first free seat of a table, or watch it if
+                                                             it is full (or "watch" is true)
+    {"op":"roll"}, {"op":"move","sums":[6,8]}, {"op":"stop"} - play a turn (only the active seat may)
+    {"op":"state"}                                         - ask for the whole state again
+    {"op":"leave"}                                         - leave the table. the seat can be taken again by a join
+The game starts once every seat is filled, and each table sends its players and watchers one
+"state" event with the whole game, then only deltas. Positions are "steps" like CompactBoard:
+0 means no marker and n means Space n-1, and a column is complete when it reaches its top.
+    state   - table, seat (-1 for watchers), players, bots, tops ([col, top] pairs), progress (steps per player,
+              indexed by col), white and done ([col, step] and [col, seat] pairs), active, dice, moves, phase, winner,
+              maxWhitePieces, colsToWin, numDice, sides
+    joined  - seat, name (seat -1 for a watcher)       left - seat
+    roll    - seat, dice, moves (the legal moves, empty if the roll bombs)
+    move    - seat, sums, white (the new [col, step] of each white piece that moved)
+    bust    - seat (every white piece is cleared)
+    stop    - seat, markers (the new [col, step] of each of the seat's markers that moved), done (cols it completed)
+    turn    - seat (the next player's turn starts)
+    win     - seat
+    error   - message (the request was not carried out)
+The phase in the state is 'waiting' (for players), 'roll', 'move' (a roll to play), 'choose' (roll or stop) or 'over'.
+
+Bots play one roll at a time and let the other tables run in between, but each decision runs on
+the event loop, so search bots like mcts hold up every table for their time budget.
+
+Run it from the command line, for example:
+    python server.py --port 8765
+    python server.py --unix /tmp/cantstop.sock --log games.csr
+'''
+
+import argparse
+import asyncio
+import json
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from game_classes import Board,getGameRng
+from game_record import GameLogWriter
+from policies import POLICIES,BoardView
+
+# the longest request line a client may send, in bytes
+MAX_LINE = 64*1024
+# a client that has this many bytes waiting to be sent to it is disconnected, so it cannot hold up its tables
+MAX_BUFFER = 1024*1024
+# how many new connections can wait to be accepted, so a whole ladder can connect at once
+BACKLOG = 1024
+TABLE_OPS = ('roll','move','stop','state','leave')
+
+def encode(message):
+    '''
+    returns a message (a dictionary) as one line of compact JSON in bytes
+    '''
+    return (json.dumps(message,separators=(',',':'))+'\n').encode()
+class Connection:
+    '''
+    contains one client.
+    messages are written straight into the socket's buffer, so a table never waits for a slow client.
+    table is the Table the client is at (False if none) and seat is its seat there (-1 when watching).
+    '''
+    def __init__(self,server,reader,writer) -> None:
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.table = False
+        self.seat = -1
+        self.name = ''
+    def __str__(self) -> str:
+        return f'<Connection obj> {self.name or "unnamed"}, table = {self.table and self.table.id}, seat = {self.seat}'
+    def send(self,message):
+        if self.writer.is_closing():
+            return
+        self.writer.write(encode(message))
+        if self.writer.transport.get_write_buffer_size()>MAX_BUFFER:
+            self.writer.close()
+    def error(self,message):
+        self.send({'event':'error','message':message})
+    async def run(self):
+        '''
+        reads requests until the client goes away, then leaves its table.
+        '''
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    if not isinstance(message,dict):
+                        raise ValueError('requests must be JSON objects')
+                    self.server.dispatch(self,message)
+                except ValueError as e:
+                    self.error(str(e))
+                except Exception as e:
+                    # a bug in one request must not drop the connection
+                    traceback.print_exc()
+                    self.error(f'the request could not be carried out: {e!r}')
+        except (ConnectionError,ValueError):
+            # a dropped connection, or a line longer than MAX_LINE
+            pass
+        finally:
+            if self.table:
+                self.table.post(self,{'op':'leave'})
+            self.writer.close()
+class Table:
+    '''
+    contains one game, run as an actor: every request for it goes into its inbox and is handled by its own task in order.
+    bots is a list with the POLICIES name of the bot for each seat, or None for a person.
+    seats is a list with the Connection in each seat, or False while it is free (bot seats are always False).
+    rng is an optional random.Random, which gives the dice and each bot their own stream like simulate.py.
+    '''
+    def __init__(self,server,id,bots,test=False,rng=False) -> None:
+        self.server = server
+        self.id = id
+        self.bots = bots
+        self.test = test
+        self.rng = rng
+        self.seats = [False for x in bots]
+        self.names = [f'{x}{i}' if x else f'player{i}' for i,x in enumerate(bots)]
+        self.policies = [POLICIES[x]() if x else False for x in bots]
+        self.watchers = []
+        self.board = False
+        self.view = False
+        self.phase = 'waiting'
+        self.moves = ()
+        self.winner = -1
+        self.inbox = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self.run())
+    def __str__(self) -> str:
+        return f'<Table obj> {self.id}: players = {self.names}, phase = {self.phase}'
+    def summary(self):
+        return {'table':self.id,'players':self.names,'bots':self.bots,'free':self.freeSeats(),'phase':self.phase}
+    def freeSeats(self):
+        return [i for i in range(len(self.bots)) if not self.bots[i] and not self.seats[i]]
+    def connections(self):
+        return [x for x in self.seats if x]+self.watchers
+    def broadcast(self,message):
+        line = encode(message)
+        for connection in self.connections():
+            if not connection.writer.is_closing():
+                connection.writer.write(line)
+                if connection.writer.transport.get_write_buffer_size()>MAX_BUFFER:
+                    connection.writer.close()
+    def post(self,connection,message):
+        '''
+        puts a request in the inbox. a connection of None closes the table.
+        '''
+        self.inbox.put_nowait((connection,message))
+    async def run(self):
+        while True:
+            connection,message = await self.inbox.get()
+            if connection is None:
+                break
+            try:
+                self.handle(connection,message)
+            except ValueError as e:
+                connection.error(str(e))
+            except Exception as e:
+                # a bug in one request must not end the table's task
+                traceback.print_exc()
+                connection.error(f'the request could not be carried out: {e!r}')
+            try:
+                await self.playBots()
+            except Exception as e:
+                traceback.print_exc()
+                self.broadcast({'event':'error','message':f'a bot could not play: {e!r}'})
+            if not self.connections() and self.inbox.empty():
+                # nobody is left to play or watch, even if the game is not over.
+                # a join still in the inbox keeps the table, since its connection already points at it
+                self.server.removeTable(self)
+                break
+    def handle(self,connection,message):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        carries out one request. raises ValueError if it cannot be carried out.
+        '''
+        op = message['op']
+        if op=='join':
+            self.join(connection,message.get('name'),message.get('watch',False))
+        elif op=='leave':
+            self.leave(connection)
+        elif op=='state':
+            connection.send(self.getState(connection.seat))
+        else:
+            if self.phase in ('waiting','over'):
+                raise ValueError(f'the game is {"over" if self.phase=="over" else "waiting for players"}')
+            if connection.seat!=self.board.activePlayer.index or self.seats[connection.seat] is not connection:
+                raise ValueError('it is not your turn')
+            if op=='roll':
+                if self.phase not in ('roll','choose'):
+                    raise ValueError('choose a move first')
+                self.roll()
+            elif op=='move':
+                if self.phase!='move':
+                    raise ValueError('roll first')
+                sums = message.get('sums')
+                if not isinstance(sums,list) or not all(isinstance(x,int) for x in sums):
+                    raise ValueError('sums must be a list of integers')
+                move = tuple(sorted(sums))
+                if move not in self.moves:
+                    raise ValueError(f'{list(move)} is not a legal move, choose from {[list(x) for x in self.moves]}')
+                self.move(move)
+            elif op=='stop':
+                if self.phase!='choose':
+                    raise ValueError('you can only stop once every white piece is placed')
+                self.stop()
+    def join(self,connection,name,watch):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        seats connection in the first free seat (or as a watcher), and starts the game once every seat is filled.
+        '''
+        free = self.freeSeats()
+        if watch or not free:
+            connection.seat = -1
+            self.watchers.append(connection)
+            connection.send({'event':'joined','table':self.id,'seat':-1,'name':connection.name})
+            if self.board:
+                connection.send(self.getState(-1))
+            elif not free:
+                # every seat is a bot
+                self.start()
+            return
+        seat = free[0]
+        connection.seat = seat
+        self.seats[seat] = connection
+        if name and not self.board:
+            self.names[seat] = str(name)
+        self.broadcast({'event':'joined','table':self.id,'seat':seat,'name':self.names[seat]})
+        if self.board:
+            connection.send(self.getState(seat))
+        elif not self.freeSeats():
+            self.start()
+    def leave(self,connection):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        '''
+        connection.table = False
+        if connection in self.watchers:
+            self.watchers.remove(connection)
+        elif 0<=connection.seat<len(self.seats) and self.seats[connection.seat] is connection:
+            self.seats[connection.seat] = False
+            self.broadcast({'event':'left','seat':connection.seat})
+        connection.seat = -1
+    def start(self):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        '''
+        rng = False
+        if self.rng:
+            rng = getGameRng(self.rng.random(),'dice')
+            for i in range(len(self.policies)):
+                if self.policies[i]:
+                    self.policies[i].newGame(getGameRng(self.rng.random(),'seat',i))
+        self.board = Board(self.names,self.test,rng)
+        self.view = BoardView(self.board)
+        if self.server.log:
+            self.board.recordGame()
+        self.phase = 'roll'
+        for seat,connection in enumerate(self.seats):
+            if connection:
+                connection.send(self.getState(seat))
+        for connection in self.watchers:
+            connection.send(self.getState(-1))
+    def getState(self,seat):
+        '''
+        returns the state event: the whole game as seen from seat (-1 for watchers)
+        '''
+        state = {'event':'state','table':self.id,'seat':seat,'players':self.names,'bots':self.bots,'phase':self.phase,'winner':self.winner}
+        if not self.board:
+            return state
+        board = self.board
+        state.update({
+            'tops':[[name,len(col.spaces)] for name,col in board.cols.items()],
+            'progress':[list(player.progress) for player in board.players],
+            'white':[[name,col.whitePiece.space.name+1] for name,col in board.colsWithWhitePieces.items()],
+            'done':[[name,col.donePlayer.index] for name,col in board.cols.items() if col.donePlayer],
+            'active':board.activePlayer.index,
+            'maxWhitePieces':board.maxWhitePieces,
+            'colsToWin':board.colsToWin,
+            'numDice':board.rules.numDice,
+            'sides':board.rules.sides,
+            'dice':list(board.dice.dice),
+            'moves':[list(x) for x in self.moves] if self.phase=='move' else [],
+        })
+        return state
+    def roll(self):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        rolls for the active player, and ends the turn if the roll bombs.
+        '''
+        board = self.board
+        seat = board.activePlayer.index
+        board.dice.roll()
+        self.moves = board.legalMoves()
+        self.broadcast({'event':'roll','seat':seat,'dice':list(board.dice.dice),'moves':[list(x) for x in self.moves]})
+        if self.moves:
+            self.phase = 'move'
+            return
+        board.applySums(False)
+        self.broadcast({'event':'bust','seat':seat})
+        board.stopTurn()
+        self.nextTurn()
+    def move(self,move):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        move is one of self.moves.
+        '''
+        board = self.board
+        board.applySums(list(move))
+        white = [[x,board.cols[x].whitePiece.space.name+1] for x in sorted(set(move))]
+        self.broadcast({'event':'move','seat':board.activePlayer.index,'sums':list(move),'white':white})
+        self.moves = ()
+        self.phase = 'roll' if board.whitePiecesLeft()!=0 else 'choose'
+    def stop(self):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        saves the active player's progress, then ends the game or passes the turn.
+        '''
+        board = self.board
+        player = board.activePlayer
+        cols = sorted(board.colsWithWhitePieces)
+        doneBefore = len(player.doneCols)
+        board.stopTurn()
+        self.broadcast({'event':'stop','seat':player.index,'markers':[[x,player.progress[x]] for x in cols],
+            'done':[col.name for col in player.doneCols[doneBefore:]]})
+        if board.didActivePlayerWin():
+            self.phase = 'over'
+            self.winner = player.index
+            self.broadcast({'event':'win','seat':player.index})
+            if board.record:
+                self.server.saveRecord(board.record)
+            return
+        self.nextTurn()
+    def nextTurn(self):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        '''
+        self.board.nextActivePlayer()
+        self.phase = 'roll'
+        self.broadcast({'event':'turn','seat':self.board.activePlayer.index})
+    async def playBots(self):
+        '''
+        This function is only used by Table itself. Do not call from outside.
+        plays while a bot is the active player (and someone is at the table), one roll at a time, letting the other tables run in between.
+        stops early if a request arrives, so it is handled (run() calls this again afterwards).
+        '''
+        while self.board and self.phase!='over' and self.bots[self.board.activePlayer.index] and self.connections() and self.inbox.empty():
+            policy = self.policies[self.board.activePlayer.index]
+            if self.phase=='choose' and not policy.keepRolling(self.view):
+                self.stop()
+            else:
+                self.roll()
+                if self.phase=='move':
+                    self.move(tuple(policy.chooseMove(self.view,self.moves)))
+            await asyncio.sleep(0)
+class GameServer:
+    '''
+    contains every table and sends requests to them.
+    if seed is given, each table's dice and bots get random streams from it, so a ladder can be repeated.
+    if logPath is given, every finished game is recorded to that game log (see game_record.py).
+    the log is written (and synced to disk) on its own thread, so the tables never wait for the disk.
+    '''
+    def __init__(self,seed=None,logPath=False) -> None:
+        self.seed = seed
+        self.tables = {}
+        self.nextTable = 1
+        self.log = False
+        self.logExecutor = False
+        if logPath:
+            self.log = GameLogWriter(logPath)
+            # one thread, so the games are written in the order they finished
+            self.logExecutor = ThreadPoolExecutor(max_workers=1)
+    def __str__(self) -> str:
+        return f'<GameServer obj> tables = {len(self.tables)}'
+    def dispatch(self,connection,message):
+        '''
+        carries out a request from connection, or sends it to the connection's table.
+        raises ValueError if the request is not valid.
+        '''
+        op = message.get('op')
+        if op=='list':
+            connection.send({'event':'tables','tables':[x.summary() for x in self.tables.values()]})
+        elif op=='create':
+            # checked before the table is made, so a failed create does not leave an empty table behind
+            self.checkNoTable(connection)
+            table = self.createTable(message.get('seats'),bool(message.get('test',False)))
+            connection.send({'event':'created','table':table.id})
+            self.joinTable(connection,table,message)
+        elif op=='join':
+            if not isinstance(message.get('table'),int) or isinstance(message.get('table'),bool):
+                raise ValueError('table must be a table number')
+            table = self.tables.get(message['table'])
+            if not table:
+                raise ValueError(f'there is no table {message.get("table")}')
+            self.joinTable(connection,table,message)
+        elif op in TABLE_OPS:
+            if not connection.table:
+                raise ValueError('join a table first')
+            connection.table.post(connection,message)
+        else:
+            raise ValueError(f'unknown op {op}')
+    def joinTable(self,connection,table,message):
+        '''
+        This function is only used by GameServer itself. Do not call from outside.
+        '''
+        self.checkNoTable(connection)
+        if message.get('name'):
+            connection.name = str(message['name'])
+        connection.table = table
+        table.post(connection,{'op':'join','name':message.get('name'),'watch':bool(message.get('watch',False))})
+    def checkNoTable(self,connection):
+        '''
+        This function is only used by GameServer itself. Do not call from outside.
+        raises ValueError if connection is already at a table.
+        '''
+        if connection.table:
+            raise ValueError(f'you are already at table {connection.table.id}, leave it first')
+    def createTable(self,seats,test=False):
+        '''
+        seats is a list with None for each person and a POLICIES name for each bot.
+        returns the new Table.
+        '''
+        if not isinstance(seats,list) or not 2<=len(seats)<=255:
+            raise ValueError('seats must be a list of 2 or more seats')
+        for x in seats:
+            if x is not None and not isinstance(x,str):
+                raise ValueError('each seat must be null for a person or the name of a bot')
+            if x is not None and x not in POLICIES:
+                raise ValueError(f'unknown bot {x}, choose from {", ".join(POLICIES)}')
+        rng = False
+        if self.seed is not None:
+            rng = getGameRng(self.seed,'table',self.nextTable)
+        table = Table(self,self.nextTable,seats,test,rng)
+        self.tables[table.id] = table
+        self.nextTable += 1
+        return table
+    def saveRecord(self,record):
+        '''
+        record is a finished game's GameRecord. appends it to the log on the log's thread.
+        '''
+        asyncio.get_running_loop().run_in_executor(self.logExecutor,self.log.writeGame,record)
+    def removeTable(self,table):
+        self.tables.pop(table.id,None)
+    async def handleClient(self,reader,writer):
+        try:
+            await Connection(self,reader,writer).run()
+        except asyncio.CancelledError:
+            # the server is shutting down with the client still connected
+            pass
+    async def serve(self,host='127.0.0.1',port=8765,path=False):
+        '''
+        serves clients on a Unix socket at path if it is given, or on host and port, until cancelled.
+        '''
+        if path:
+            server = await asyncio.start_unix_server(self.handleClient,path,limit=MAX_LINE,backlog=BACKLOG)
+        else:
+            server = await asyncio.start_server(self.handleClient,host,port,limit=MAX_LINE,backlog=BACKLOG)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+    def close(self):
+        for table in list(self.tables.values()):
+            table.post(None,None)
+        self.tables = {}
+        if self.log:
+            self.logExecutor.shutdown(wait=True)
+            self.log.close()
+            self.log = False
+
+def main():
+    parser = argparse.ArgumentParser(description='Host Can\'t Stop tables for clients and bots.')
+    parser.add_argument('--host',default='127.0.0.1')
+    parser.add_argument('--port',type=int,default=8765)
+    parser.add_argument('--unix',default=False,help='path of a Unix socket to listen on instead of a TCP port')
+    parser.add_argument('--seed',type=int,default=None,help='seed for the dice and bots of every table')
+    parser.add_argument('--log',default=False,help='game log to record every finished game to')
+    args = parser.parse_args()
+    server = GameServer(args.seed,args.log)
+    print(f'serving on {args.unix or f"{args.host}:{args.port}"}',flush=True)
+    try:
+        asyncio.run(server.serve(args.host,args.port,args.unix))
+    except KeyboardInterrupt:
+        pass
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is a headless driver for Can't Stop. It plays complete games between bot policies using
+the same Board back end as the terminal and GUI versions, without asking for any input.
+Games are split into chunks and played across a process pool, and each chunk sends its
+totals back to the parent as soon as it is done. The dice and each seat's policy get their own
+random stream per game from game_classes.getGameRng, seeded by the game's number, so the
+results are the same for any number of processes and any chunk size.
+
+Each seat is played by one of the policies in policies.POLICIES.
+
+With --instrument N, the Board phases are counted and every N'th call is timed (see
+instrumentation.py), and the totals are printed with the results.
+
+With --log-dir, every game is also recorded (see game_record.py). Each chunk writes its own
+log file, games-<chunk>.csr, so workers never share a file.
+
+Run it from the command line, for example:
+    python simulate.py --games 100000 --policies random,random
+'''
+
+import argparse
+import os
+import random
+from multiprocessing import Pool
+from game_classes import Board,getGameRng
+from game_record import GameLogWriter
+from instrumentation import Instrumentation
+from policies import POLICIES,BoardView
+
+class SimulationStats:
+    '''
+    contains the totals for a set of simulated games.
+    wins[seat] is the number of games won by the player in that seat.
+    '''
+    def __init__(self,numPlayers) -> None:
+        self.games = 0
+        self.wins = [0]*numPlayers
+        self.unfinished = 0
+        self.turns = 0
+        self.busts = 0
+        self.rolls = 0
+        self.instrumentation = False
+    def __str__(self) -> str:
+        if self.games==0:
+            return '<SimulationStats obj> no games'
+        winRates = ', '.join(f'{x/self.games:.4f}' for x in self.wins)
+        return (f'<SimulationStats obj> games = {self.games}\nwin rates by seat = {winRates}\n'
+            f'unfinished = {self.unfinished}\nturns per game = {self.turnsPerGame():.3f}\n'
+            f'busts per turn = {self.bustsPerTurn():.4f}\nrolls per turn = {self.rolls/max(self.turns,1):.3f}'
+            + (f'\n{self.instrumentation}' if self.instrumentation else ''))
+    def winRates(self):
+        '''
+        returns a list of the fraction of games won by each seat
+        '''
+        return [x/max(self.games,1) for x in self.wins]
+    def turnsPerGame(self):
+        return self.turns/max(self.games,1)
+    def bustsPerTurn(self):
+        return self.busts/max(self.turns,1)
+    def merge(self,other):
+        '''
+        other is a SimulationStats object.
+        adds the totals from other to this object.
+        '''
+        assert isinstance(other,SimulationStats)
+        self.games += other.games
+        for i in range(len(other.wins)):
+            self.wins[i] += other.wins[i]
+        self.unfinished += other.unfinished
+        self.turns += other.turns
+        self.busts += other.busts
+        self.rolls += other.rolls
+        if other.instrumentation:
+            if self.instrumentation:
+                self.instrumentation.merge(other.instrumentation)
+            else:
+                self.instrumentation = other.instrumentation
+def playGame(policies,stats,test=False,maxTurns=10000,log=False,seed=None,gameIndex=0):
+    '''
+    policies is a list of Policy objects, one for each seat.
+    plays one game to the end and adds its totals to stats (a SimulationStats object).
+    if log (a GameLogWriter) is given, the game is recorded and written to it.
+    if seed is given, the dice and policies get random streams for game number gameIndex of that seed.
+    returns the seat of the winner, or -1 if nobody won within maxTurns turns.
+    '''
+    rng = False
+    if seed is not None:
+        rng = getGameRng(seed,'dice',gameIndex)
+        for i in range(len(policies)):
+            policies[i].newGame(getGameRng(seed,'seat',gameIndex,i))
+    board = Board([f'seat{i}' for i in range(len(policies))],test,rng)
+    if stats.instrumentation:
+        board.instrument(stats.instrumentation)
+    if log:
+        board.recordGame()
+    winner = playBoard(board,policies,stats,maxTurns)
+    if log:
+        log.writeGame(board.record)
+    return winner
+def playBoard(board,policies,stats,maxTurns):
+    '''
+    plays the game on board for playGame.
+    '''
+    view = BoardView(board)
+    seat = 0
+    turns = 0
+    stats.games += 1
+    while turns<maxTurns:
+        board.dice.roll()
+        stats.rolls += 1
+        moves = board.legalMoves()
+        if moves:
+            board.applySums(list(policies[seat].chooseMove(view,moves)))
+            if board.whitePiecesLeft()!=0 or policies[seat].keepRolling(view):
+                continue
+        else:
+            board.applySums(False)
+            stats.busts += 1
+        board.stopTurn()
+        turns += 1
+        if board.didActivePlayerWin():
+            stats.turns += turns
+            stats.wins[seat] += 1
+            return seat
+        board.nextActivePlayer()
+        seat = (seat+1) % len(policies)
+    stats.turns += turns
+    stats.unfinished += 1
+    return -1
+def playChunk(args):
+    '''
+    args is a tuple of (policyNames, first, games, seed, chunk, test, logDir, sampleEvery).
+    plays games number first to first+games-1 in a worker process.
+    the random module is also seeded from the chunk, for policies that do not use their own stream.
+    if logDir is given, the games are appended to the chunk's log file in it.
+    if sampleEvery is given, the games are instrumented, timing every sampleEvery'th call of each phase.
+    returns a SimulationStats object.
+    '''
+    policyNames,first,games,seed,chunk,test,logDir,sampleEvery = args
+    random.seed(f'{seed}:{chunk}')
+    policies = [POLICIES[x]() for x in policyNames]
+    stats = SimulationStats(len(policies))
+    if sampleEvery:
+        stats.instrumentation = Instrumentation(sampleEvery)
+    log = False
+    if logDir:
+        log = GameLogWriter(os.path.join(logDir,f'games-{chunk:06d}.csr'))
+    for x in range(first,first+games):
+        playGame(policies,stats,test,log=log,seed=seed,gameIndex=x)
+    if log:
+        log.close()
+    return stats
+def runTournament(policyNames,games,processes=None,chunkSize=1000,seed=0,test=False,onProgress=None,logDir=False,sampleEvery=0):
+    '''
+    policyNames is a list of names from POLICIES, one for each seat.
+    plays games games across a pool of processes (all cores if processes is None).
+    onProgress, if given, is called with the running SimulationStats each time a chunk finishes.
+    if logDir is given, every game is recorded to a log file per chunk in that directory.
+    if sampleEvery is given, the Board phases are counted and timed (see playChunk).
+    returns a SimulationStats object with the totals of every game.
+    '''
+    for x in policyNames:
+        if x not in POLICIES:
+            raise ValueError(f'unknown policy {x}, choose from {", ".join(POLICIES)}')
+    if logDir:
+        os.makedirs(logDir,exist_ok=True)
+    chunks = []
+    for chunk in range((games+chunkSize-1)//chunkSize):
+        chunks.append((policyNames,chunk*chunkSize,min(chunkSize,games-chunk*chunkSize),seed,chunk,test,logDir,sampleEvery))
+    stats = SimulationStats(len(policyNames))
+    if processes==1:
+        results = map(playChunk,chunks)
+        for result in results:
+            stats.merge(result)
+            if onProgress:
+                onProgress(stats)
+        return stats
+    with Pool(processes) as pool:
+        for result in pool.imap_unordered(playChunk,chunks):
+            stats.merge(result)
+            if onProgress:
+                onProgress(stats)
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description='Play Can\'t Stop games between bots without a UI.')
+    parser.add_argument('--games',type=int,default=1000)
+    parser.add_argument('--policies',default='random,random',help=f'comma separated list of policies, one per seat: {", ".join(POLICIES)}')
+    parser.add_argument('--processes',type=int,default=None,help='number of worker processes (default: all cores)')
+    parser.add_argument('--chunk-size',type=int,default=1000)
+    parser.add_argument('--seed',type=int,default=0)
+    parser.add_argument('--test',action='store_true',help='use the short test board')
+    parser.add_argument('--log-dir',default=False,help='directory to record every game to')
+    parser.add_argument('--instrument',type=int,default=0,help='count the Board phases and time every N\'th call')
+    args = parser.parse_args()
+    def onProgress(stats):
+        print(f'{stats.games}/{args.games} games, win rates by seat {[round(x,4) for x in stats.winRates()]}',flush=True)
+    stats = runTournament(args.policies.split(','),args.games,args.processes,args.chunk_size,args.seed,args.test,onProgress,args.log_dir,args.instrument)
+    print(stats)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,541 @@
+'''
+Project Name: Can't Stop
+Description:
+
+This is an exact solver for the solitaire version of Can't Stop. It works out the fewest
+expected turns needed to complete colsToWin columns from every position, and so the best
+sums to choose and the best time to stop.
+
+A position between turns is the number of steps made in each column (see compact_board for
+"steps"), packed into one integer with a mixed radix. Its value is the expected number of
+turns left, counting the one about to be played. Steps can only go up, so positions are solved
+one level (total steps) at a time, from the most progressed down. Every position in a level
+only depends on higher levels and on itself (through bombing), so a level is split into
+chunks that are solved in parallel. The turn from a position is gone through once, keeping
+every value as a function of the position's own value x (a few straight lines, see TurnSolver),
+and the position's value is where that function crosses x.
+
+Values are written to a memory-mapped binary file as they are solved, and a small checkpoint
+file records the last finished level, so a long solve can be stopped and resumed. Bots read
+the file with ValueTable, which only maps it on first use.
+
+Sizes and run times (one core, pure Python):
+    5 columns of length 1, 2 to win         243 positions      about 2 seconds
+    5 columns of length 2, 2 to win         1,024 positions    about 20 seconds
+    --test board (11 columns of length 2)   4,194,304 positions, 33.5 MB, 826,686 to solve at 
+                                            about 0.3 s each: around 70 CPU hours
+    full board (default rules)              30,435,780,375 positions, a 243 GB table, and 
+                                            hundreds of CPU years: out of reach
+so the test board needs many processes and a run that is resumed from its checkpoint, and 
+smaller boards can be solved by making SolitaireRules directly.
+
+Run it from the command line, for example:
+    python solver.py values.bin --test
+'''
+
+import argparse
+import json
+import mmap
+import os
+import struct
+from multiprocessing import Pool
+from game_classes import CLASSIC_DICE,getColLengths,getColsMask,getLegalMoves
+from policies import Policy
+
+MAGIC = b'CSVT'
+VERSION = 1
+HEADER_SIZE = 64
+INF = float('inf')
+EPSILON = 1e-12
+MAX_LIMIT = 1e6
+
+class SolitaireRules:
+    '''
+    contains the columns and win condition the solver works with, and the packing of positions into integers.
+    colLengths is a dictionary of {col name : col length} like getColLengths().
+    '''
+    def __init__(self,colLengths=None,colsToWin=None,test=False,maxWhitePieces=3) -> None:
+        if colLengths is None:
+            colLengths = getColLengths(test)
+        if colsToWin is None:
+            colsToWin = 2 if test else 3
+        self.cols = sorted(colLengths)
+        self.colLengths = {x:colLengths[x] for x in self.cols}
+        self.colsToWin = colsToWin
+        self.maxWhitePieces = maxWhitePieces
+        self.tops = [colLengths[x]+1 for x in self.cols]
+        self.strides = []
+        size = 1
+        for top in self.tops:
+            self.strides.append(size)
+            size *= top+1
+        self.size = size
+        self.maxLevel = sum(self.tops)
+        self.colsMask = getColsMask(self.cols)
+    def __str__(self) -> str:
+        return f'<SolitaireRules obj> cols = {self.colLengths}, colsToWin = {self.colsToWin}, states = {self.size}'
+    def encode(self,steps):
+        '''
+        steps is a list with the steps made in each col (in the order of self.cols).
+        returns the position's index in the value table.
+        '''
+        index = 0
+        for i in range(len(steps)):
+            index += steps[i]*self.strides[i]
+        return index
+    def decode(self,index):
+        '''
+        returns the list of steps for a position's index in the value table.
+        '''
+        steps = []
+        for top in self.tops:
+            steps.append(index % (top+1))
+            index //= top+1
+        return steps
+    def isWon(self,steps):
+        '''
+        returns True if enough cols are complete to win.
+        '''
+        done = 0
+        for i in range(len(steps)):
+            if steps[i]==self.tops[i]:
+                done += 1
+        return done>=self.colsToWin
+    def getLevel(self,level):
+        '''
+        returns a list of the indexes of every position that has not been won with level total steps.
+        '''
+        states = []
+        steps = [0]*len(self.tops)
+        def fill(i,left):
+            if i==len(self.tops)-1:
+                if left<=self.tops[i]:
+                    steps[i] = left
+                    if not self.isWon(steps):
+                        states.append(self.encode(steps))
+                return
+            for x in range(min(left,self.tops[i])+1):
+                steps[i] = x
+                fill(i+1,left-x)
+        fill(0,level)
+        return states
+    def header(self):
+        '''
+        returns the header written at the start of a value table file.
+        '''
+        data = MAGIC + struct.pack('<BBBB',VERSION,self.colsToWin,self.maxWhitePieces,len(self.cols))
+        for x in self.cols:
+            data += struct.pack('<BB',x,self.colLengths[x])
+        assert len(data)<=HEADER_SIZE
+        return data.ljust(HEADER_SIZE,b'\0')
+    @classmethod
+    def fromHeader(cls,data):
+        '''
+        data is the header of a value table file.
+        returns the SolitaireRules it was solved for.
+        '''
+        if data[:4]!=MAGIC:
+            raise ValueError('not a Can\'t Stop value table')
+        version,colsToWin,maxWhitePieces,numCols = struct.unpack_from('<BBBB',data,4)
+        if version!=VERSION:
+            raise ValueError(f'unsupported value table version {version}')
+        colLengths = {}
+        for i in range(numCols):
+            name,length = struct.unpack_from('<BB',data,8+2*i)
+            colLengths[name] = length
+        return cls(colLengths,colsToWin,maxWhitePieces=maxWhitePieces)
+class ValueTable:
+    '''
+    contains a solved value table file.
+    the file is only opened and memory-mapped the first time a value is needed.
+    '''
+    def __init__(self,path,writable=False) -> None:
+        self.path = path
+        self.writable = writable
+        self.rules = False
+        self.file = False
+        self.map = False
+        self.values = False
+    def open(self):
+        '''
+        memory-maps the file, if that has not happened yet. returns self.
+        '''
+        if self.values:
+            return self
+        self.file = open(self.path,'r+b' if self.writable else 'rb')
+        self.rules = SolitaireRules.fromHeader(self.file.read(HEADER_SIZE))
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self.map = mmap.mmap(self.file.fileno(),0,access=access)
+        self.values = memoryview(self.map)[HEADER_SIZE:HEADER_SIZE+8*self.rules.size].cast('d')
+        return self
+    def close(self):
+        if self.values:
+            self.values.release()
+            self.map.close()
+            self.file.close()
+            self.values = False
+    def getRules(self):
+        return self.open().rules
+    def getValue(self,steps):
+        '''
+        steps is a list with the steps made in each col.
+        returns the expected number of turns left from that position, 0 if it has been won.
+        '''
+        self.open()
+        return self.values[self.rules.encode(steps)]
+def lowerEnvelope(lines,limit=INF):
+    '''
+    lines is a list of (a, b) pairs, each the line a+b*x.
+    returns the lowest of the lines at each x from 0 to limit, as a list of (start, a, b): the line a+b*x is the 
+    lowest from x = start up to the next start. this is how the solver stores values that depend on the anchor value x.
+    '''
+    if len(lines)==1:
+        return [(0.0,lines[0][0],lines[0][1])]
+    envelope = []
+    for a,b in sorted(lines,key=lambda line:(-line[1],line[0])):
+        start = 0.0
+        while envelope:
+            s,a0,b0 = envelope[-1]
+            if b0-b<EPSILON:
+                if a>=a0:
+                    start = None    # the same slope as the last line, but higher
+                    break
+            else:
+                start = (a-a0)/(b0-b)
+                if start>=limit:
+                    start = None    # only the lowest past the limit
+                    break
+                if start>s+EPSILON:
+                    break
+            envelope.pop()
+            start = 0.0
+        if start is not None:
+            envelope.append((start,a,b))
+    return envelope
+def addEnvelopes(f,g,weight=1):
+    '''
+    returns the envelope of f(x)+weight*g(x), where f and g are envelopes (see lowerEnvelope).
+    '''
+    if len(f)==1 and len(g)==1:
+        return [(0.0,f[0][1]+weight*g[0][1],f[0][2]+weight*g[0][2])]
+    result = []
+    i = j = 0
+    while True:
+        result.append((max(f[i][0],g[j][0]),f[i][1]+weight*g[j][1],f[i][2]+weight*g[j][2]))
+        nextF = f[i+1][0] if i+1<len(f) else INF
+        nextG = g[j+1][0] if j+1<len(g) else INF
+        if nextF==INF and nextG==INF:
+            return result
+        if nextF<=nextG:
+            i += 1
+        if nextG<=nextF:
+            j += 1
+def minEnvelopes(envelopes,limit=INF):
+    '''
+    returns the envelope of the lowest of envelopes (a list of envelopes) at each x up to limit.
+    '''
+    if len(envelopes)==1:
+        return envelopes[0]
+    return lowerEnvelope([(a,b) for envelope in envelopes for s,a,b in envelope],limit)
+def evaluate(envelope,x):
+    '''
+    returns the value of envelope at x.
+    '''
+    for s,a,b in reversed(envelope):
+        if s<=x:
+            return a+b*x
+    return envelope[0][1]+envelope[0][2]*x
+def fixedPoint(envelope,tolerance=1e-9):
+    '''
+    returns the x where envelope(x) = x, or infinity if there is none.
+    the envelope is increasing with slopes up to 1, so the first segment that ends below the line y = x holds it.
+    '''
+    for i in range(len(envelope)):
+        s,a,b = envelope[i]
+        end = envelope[i+1][0] if i+1<len(envelope) else INF
+        if end==INF:
+            return a/(1-b) if b<1-tolerance else INF
+        if a+b*end<=end:
+            return a/(1-b)
+    return INF
+class TurnSolver:
+    '''
+    works out the value of the positions within a single turn, given the value table of later positions.
+    the anchor is the position the turn started from, which is where a bomb leads back to. the value of every position
+    in the turn is a function of the anchor's value x, made of straight lines (an envelope, see lowerEnvelope), so the
+    whole turn is only gone through once per anchor. anchorValue is the x used by turnValue and moveValue.
+    envelopes are only worked out for x up to limit, which is raised when a value turns out to be higher. almost every 
+    change of line is far above any real value, so this keeps most envelopes down to a single line.
+    '''
+    def __init__(self,rules,values,dice=CLASSIC_DICE,limit=2.0) -> None:
+        assert isinstance(rules,SolitaireRules)
+        self.rules = rules
+        self.values = values
+        self.dice = dice
+        self.limit = limit
+        self.index = {self.rules.cols[i]:i for i in range(len(self.rules.cols))}
+        self.rolls = {}
+    def solvePosition(self,steps):
+        '''
+        steps is a list with the steps made in each col, for a position that has not been won.
+        returns the position's value x, the solution of x = (value of starting a turn from steps if a bomb is worth x).
+        returns infinity if progress can never be saved from the position (the value grows by a full turn 
+        for every turn added to it).
+        '''
+        limit = self.limit
+        while True:
+            self.setAnchor(steps)
+            value = fixedPoint(self.rollLines(self.rules.encode(steps),0))
+            if value<=self.limit:
+                break
+            self.limit = self.limit*2 if self.limit<MAX_LIMIT else INF
+        if value==INF:
+            self.limit = limit
+        return value
+    def setAnchor(self,steps,anchorValue=0.0):
+        '''
+        gets ready to value positions in a turn that started from steps, where bombing is worth anchorValue.
+        '''
+        self.memo = {}
+        self.anchorValue = anchorValue
+        self.limit = max(self.limit,anchorValue)
+        self.anchorDone = 0
+        for i in range(len(steps)):
+            if steps[i]==self.rules.tops[i]:
+                self.anchorDone |= 1<<self.rules.cols[i]
+    def turnValue(self,steps,whiteMask):
+        '''
+        steps includes the white pieces' progress this turn, whiteMask is a getColsMask() of the cols with white pieces.
+        returns the expected turns left, choosing the best of stopping and rolling again.
+        '''
+        return evaluate(self.turnLines(self.rules.encode(steps),whiteMask),self.anchorValue)
+    def moveValue(self,steps,whiteMask,move):
+        '''
+        returns the expected turns left after playing move (a tuple of sums).
+        '''
+        return evaluate(self.turnLines(*self.applyMove(self.rules.encode(steps),whiteMask,move)),self.anchorValue)
+    def stopValue(self,steps):
+        '''
+        returns the expected turns left if the player stops with steps now.
+        '''
+        if self.rules.isWon(steps):
+            return 1.0
+        return 1.0+self.values[self.rules.encode(steps)]
+    def turnLines(self,position,whiteMask):
+        '''
+        position is the index (see SolitaireRules.encode) of the steps including the white pieces' progress.
+        returns the envelope of turnValue() over the anchor value.
+        '''
+        key = (position,whiteMask)
+        if key in self.memo:
+            return self.memo[key]
+        stop = None
+        if bin(whiteMask).count('1')>=self.rules.maxWhitePieces:
+            stop = self.stopValue(self.rules.decode(position))
+        envelope = self.rollLines(position,whiteMask,stop)
+        self.memo[key] = envelope
+        return envelope
+    def rollLines(self,position,whiteMask,stop=None):
+        '''
+        returns the envelope of the expected turns left if the player rolls again, playing the best move each time.
+        if stop is given, it is the value of stopping instead, and the best of the two is returned.
+        a white piece that has reached the end of its column can still be played without moving (see Board.applySums), 
+        which leaves the turn where it was. the value of this position then depends on itself, so it is found by 
+        iterating down from the value of never choosing to stay.
+        '''
+        bustWeight,rolls = self.getRolls(whiteMask)
+        total = [(0.0,bustWeight,bustWeight)]
+        stays = []
+        stayWeight = 0
+        for weight,moves in rolls:
+            options = []
+            canStay = False
+            for move in moves:
+                after = self.applyMove(position,whiteMask,move)
+                if after==(position,whiteMask):
+                    canStay = True
+                    continue
+                envelope = self.turnLines(*after)
+                if all(envelope is not x for x in options):
+                    options.append(envelope)
+            if not options:
+                stayWeight += weight
+            elif canStay:
+                stays.append((weight,minEnvelopes(options,self.limit)))
+            else:
+                total = addEnvelopes(total,minEnvelopes(options,self.limit),weight)
+        value = total
+        for weight,best in stays:
+            value = addEnvelopes(value,best,weight)
+        value = self.scale(value,1/(self.dice.total-stayWeight),stop)
+        for i in range(1000):
+            if not stays:
+                break
+            newValue = addEnvelopes(total,value,stayWeight)
+            for weight,best in stays:
+                newValue = addEnvelopes(newValue,minEnvelopes([value,best],self.limit),weight)
+            newValue = self.scale(newValue,1/self.dice.total,stop)
+            if self.isClose(newValue,value):
+                break
+            value = newValue
+        return value
+    def getRolls(self,whiteMask):
+        '''
+        returns the weight of the rolls that bust with whiteMask, and a list of (weight, legal moves) for the rest, 
+        with the rolls that have the same legal moves added together.
+        This function is only used by TurnSolver itself. Do not call from outside.
+        '''
+        whitePiecesLeft = max(self.rules.maxWhitePieces-bin(whiteMask).count('1'),0)
+        if whitePiecesLeft==0:
+            playableMask = whiteMask
+        else:
+            playableMask = self.rules.colsMask & ~self.anchorDone
+        key = (playableMask,whiteMask,whitePiecesLeft)
+        if key not in self.rolls:
+            weights = {}
+            for index in range(len(self.dice.weights)):
+                moves = getLegalMoves(index,playableMask,whiteMask,whitePiecesLeft,self.dice)
+                weights[moves] = weights.get(moves,0)+self.dice.weights[index]
+            self.rolls[key] = (weights.pop((),0),[(weights[moves],moves) for moves in weights])
+        return self.rolls[key]
+    def scale(self,envelope,factor,stop=None):
+        '''
+        returns the envelope times factor, capped at stop if it is given.
+        This function is only used by TurnSolver itself. Do not call from outside.
+        '''
+        lines = [(a*factor,b*factor) for s,a,b in envelope]
+        if stop is not None:
+            lines.append((stop,0.0))
+        return lowerEnvelope(lines,self.limit)
+    def isClose(self,f,g):
+        '''
+        returns True if the envelopes f and g are the same to within EPSILON.
+        This function is only used by TurnSolver itself. Do not call from outside.
+        '''
+        if abs(f[-1][2]-g[-1][2])>=EPSILON:
+            return False
+        return all(abs(evaluate(f,x)-evaluate(g,x))<EPSILON for x in [s for s,a,b in f+g]+[f[-1][0]+g[-1][0]+1])
+    def applyMove(self,position,whiteMask,move):
+        '''
+        returns the position and white piece mask after playing move, the same way as Board.setWhitePieces.
+        '''
+        for x in move:
+            i = self.index[x]
+            if position//self.rules.strides[i]%(self.rules.tops[i]+1)<self.rules.tops[i]:
+                position += self.rules.strides[i]
+            whiteMask |= 1<<x
+        return position,whiteMask
+def solveChunk(args):
+    '''
+    args is a tuple of (path, list of position indexes).
+    solves the positions in a worker process and returns a list of (index, value).
+    '''
+    path,states = args
+    table = ValueTable(path).open()
+    solver = TurnSolver(table.rules,table.values)
+    results = [(index,solver.solvePosition(table.rules.decode(index))) for index in states]
+    table.close()
+    return results
+def createTable(path,rules):
+    '''
+    creates an empty (all zero) value table file for rules.
+    '''
+    assert isinstance(rules,SolitaireRules)
+    with open(path,'wb') as f:
+        f.write(rules.header())
+        f.truncate(HEADER_SIZE+8*rules.size)
+def readCheckpoint(path):
+    '''
+    returns the lowest level that has been solved for the table at path, or None if nothing has been solved.
+    '''
+    try:
+        with open(path+'.ckpt') as f:
+            return json.load(f)['level']
+    except FileNotFoundError:
+        return None
+def writeCheckpoint(path,level):
+    with open(path+'.ckpt.tmp','w') as f:
+        json.dump({'level':level},f)
+    os.replace(path+'.ckpt.tmp',path+'.ckpt')
+def solve(path,rules,processes=None,chunkSize=256,onLevel=None):
+    '''
+    solves every position for rules and writes the values to the file at path.
+    if the file has a checkpoint, solving continues from the last finished level.
+    onLevel, if given, is called with (level, number of positions) after each level is saved.
+    '''
+    assert isinstance(rules,SolitaireRules)
+    lastLevel = readCheckpoint(path) if os.path.exists(path) else None
+    if lastLevel is None:
+        createTable(path,rules)
+        lastLevel = rules.maxLevel+1
+    elif SolitaireRules.fromHeader(open(path,'rb').read(HEADER_SIZE)).header()!=rules.header():
+        raise ValueError(f'{path} was solved for different rules')
+    table = ValueTable(path,writable=True).open()
+    pool = Pool(processes) if processes!=1 else False
+    try:
+        for level in range(lastLevel-1,-1,-1):
+            states = rules.getLevel(level)
+            chunks = [(path,states[i:i+chunkSize]) for i in range(0,len(states),chunkSize)]
+            results = pool.imap_unordered(solveChunk,chunks) if pool else map(solveChunk,chunks)
+            for chunk in results:
+                for index,value in chunk:
+                    table.values[index] = value
+            table.map.flush()
+            writeCheckpoint(path,level)
+            if onLevel:
+                onLevel(level,len(states))
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        table.close()
+class SolitairePolicy(Policy):
+    '''
+    plays the solitaire game perfectly from a solved value table, which must have been solved for the board's columns.
+    the table is only loaded the first time a decision is made.
+    '''
+    def __init__(self,path) -> None:
+        self.table = ValueTable(path)
+        self.solver = False
+        self.anchor = None
+    def startTurn(self,view):
+        '''
+        gets the solver ready for the turn the active player is on.
+        '''
+        rules = self.table.getRules()
+        if not self.solver:
+            self.solver = TurnSolver(rules,self.table.values)
+        seat = view.activeSeat
+        anchor = [view.markerSpace(seat,x)+1 for x in rules.cols]
+        if anchor!=self.anchor:
+            self.anchor = anchor
+            self.solver.setAnchor(anchor,self.table.getValue(anchor))
+        whitePieces = view.whitePieces()
+        steps = anchor[:]
+        for i in range(len(rules.cols)):
+            if rules.cols[i] in whitePieces:
+                steps[i] = whitePieces[rules.cols[i]]+1
+        return steps,getColsMask(whitePieces)
+    def chooseMove(self,view,moves):
+        steps,whiteMask = self.startTurn(view)
+        return min(moves,key=lambda move:self.solver.moveValue(steps,whiteMask,move))
+    def keepRolling(self,view):
+        steps,whiteMask = self.startTurn(view)
+        stop = self.solver.stopValue(steps)
+        return self.solver.turnValue(steps,whiteMask)<stop-1e-12
+
+def main():
+    parser = argparse.ArgumentParser(description='Solve solitaire Can\'t Stop and write the value table to a file.')
+    parser.add_argument('path',help='value table file to write (solving resumes if it has a checkpoint)')
+    parser.add_argument('--test',action='store_true',help='use the short test board')
+    parser.add_argument('--processes',type=int,default=None,help='number of worker processes (default: all cores)')
+    parser.add_argument('--chunk-size',type=int,default=256)
+    args = parser.parse_args()
+    rules = SolitaireRules(test=args.test)
+    print(rules)
+    print(f'value table size: {(HEADER_SIZE+8*rules.size)/1e9:.1f} GB')
+    def onLevel(level,count):
+        print(f'level {level} solved ({count} positions)',flush=True)
+    solve(args.path,rules,args.processes,args.chunk_size,onLevel)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+'''
+Project Name: Can't Stop
+Description:
+
+Checks that MCTSPolicy plays whole games under variant Rules, including dice tables with more
+than 256 outcomes (4d8 has 330). Run it with:
+    python -m unittest test_mcts
+'''
+
+import unittest
+from game_classes import Board,Rules,getGameRng
+from mcts import MCTSPolicy
+from policies import BoardView
+
+def playGame(rules,seed=0,maxTurns=300,budgetMs=2):
+    '''
+    plays a 3 player game of MCTSPolicy bots (with budgetMs milliseconds a decision) under rules. returns the board when it ends (or after maxTurns turns).
+    '''
+    board = Board(['seat0','seat1','seat2'],rules=rules,rng=getGameRng(seed,'test',0))
+    view = BoardView(board)
+    policy = MCTSPolicy(budgetMs=budgetMs)
+    policy.newGame(getGameRng(seed,'mcts',0))
+    for turn in range(maxTurns):
+        while True:
+            board.dice.roll()
+            moves = board.legalMoves()
+            if not moves:
+                board.bomb()
+                break
+            board.applySums(list(policy.chooseMove(view,moves)))
+            if board.whitePiecesLeft()==0 and not policy.keepRolling(view):
+                board.stopTurn()
+                break
+        if board.didActivePlayerWin():
+            break
+        board.nextActivePlayer()
+    return board
+class TestMCTSVariants(unittest.TestCase):
+    def test_big_dice_table(self):
+        rules = Rules(sides=8)
+        self.assertGreater(len(rules.diceTable.outcomes),256)
+        # rollouts on the big board are long, so the bots need a bigger budget to learn to stop
+        board = playGame(rules,budgetMs=20)
+        self.assertTrue(board.didActivePlayerWin())
+    def test_five_dice(self):
+        board = playGame(Rules(numDice=5,sides=6,maxWhitePieces=4))
+        self.assertTrue(board.didActivePlayerWin())
+    def test_key_keeps_the_whole_roll(self):
+        rules = Rules(sides=8)
+        board = Board(['seat0','seat1'],rules=rules,rng=getGameRng(0,'test',1))
+        compact = BoardView(board).toCompact(getGameRng(0,'test',2))
+        policy = MCTSPolicy()
+        keys = set()
+        for index in (0,255,256,len(rules.diceTable.outcomes)-1):
+            compact.dice.setOutcome(index)
+            keys.add(policy.getKey(compact))
+        self.assertEqual(len(keys),4)
+if __name__ == "__main__":
+    unittest.main()